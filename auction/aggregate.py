@@ -0,0 +1,254 @@
+import collections
+import math
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, \
+    Sequence, Union
+
+from .auction import Auction, Bid
+from .compiled_config import CompiledConfig, compile_config
+from .config import Config
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_MAX_BUCKETS = 2048
+
+
+class QuantileSketch(object):
+    """Approximate quantiles of a stream of non-negative values in bounded memory.
+
+    Values are counted in buckets whose bounds grow geometrically, so every
+    quantile is within relative_accuracy of a value that was added, as in
+    DDSketch. Zeros and infinities are counted on their own. Once there are
+    more than max_buckets buckets, the lowest two are merged, which only
+    loses accuracy for the smallest values.
+    """
+
+    __slots__ = ('count', '_gamma', '_log_gamma', '_max_buckets', '_buckets', '_zeros',
+                 '_infinities')
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+                 max_buckets: int = DEFAULT_MAX_BUCKETS):
+        """
+        :param relative_accuracy: Most relative error of a quantile, between 0 and 1.
+        :param max_buckets: Most buckets kept, which bounds the memory used.
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError('relative_accuracy must be between 0 and 1')
+
+        self.count = 0
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._max_buckets = max_buckets
+        self._buckets: Dict[int, int] = {}
+        self._zeros = 0
+        self._infinities = 0
+
+    def add(self, value: float):
+        """Adds a value, which must not be negative."""
+        self.count += 1
+        if value <= 0:
+            self._zeros += 1
+        elif value == math.inf:
+            self._infinities += 1
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            buckets = self._buckets
+            buckets[key] = buckets.get(key, 0) + 1
+            if len(buckets) > self._max_buckets:
+                lowest, second = sorted(buckets)[:2]
+                buckets[second] += buckets.pop(lowest)
+
+    def get_quantile(self, q: float) -> Optional[float]:
+        """Gets the approximate value at a quantile between 0 and 1, or None if empty."""
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = self._zeros
+        if rank < seen:
+            return 0
+
+        for key in sorted(self._buckets):
+            seen += self._buckets[key]
+            if rank < seen:
+                # The middle of the bucket, by relative error.
+                return 2 * self._gamma ** key / (self._gamma + 1)
+
+        return math.inf
+
+
+class _Totals(object):
+    """Running totals of a site or bidder."""
+
+    __slots__ = ('auctions', 'units', 'bids', 'wins', 'revenue', 'adjusted_revenue', 'sketch')
+
+    def __init__(self, sketch: Optional[QuantileSketch]):
+        self.auctions = 0
+        self.units = 0
+        self.bids = 0
+        self.wins = 0
+        self.revenue = 0
+        self.adjusted_revenue = 0
+        self.sketch = sketch
+
+
+class Aggregator(object):
+    """Keeps running revenue, fill rate and win rate totals per site and bidder.
+
+    Each auction's winning bids are added as they are computed, so nothing
+    is kept per auction. There are totals for every site and bidder of the
+    config that was seen, and a single entry for all the unknown ones, so
+    memory is bounded by the size of the config rather than by the number
+    of auctions. Adding an auction takes time proportional to its bids,
+    which are counted for the bidders' win rates.
+    """
+
+    def __init__(self, config: Union[Config, CompiledConfig],
+                 quantiles: Sequence[float] = (),
+                 relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        """
+        :param config: The configuration the auctions are evaluated against.
+        :param quantiles: Quantiles of the winning bid values to report,
+            e.g. (0.5, 0.99), estimated with a QuantileSketch per site and bidder.
+        :param relative_accuracy: The relative accuracy of the quantiles.
+        """
+        compiled = compile_config(config)
+        self._site_configs = compiled.sites
+        self._adjustments = compiled.adjustments
+        self._quantiles = list(quantiles)
+        self._relative_accuracy = relative_accuracy
+        self._pending: Deque[Auction] = collections.deque()
+
+        # Entries are only created for the sites and bidders that are seen.
+        self.total = self._new_totals()
+        self.sites: Dict[str, _Totals] = {}
+        self.bidders: Dict[str, _Totals] = {}
+        self.unknown_site = self._new_totals()
+        self.unknown_bidder = self._new_totals()
+
+    def _new_totals(self) -> _Totals:
+        return _Totals(QuantileSketch(self._relative_accuracy) if self._quantiles else None)
+
+    def add(self, auction: Auction, winning_bids: List[Bid]):
+        """Adds an auction and its winning bids to the totals."""
+        units = len(auction.units)
+        site = self.sites.get(auction.site)
+        if site is None:
+            site = self._get_new_totals(auction.site, self._site_configs, self.sites,
+                                        self.unknown_site)
+        bidders = self.bidders
+        adjustments = self._adjustments
+
+        for totals in (self.total, site):
+            totals.auctions += 1
+            totals.units += units
+            totals.bids += len(auction.bids)
+
+        for bid in auction.bids:
+            bidder = bidders.get(bid.bidder)
+            if bidder is None:
+                bidder = self._get_new_totals(bid.bidder, adjustments, bidders,
+                                              self.unknown_bidder)
+            bidder.bids += 1
+
+        # Winning bids are always from configured bidders, which were just counted.
+        for bid in winning_bids:
+            value = bid.bid
+            adjusted = value + (value * adjustments[bid.bidder])
+
+            for totals in (self.total, site, bidders[bid.bidder]):
+                totals.wins += 1
+                totals.revenue += value
+                totals.adjusted_revenue += adjusted
+                if totals.sketch is not None:
+                    totals.sketch.add(value)
+
+    def _get_new_totals(self, name: str, known: Dict[str, Any], totals: Dict[str, _Totals],
+                        unknown: _Totals) -> _Totals:
+        if name not in known:
+            return unknown
+
+        totals[name] = self._new_totals()
+
+        return totals[name]
+
+    def track(self, auctions: Iterable[Auction]) -> Iterator[Auction]:
+        """Passes auctions through, remembering them until observe gets their results.
+
+        :return: Returns an iterator over the same auctions, to be evaluated
+            and passed to observe.
+        """
+        pending = self._pending
+        for auction in auctions:
+            pending.append(auction)
+            yield auction
+
+    def observe(self, results: Iterable[List[Bid]], report_every: int = 0,
+                on_report: Optional[Callable[[Dict[str, Any]], None]] = None
+                ) -> Iterator[List[Bid]]:
+        """Passes the results of the tracked auctions through, adding each to the totals.
+
+        Only the auctions that were read ahead of their results are kept,
+        e.g. a batch or a window.
+
+        :param results: The winning bids of each auction from track, in order.
+        :param report_every: If set, on_report is called with the report
+            after every report_every auctions.
+        :param on_report: Called with the report at intervals and at the end.
+        :return: Returns an iterator over the same results.
+        """
+        pending = self._pending
+        count = 0
+        for winning_bids in results:
+            self.add(pending.popleft(), winning_bids)
+            yield winning_bids
+
+            count += 1
+            if on_report is not None and report_every > 0 and count % report_every == 0:
+                on_report(self.get_report())
+
+        if on_report is not None:
+            on_report(self.get_report(final=True))
+
+    def get_report(self, final: bool = False) -> Dict[str, Any]:
+        """Gets the totals as JSON-serializable data.
+
+        :param final: Whether this is the report of the whole input.
+        """
+        return {
+            'final': final,
+            'total': self._get_totals_report(self.total),
+            'sites': dict((k, self._get_totals_report(v)) for k, v in self.sites.items()),
+            'unknown_sites': self._get_totals_report(self.unknown_site),
+            'bidders': dict((k, self._get_bidder_report(v)) for k, v in self.bidders.items()),
+            'unknown_bidders': {'bids': self.unknown_bidder.bids},
+        }
+
+    def _get_totals_report(self, totals: _Totals) -> Dict[str, Any]:
+        report = {
+            'auctions': totals.auctions,
+            'units': totals.units,
+            'units_filled': totals.wins,
+            'fill_rate': totals.wins / totals.units if totals.units > 0 else None,
+            'bids': totals.bids,
+            'revenue': totals.revenue,
+            'adjusted_revenue': totals.adjusted_revenue,
+        }
+        self._add_quantiles(report, totals)
+
+        return report
+
+    def _get_bidder_report(self, totals: _Totals) -> Dict[str, Any]:
+        report = {
+            'bids': totals.bids,
+            'wins': totals.wins,
+            'win_rate': totals.wins / totals.bids if totals.bids > 0 else None,
+            'revenue': totals.revenue,
+            'adjusted_revenue': totals.adjusted_revenue,
+        }
+        self._add_quantiles(report, totals)
+
+        return report
+
+    def _add_quantiles(self, report: Dict[str, Any], totals: _Totals):
+        if totals.sketch is not None:
+            report['winning_bid_quantiles'] = dict(
+                (str(x), totals.sketch.get_quantile(x)) for x in self._quantiles)
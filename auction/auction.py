@@ -1,12 +1,20 @@
-from typing import List, Dict
+from typing import Iterable, Iterator, List, Dict, Optional, Sequence, Tuple, Union
+import heapq
+import itertools
 import json
+import operator
 
+from .compiled_config import CompiledConfig, CompiledSite, NO_LIMITS, compile_config
 from .config import Config
+from .metrics import Metrics, UNKNOWN_SITE, UNIT_NOT_IN_AUCTION, BIDDER_NOT_ALLOWED, \
+    BIDDER_NOT_CONFIGURED, NEGATIVE_BID, BELOW_FLOOR
 
 
 class Bid(object):
     """A bid from a bidder for a specific unit."""
 
+    __slots__ = ('bidder', 'bid', 'unit')
+
     def __init__(self, bidder: str, unit: str, bid: float):
         self.bidder = bidder
         self.bid = bid
@@ -20,10 +28,16 @@ class Bid(object):
             self.bid == other.bid and \
             self.unit == other.unit
 
+    def __reduce__(self):
+        # Much faster to pickle than the default handling of __slots__.
+        return Bid, (self.bidder, self.unit, self.bid)
+
 
 class Auction(object):
     """An auction request for a site with a list of available bids."""
 
+    __slots__ = ('site', 'units', 'bids')
+
     def __init__(self, site: str, units: List[str], bids: List[Bid]):
         self.site = site
         self.units = units
@@ -37,44 +51,410 @@ class Auction(object):
             self.units == other.units and \
             self.bids == other.bids
 
+    def __reduce__(self):
+        # Much faster to pickle than the default handling of __slots__.
+        return Auction, (self.site, self.units, self.bids)
+
+
+class UnitResult(object):
+    """The outcome of an auction for one unit."""
+
+    __slots__ = ('unit', 'winner', 'clearing_price', 'top_bids')
+
+    def __init__(self, unit: str, winner: Bid, clearing_price: Optional[float],
+                 top_bids: Optional[List[Bid]] = None):
+        """
+        :param unit: The unit.
+        :param winner: The winning bid.
+        :param clearing_price: The second highest adjusted bid for the unit,
+            or None if the winner was the only eligible bid.
+        :param top_bids: The highest eligible bids by adjusted value, if requested.
+        """
+        self.unit = unit
+        self.winner = winner
+        self.clearing_price = clearing_price
+        self.top_bids = top_bids
+
+    def __eq__(self, other):
+        if not isinstance(other, UnitResult):
+            return NotImplemented
+
+        return self.unit == other.unit and \
+            self.winner == other.winner and \
+            self.clearing_price == other.clearing_price and \
+            self.top_bids == other.top_bids
+
+
+_get_value = operator.itemgetter(0)
+
+# Number of auctions read ahead by evaluate_many to group them by site.
+DEFAULT_WINDOW = 256
+
 
 class AuctionHelper(object):
     """Contains helper methods for calculating winning bids for an auction."""
 
-    def __init__(self, config: Config):
+    def __init__(self, config: Union[Config, CompiledConfig], single_pass: bool = True,
+                 metrics: Optional[Metrics] = None):
+        """
+        :param config: The configuration to evaluate auctions against, either
+            as is or already compiled.
+        :param single_pass: Whether to use the single pass evaluation, or
+            the original per-unit evaluation (kept for differential testing).
+        :param metrics: If set, bid counts and the reasons bids are dropped
+            are recorded to it.
+        """
         self._config = config
+        self._compiled = compile_config(config)
+        self._single_pass = single_pass
+        self._metrics = metrics
 
-        self._bidder_adjustments = dict(
-            (x.name, x.adjustment) for x in config.bidders)
+        self._bidder_adjustments = self._compiled.adjustments
 
     def get_winning_bids(self, auction: Auction) -> List[Bid]:
         """Get winning bids.
 
+        :param auction: The auction to perform winning bid computation on.
+        :return: Returns a list of winnings bids (per unit) for the auction.
+        """
+        if self._single_pass:
+            winning_bids = self.get_winning_bids_single_pass(auction)
+        else:
+            winning_bids = self.get_winning_bids_per_unit(auction)
+
+        if self._metrics is not None:
+            self._record_metrics(auction, winning_bids)
+
+        return winning_bids
+
+    def record_metrics(self, auction: Auction, winning_bids: List[Bid]):
+        """Records an auction whose winning bids were found some other way to the metrics.
+
+        This is for results that don't come from evaluating the auction,
+        e.g. answered from a cache, so the metrics still count it. Does
+        nothing if the helper has no metrics.
+        """
+        if self._metrics is not None:
+            self._record_metrics(auction, winning_bids)
+
+    def _record_metrics(self, auction: Auction, winning_bids: List[Bid]):
+        """Records bid counts and why each dropped bid of an auction was dropped."""
+        metrics = self._metrics
+        metrics.auctions += 1
+        metrics.bids += len(auction.bids)
+        metrics.winning_bids += len(winning_bids)
+
+        site = auction.site
+        site_config = self._compiled.sites.get(site)
+
+        for bid in auction.bids:
+            if site_config is None:
+                reason = UNKNOWN_SITE
+            elif bid.unit not in auction.units:
+                reason = UNIT_NOT_IN_AUCTION
+            elif bid.bidder not in site_config.bidders:
+                reason = BIDDER_NOT_ALLOWED
+            elif bid.bidder not in self._bidder_adjustments:
+                reason = BIDDER_NOT_CONFIGURED
+            elif bid.bid < 0:
+                reason = NEGATIVE_BID
+            else:
+                low, high = site_config.bid_limits.get(bid.bidder, NO_LIMITS)
+                if low <= bid.bid <= high and \
+                        self.get_adjusted_value(bid) >= site_config.floor:
+                    continue
+                reason = BELOW_FLOOR
+
+            metrics.reject(reason, site, bid.bidder)
+
+    def evaluate_many(self, auctions: Iterable[Auction],
+                      window: int = DEFAULT_WINDOW) -> Iterator[List[Bid]]:
+        """Get the winning bids of many auctions, in order.
+
+        Auctions are read lazily, window at a time, and the auctions of each
+        window are evaluated grouped by site, so the site's config is looked
+        up once per group rather than once per auction. The results are the
+        same as calling get_winning_bids on each auction in turn. If reading
+        the auctions raises an error, the results of the auctions before it
+        are yielded first.
+
+        :param auctions: The auctions, e.g. a generator decoding them as they are read.
+        :param window: Most auctions read ahead of the results yielded, at least 1.
+        :return: Returns an iterator over the winning bids of each auction.
+        """
+        if window < 1:
+            raise ValueError('window must be at least 1')
+
+        if not self._single_pass:
+            return map(self.get_winning_bids, auctions)
+
+        return self._evaluate_windows(auctions, window)
+
+    def _evaluate_windows(self, auctions: Iterable[Auction], window: int) -> Iterator[List[Bid]]:
+        iterator = iter(auctions)
+        while True:
+            batch: List[Auction] = []
+            error: Optional[Exception] = None
+            try:
+                batch.extend(itertools.islice(iterator, window))
+            except Exception as e:
+                error = e
+
+            winning_bids = self._evaluate_window(batch)
+            if self._metrics is not None:
+                for auction, result in zip(batch, winning_bids):
+                    self._record_metrics(auction, result)
+
+            yield from winning_bids
+
+            if error is not None:
+                raise error
+            if len(batch) < window:
+                return
+
+    def _evaluate_window(self, auctions: List[Auction]) -> List[List[Bid]]:
+        """The single pass evaluation of a list of auctions, grouped by site."""
+        groups: Dict[str, List[int]] = {}
+        for i, auction in enumerate(auctions):
+            group = groups.get(auction.site)
+            if group is None:
+                groups[auction.site] = [i]
+            else:
+                group.append(i)
+
+        results: List[List[Bid]] = [None] * len(auctions)
+        sites = self._compiled.sites
+        select_winners = self._select_winners
+
+        for site, indices in groups.items():
+            site_config = sites.get(site)
+            if site_config is None:
+                for i in indices:
+                    results[i] = []
+                continue
+
+            for i in indices:
+                auction = auctions[i]
+                best_bids = select_winners(site_config, auction.units, auction.bids)
+                results[i] = [best_bids[unit] for unit in auction.units
+                              if best_bids[unit] is not None]
+
+        return results
+
+    def _select_winners(self, site_config: CompiledSite, units: Sequence[str],
+                        bids: Iterable[Bid]) -> Dict[str, Optional[Bid]]:
+        """The single pass selection of the winning bid of each unit of an auction.
+
+        A bid is eligible if it is for one of the units, its raw value is
+        within the limits of its bidder on the site, and its adjusted value
+        is at least the site's floor. The winner of a unit is the eligible
+        bid with the highest adjusted value, and the first one on a tie.
+
+        :param site_config: The compiled config of the auction's site.
+        :param units: The units of the auction.
+        :param bids: The bids of the auction.
+        :return: Returns the winning bid of each unit, or None if it has none.
+        """
+        adjustments = self._bidder_adjustments
+        get_limits = site_config.bid_limits.get
+        floor = site_config.floor
+
+        # Duplicate units share an entry, since they would have the same winner anyway.
+        best_bids: Dict[str, Optional[Bid]] = dict.fromkeys(units)
+        best_values: Dict[str, float] = {}
+
+        for bid in bids:
+            unit = bid.unit
+            if unit not in best_bids:
+                continue
+
+            value = bid.bid
+            low, high = get_limits(bid.bidder, NO_LIMITS)
+            if not low <= value <= high:
+                continue
+
+            value = value + (value * adjustments[bid.bidder])
+            if not value >= floor:
+                continue
+
+            # Only replace on a strictly greater value, so the first bid wins ties.
+            if unit not in best_values or value > best_values[unit]:
+                best_values[unit] = value
+                best_bids[unit] = bid
+
+        return best_bids
+
+    def get_winning_bids_single_pass(self, auction: Auction) -> List[Bid]:
+        """Get winning bids, visiting each bid exactly once.
+
+        :param auction: The auction to perform winning bid computation on.
+        :return: Returns a list of winnings bids (per unit) for the auction.
+        """
+        # Get configuration for the current site based on the auction name.
+        site_config = self._compiled.sites.get(auction.site)
+
+        # No site config was found for the auction... Return the empty list.
+        if site_config is None:
+            return []
+
+        best_bids = self._select_winners(site_config, auction.units, auction.bids)
+
+        # If there are no winning bids for a unit, don't add to the list.
+        return [best_bids[unit] for unit in auction.units
+                if best_bids[unit] is not None]
+
+    def get_winning_bid_indices(self, site: str, units: Sequence[str], bidders: Sequence[str],
+                                bid_units: Sequence[str], values: Sequence[float]) -> List[int]:
+        """Get the positions of the winning bids of an auction given as columns.
+
+        This is the single pass evaluation for callers that keep the bids in
+        columns, such as a replayed binary log, so they don't have to create
+        Bid objects for bids that don't win. Metrics are not recorded.
+
+        :param site: The site of the auction.
+        :param units: The units of the auction.
+        :param bidders: The bidder of each bid.
+        :param bid_units: The unit of each bid.
+        :param values: The value of each bid.
+        :return: Returns the position of the winning bid for each unit that
+            has one, in the order of the units.
+        """
+        site_config = self._compiled.sites.get(site)
+        if site_config is None:
+            return []
+
+        bid_limits = site_config.bid_limits
+        floor = site_config.floor
+        adjustments = self._bidder_adjustments
+
+        best_indices: Dict[str, Optional[int]] = dict.fromkeys(units)
+        best_values: Dict[str, float] = {}
+
+        for i, (bidder, unit, value) in enumerate(zip(bidders, bid_units, values)):
+            if unit not in best_indices:
+                continue
+
+            low, high = bid_limits.get(bidder, NO_LIMITS)
+            if not low <= value <= high:
+                continue
+
+            value = value + (value * adjustments[bidder])
+            if not value >= floor:
+                continue
+
+            # Only replace on a strictly greater value, so the first bid wins ties.
+            if unit not in best_values or value > best_values[unit]:
+                best_values[unit] = value
+                best_indices[unit] = i
+
+        return [best_indices[unit] for unit in units if best_indices[unit] is not None]
+
+    def get_unit_results(self, auction: Auction, top_k: int = 0) -> List[UnitResult]:
+        """Get the winner, clearing price and optionally the top bids of each unit.
+
+        Like get_winning_bids_single_pass, this visits each bid once, keeping
+        the best two adjusted values per unit. The top bids are picked with
+        a heap bounded to top_k entries rather than a full sort, and ties are
+        kept in bid order, so the winner is always the first of them.
+
+        :param auction: The auction to perform winning bid computation on.
+        :param top_k: How many of the highest bids to return for each unit,
+            or 0 for none.
+        :return: Returns a list of results for each unit with a winning bid,
+            in the order of the auction's units.
+        """
+        results: List[UnitResult] = []
+
+        # Get configuration for the current site based on the auction name.
+        site_config = self._compiled.sites.get(auction.site)
+
+        # No site config was found for the auction... Return the empty list.
+        if site_config is None:
+            if self._metrics is not None:
+                self._record_metrics(auction, [])
+            return results
+
+        bid_limits = site_config.bid_limits
+        floor = site_config.floor
+        adjustments = self._bidder_adjustments
+
+        best_bids: Dict[str, Optional[Bid]] = dict.fromkeys(auction.units)
+        best_values: Dict[str, float] = {}
+        second_values: Dict[str, float] = {}
+        candidates: Optional[Dict[str, List[Tuple[float, Bid]]]] = \
+            dict((x, []) for x in auction.units) if top_k > 0 else None
+
+        for bid in auction.bids:
+            unit = bid.unit
+            if unit not in best_bids:
+                continue
+
+            value = bid.bid
+            low, high = bid_limits.get(bid.bidder, NO_LIMITS)
+            if not low <= value <= high:
+                continue
+
+            value = value + (value * adjustments[bid.bidder])
+            if not value >= floor:
+                continue
+
+            if candidates is not None:
+                candidates[unit].append((value, bid))
+
+            if unit not in best_values:
+                best_values[unit] = value
+                best_bids[unit] = bid
+            elif value > best_values[unit]:
+                second_values[unit] = best_values[unit]
+                best_values[unit] = value
+                best_bids[unit] = bid
+            elif unit not in second_values or value > second_values[unit]:
+                second_values[unit] = value
+
+        for unit in auction.units:
+            winner = best_bids[unit]
+            if winner is None:
+                continue
+
+            top_bids = None
+            if candidates is not None:
+                # nlargest is stable, so equal values stay in bid order.
+                top_bids = [x[1] for x in heapq.nlargest(top_k, candidates[unit], key=_get_value)]
+
+            results.append(UnitResult(unit, winner, second_values.get(unit), top_bids))
+
+        if self._metrics is not None:
+            self._record_metrics(auction, [x.winner for x in results])
+
+        return results
+
+    def get_winning_bids_per_unit(self, auction: Auction) -> List[Bid]:
+        """Get winning bids, sorting the bids of each unit in turn.
+
         :param auction: The auction to perform winning bid computation on.
         :return: Returns a list of winnings bids (per unit) for the auction.
         """
         winning_bids: List[Bid] = []
 
         # Get configuration for the current site based on the auction name.
-        site_config = next(
-            filter(lambda i: i.name == auction.site, self._config.sites), None)
+        site_config = self._compiled.sites.get(auction.site)
 
         # No site config was found for the auction... Return the empty list.
         if site_config is None:
             return winning_bids
 
+        # The filters of the original implementation, rather than the
+        # compiled bid limits, so the two can be compared.
         for unit in auction.units:
-            unit_bids = list(filter(lambda i: i.unit == unit and
-                                    i.bidder in site_config.bidders and
-                                    i.bidder in self._bidder_adjustments.keys() and
-                                    i.bid >= 0,
-                                    auction.bids))
+            unit_bids = [i for i in auction.bids
+                         if i.unit == unit and
+                         i.bidder in site_config.bidders and
+                         i.bidder in self._bidder_adjustments and
+                         i.bid >= 0]
 
             # The bid value must be greater than the floor after adjustments.
-            unit_bids = list(filter(lambda i:
-                                    self.get_adjusted_value(
-                                        i) >= site_config.floor,
-                                    unit_bids))
+            unit_bids = [i for i in unit_bids
+                         if self.get_adjusted_value(i) >= site_config.floor]
 
             # Order the bids by their adjusted value.
             sorted_bids = sorted(unit_bids, key=self.get_adjusted_value,
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""A compact binary columnar format for replaying logged auctions.
+
+A log holds a table of every distinct site, unit and bidder name, and the
+auctions as packed arrays of ids into it and of bid values:
+
+    header          magic, version, byte order and the counts below
+    string offsets  uint32 * (strings + 1), into the string data
+    string data     UTF-8 bytes of every name
+    auction sites   uint32 * auctions, string ids
+    auction units   uint32 * (auctions + 1), offsets into the unit ids
+    auction bids    uint32 * (auctions + 1), offsets into the bid columns
+    unit ids        uint32 * units, string ids
+    bid bidders     uint32 * bids, string ids
+    bid units       uint32 * bids, string ids
+    bid values      float64 * bids
+    bid kinds       uint8 * bids, the JSON type of each value
+
+Each section starts on an 8-byte boundary. Arrays are in the byte order of
+the machine that wrote them, so they can be read in place with memoryview.
+
+Usage: python -m auction.binlog [--ndjson] OUTPUT < auctions.json
+"""
+import argparse
+import mmap
+import struct
+import sys
+from array import array
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+from .auction import AuctionHelper, Auction, Bid
+
+MAGIC = b'AUCL'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sBBxxIIIII4x')
+_BYTE_ORDERS = ('little', 'big')
+_ALIGNMENT = 8
+
+# Bid values are stored as doubles, and converted back to their JSON type
+# so the winning bids are encoded exactly as they were read.
+_FLOAT, _INT, _BOOL = range(3)
+_KINDS = (float, int, bool)
+_MAX_EXACT_INT = 2 ** 53
+
+
+def write_log(auctions: Iterable[Auction], output_file: BinaryIO) -> int:
+    """Writes auctions to a binary log.
+
+    :param auctions: The auctions to write.
+    :param output_file: A binary file to write the log to.
+    :return: Returns the number of auctions written.
+    :raises ValueError: If a bid is an integer too large to store exactly.
+    """
+    string_ids: Dict[str, int] = {}
+    sites = array('I')
+    unit_offsets = array('I', [0])
+    bid_offsets = array('I', [0])
+    unit_ids = array('I')
+    bidders = array('I')
+    bid_units = array('I')
+    values = array('d')
+    kinds = array('B')
+
+    def get_id(name: str) -> int:
+        string_id = string_ids.get(name)
+        if string_id is None:
+            string_id = string_ids[name] = len(string_ids)
+        return string_id
+
+    for auction in auctions:
+        sites.append(get_id(auction.site))
+        unit_ids.extend([get_id(x) for x in auction.units])
+        unit_offsets.append(len(unit_ids))
+
+        for bid in auction.bids:
+            bidders.append(get_id(bid.bidder))
+            bid_units.append(get_id(bid.unit))
+
+            value = bid.bid
+            if type(value) is bool:
+                kinds.append(_BOOL)
+            elif isinstance(value, int):
+                if abs(value) > _MAX_EXACT_INT:
+                    raise ValueError('Bid {} is too large to store exactly'.format(value))
+                kinds.append(_INT)
+            else:
+                kinds.append(_FLOAT)
+            values.append(value)
+        bid_offsets.append(len(bidders))
+
+    encoded_strings = [x.encode('utf-8') for x in string_ids]
+    string_offsets = array('I', [0])
+    for encoded in encoded_strings:
+        string_offsets.append(string_offsets[-1] + len(encoded))
+
+    output_file.write(_HEADER.pack(MAGIC, VERSION, _BYTE_ORDERS.index(sys.byteorder),
+                                   len(string_ids), string_offsets[-1], len(sites),
+                                   len(unit_ids), len(bidders)))
+
+    for section in (string_offsets, b''.join(encoded_strings), sites, unit_offsets,
+                    bid_offsets, unit_ids, bidders, bid_units, values, kinds):
+        data = section.tobytes() if isinstance(section, array) else section
+        output_file.write(data)
+        output_file.write(bytes(-len(data) % _ALIGNMENT))
+
+    return len(sites)
+
+
+class AuctionLog(object):
+    """Reads a binary auction log in place.
+
+    The columns are memoryviews over the log's buffer, so nothing is copied
+    or decoded up front except the string table. Iterating the log gives
+    Auction objects for use with any evaluation engine, while replay
+    evaluates the columns directly and only creates Bid objects for winners.
+    """
+
+    def __init__(self, buffer):
+        """
+        :param buffer: The log's bytes, e.g. a bytes object or a mmap.
+        :raises ValueError: If the buffer isn't a log this can read.
+        """
+        view = memoryview(buffer)
+        if len(view) < _HEADER.size:
+            raise ValueError('Not an auction log: too short')
+
+        magic, version, byte_order, string_count, string_bytes, auction_count, unit_count, \
+            bid_count = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError('Not an auction log: bad magic number')
+        if version != VERSION:
+            raise ValueError('Unsupported auction log version {}'.format(version))
+        if byte_order >= len(_BYTE_ORDERS) or _BYTE_ORDERS[byte_order] != sys.byteorder:
+            raise ValueError('Auction log was written with a different byte order')
+
+        self._view = view
+        self._position = _HEADER.size
+
+        string_offsets = self._take('I', string_count + 1)
+        string_data = self._take('B', string_bytes)
+        self.strings: List[str] = [
+            sys.intern(str(string_data[string_offsets[i]:string_offsets[i + 1]], 'utf-8'))
+            for i in range(string_count)]
+
+        self.sites = self._take('I', auction_count)
+        self.unit_offsets = self._take('I', auction_count + 1)
+        self.bid_offsets = self._take('I', auction_count + 1)
+        self.unit_ids = self._take('I', unit_count)
+        self.bidders = self._take('I', bid_count)
+        self.bid_units = self._take('I', bid_count)
+        self.values = self._take('d', bid_count)
+        self.kinds = self._take('B', bid_count)
+
+    def _take(self, typecode: str, count: int) -> memoryview:
+        start = self._position
+        end = start + count * struct.calcsize(typecode)
+        if end > len(self._view):
+            raise ValueError('Auction log is truncated')
+
+        self._position = end + (-end % _ALIGNMENT)
+
+        return self._view[start:end].cast(typecode)
+
+    def __len__(self) -> int:
+        return len(self.sites)
+
+    def __iter__(self) -> Iterator[Auction]:
+        for i in range(len(self.sites)):
+            yield self.get_auction(i)
+
+    def get_auction(self, index: int) -> Auction:
+        """Creates the Auction object at a position in the log."""
+        strings = self.strings
+        bid_start, bid_end = self.bid_offsets[index], self.bid_offsets[index + 1]
+
+        return Auction(strings[self.sites[index]],
+                       [strings[x] for x in
+                        self.unit_ids[self.unit_offsets[index]:self.unit_offsets[index + 1]]],
+                       [self.get_bid(i) for i in range(bid_start, bid_end)])
+
+    def get_bid(self, index: int) -> Bid:
+        """Creates the Bid object at a position in the bid columns."""
+        value = self.values[index]
+        kind = self.kinds[index]
+        if kind != _FLOAT:
+            value = _KINDS[kind](value)
+
+        return Bid(self.strings[self.bidders[index]], self.strings[self.bid_units[index]], value)
+
+    def replay(self, auction_helper: AuctionHelper) -> Iterator[List[Bid]]:
+        """Computes the winning bids of each auction in the log.
+
+        :param auction_helper: The helper to evaluate the auctions with.
+            Its metrics, if any, are not recorded.
+        :return: Returns an iterator over the winning bids of each auction.
+        """
+        strings = self.strings
+        sites = self.sites
+        unit_offsets = self.unit_offsets
+        bid_offsets = self.bid_offsets
+        unit_ids = self.unit_ids
+        bidders = self.bidders
+        bid_units = self.bid_units
+        values = self.values
+        get_winning_bid_indices = auction_helper.get_winning_bid_indices
+
+        for i in range(len(sites)):
+            bid_start, bid_end = bid_offsets[i], bid_offsets[i + 1]
+            indices = get_winning_bid_indices(
+                strings[sites[i]],
+                [strings[x] for x in unit_ids[unit_offsets[i]:unit_offsets[i + 1]]],
+                [strings[x] for x in bidders[bid_start:bid_end]],
+                [strings[x] for x in bid_units[bid_start:bid_end]],
+                values[bid_start:bid_end])
+
+            yield [self.get_bid(bid_start + x) for x in indices]
+
+
+def read_log(path: str) -> AuctionLog:
+    """Maps a binary auction log file into memory for reading."""
+    with open(path, 'rb') as log_file:
+        # The map stays open for as long as the log's memoryviews use it.
+        return AuctionLog(mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog='auction.binlog',
+        description='Converts JSON auctions from standard in to a binary auction log.')
+    parser.add_argument('output', help='the log file to write')
+    parser.add_argument('--ndjson', action='store_true',
+                        help='read one auction per line instead of a JSON array')
+    args = parser.parse_args(argv)
+
+    # Only needed to convert, and main imports most of the package.
+    from .main import get_auctions, get_auctions_ndjson
+
+    auctions = get_auctions_ndjson(sys.stdin) if args.ndjson else get_auctions()
+    with open(args.output, 'wb') as output_file:
+        count = write_log(auctions, output_file)
+
+    print('Wrote {} auctions to {}'.format(count, args.output), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
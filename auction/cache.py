@@ -0,0 +1,118 @@
+import collections
+import sys
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from .auction import AuctionHelper, Auction, Bid
+
+DEFAULT_MAX_ENTRIES = 100000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class ResultCache(object):
+    """A bounded LRU cache of winning bids, for auctions that are sent repeatedly.
+
+    Auctions are keyed by their site, units and bids (bidder, unit and value
+    of each, in order, since the order decides ties), built into nested
+    tuples so the lookup only hashes what is already decoded. Entries hold
+    the positions of the winning bids rather than the bids themselves, so a
+    hit returns the bids of the auction being evaluated.
+
+    The cache belongs to one AuctionHelper at a time. Evaluating with a
+    different helper, such as the one built for a reloaded config, clears it.
+    Auctions answered from the cache are recorded to the helper's metrics
+    like evaluated ones.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        :param max_entries: The most auctions kept in the cache.
+        :param max_bytes: The most memory used by the cached keys and
+            results, as estimated by sys.getsizeof. Strings are shared with
+            the decoded auctions, so they are not counted.
+        """
+        if max_entries < 1 or max_bytes < 1:
+            raise ValueError('The cache limits must be positive')
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries: 'collections.OrderedDict[Hashable, Tuple[Tuple[int, ...], int]]' = \
+            collections.OrderedDict()
+        self._auction_helper: Optional[AuctionHelper] = None
+
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_winning_bids(self, auction_helper: AuctionHelper, auction: Auction) -> List[Bid]:
+        """Gets the winning bids of an auction from the cache, or evaluates it on a miss.
+
+        :param auction_helper: The helper to evaluate the auction with.
+        :param auction: The auction to perform winning bid computation on.
+        :return: Returns a list of winnings bids (per unit) for the auction.
+        """
+        if auction_helper is not self._auction_helper:
+            if self._auction_helper is not None:
+                self.invalidations += 1
+            self.clear()
+            self._auction_helper = auction_helper
+
+        bids = auction.bids
+        key = (auction.site, tuple(auction.units),
+               tuple([(x.bidder, x.unit, x.bid) for x in bids]))
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            winning_bids = [bids[i] for i in entry[0]]
+            auction_helper.record_metrics(auction, winning_bids)
+            return winning_bids
+
+        self.misses += 1
+        winning_bids = auction_helper.get_winning_bids(auction)
+
+        # Winning bids are always bids of the auction, so find them by identity.
+        positions = dict((id(x), i) for i, x in enumerate(bids))
+        indices = tuple([positions[id(x)] for x in winning_bids])
+        self._add(key, indices)
+
+        return winning_bids
+
+    def clear(self):
+        """Removes all the entries, without counting them as evictions."""
+        self._entries.clear()
+        self.bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Gets the cache counters as JSON-serializable data."""
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+    def _add(self, key: Tuple, indices: Tuple[int, ...]):
+        getsizeof = sys.getsizeof
+        size = getsizeof(key) + getsizeof(key[1]) + getsizeof(key[2]) + getsizeof(indices) + \
+            sum([getsizeof(x) for x in key[2]])
+
+        # An auction too large for the whole cache is just not cached.
+        if size > self.max_bytes:
+            return
+
+        entries = self._entries
+        while entries and (len(entries) >= self.max_entries or
+                           self.bytes + size > self.max_bytes):
+            _, (_, evicted_size) = entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+        entries[key] = (indices, size)
+        self.bytes += size
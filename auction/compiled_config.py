@@ -0,0 +1,183 @@
+import math
+import struct
+import sys
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Union
+
+from .config import Config, Site
+
+# A (low, high) range that no bid value can satisfy.
+NO_LIMITS = (math.inf, -math.inf)
+
+# Non-negative floats sort the same as their bit patterns read as integers.
+_DOUBLE = struct.Struct('<d')
+_INT64 = struct.Struct('<q')
+_MAX_BITS = _INT64.unpack(_DOUBLE.pack(sys.float_info.max))[0]
+
+
+def adjusted_value(bid: float, adjustment: float) -> float:
+    """Apply a bidder adjustment to a raw bid value."""
+    return bid + (bid * adjustment)
+
+
+def get_bid_limits(floor: float, adjustment: float) -> Optional[Tuple[float, float]]:
+    """Get the inclusive range of raw bid values that can be accepted.
+
+    A raw bid is accepted when it is not negative and its adjusted value
+    is at least the floor. With a positive adjustment factor, adjusted
+    values never shrink as the raw bid grows, so the range is exact.
+    Otherwise rounding makes the adjusted value go back and forth around
+    the floor near the bound, so the range only excludes negative bids.
+    Either way, callers still compare the adjusted value with the floor,
+    which also rejects bids whose adjusted value isn't a number.
+
+    :param floor: The site's floor.
+    :param adjustment: The bidder's adjustment.
+    :return: Returns a (low, high) tuple, or None if no bid is accepted.
+    """
+    factor = 1 + adjustment
+
+    if factor <= 0:
+        # Adjusted values can never be positive.
+        if floor > 0:
+            return None
+
+        return 0, math.inf
+
+    if floor <= 0:
+        return 0, math.inf
+
+    low = _find_lowest_accepted(floor, adjustment)
+    if low is None:
+        return None
+
+    return low, math.inf
+
+
+def _find_lowest_accepted(floor: float, adjustment: float) -> Optional[float]:
+    """Get the lowest raw bid whose adjusted value is at least a positive floor.
+
+    The division can be off by many ulps from the adjusted value computation
+    when the factor is close to 0, so the bound is bracketed with steps
+    doubling away from it and then bisected over the float bit patterns.
+    Zero is never accepted, since the floor is positive.
+    """
+    guess = min(floor / (1 + adjustment), sys.float_info.max)
+    bits = _to_bits(guess)
+    step = 1
+
+    if guess + (guess * adjustment) >= floor:
+        high = bits
+        while True:
+            low = max(high - step, 0)
+            value = _from_bits(low)
+            if not value + (value * adjustment) >= floor:
+                break
+            high = low
+            step *= 2
+    else:
+        low = bits
+        while True:
+            if low == _MAX_BITS:
+                return None
+            high = min(low + step, _MAX_BITS)
+            value = _from_bits(high)
+            if value + (value * adjustment) >= floor:
+                break
+            low = high
+            step *= 2
+
+    while high - low > 1:
+        middle = (low + high) // 2
+        value = _from_bits(middle)
+        if value + (value * adjustment) >= floor:
+            high = middle
+        else:
+            low = middle
+
+    return guess if high == bits else _from_bits(high)
+
+
+def _to_bits(value: float) -> int:
+    return _INT64.unpack(_DOUBLE.pack(value))[0]
+
+
+def _from_bits(bits: int) -> float:
+    return _DOUBLE.unpack(_INT64.pack(bits))[0]
+
+
+class CompiledSite(object):
+    """An indexed site configuration."""
+
+    def __init__(self, site: Site, adjustments: Dict[str, float]):
+        self.name = site.name
+        self.floor = site.floor
+        self.bidders: FrozenSet[str] = frozenset(site.bidders)
+
+        # Only bidders that are allowed on the site and have an adjustment
+        # configured can ever win, so nobody else gets an entry.
+        self.bid_limits: Dict[str, Tuple[float, float]] = {}
+        for bidder in self.bidders:
+            if bidder not in adjustments:
+                continue
+
+            limits = get_bid_limits(site.floor, adjustments[bidder])
+            if limits is not None:
+                self.bid_limits[bidder] = limits
+
+
+class CompiledConfig(object):
+    """A Config indexed for fast lookups while evaluating auctions."""
+
+    def __init__(self, config: Config):
+        # With duplicate bidders, the last one wins.
+        self.adjustments: Dict[str, float] = dict(
+            (x.name, x.adjustment) for x in config.bidders)
+
+        # With duplicate sites, the first one wins.
+        self.sites: Dict[str, CompiledSite] = {}
+        for site in config.sites:
+            if site.name not in self.sites:
+                self.sites[site.name] = CompiledSite(site, self.adjustments)
+
+    def to_snapshot(self) -> Tuple[Dict[str, float], List[tuple]]:
+        """Gets the compiled data as plain built-in types, which marshal can store."""
+        return self.adjustments, [(x.name, x.floor, x.bidders, x.bid_limits)
+                                  for x in self.sites.values()]
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Any) -> 'CompiledConfig':
+        """Rebuilds a CompiledConfig from to_snapshot data, without compiling again.
+
+        :raises ValueError: If the snapshot doesn't have the expected structure.
+        """
+        try:
+            adjustments, sites = snapshot
+            compiled = cls.__new__(cls)
+            compiled.adjustments = _check_type(adjustments, dict)
+            compiled.sites = {}
+            for name, floor, bidders, bid_limits in sites:
+                site = CompiledSite.__new__(CompiledSite)
+                site.name = name
+                site.floor = floor
+                site.bidders = _check_type(bidders, frozenset)
+                site.bid_limits = _check_type(bid_limits, dict)
+                compiled.sites[name] = site
+        except (TypeError, ValueError) as e:
+            raise ValueError('Invalid config snapshot: {}'.format(e))
+
+        return compiled
+
+
+def _check_type(value, expected_type: type):
+    if type(value) is not expected_type:
+        raise TypeError('expected {}, got {}'.format(expected_type.__name__,
+                                                     type(value).__name__))
+    return value
+
+
+def compile_config(config: Union[Config, CompiledConfig]) -> CompiledConfig:
+    """Compiles a Config, or returns it as is if it is already compiled."""
+    if isinstance(config, CompiledConfig):
+        return config
+
+    return CompiledConfig(config)
@@ -4,6 +4,8 @@ from typing import List
 class Site(object):
     """Contains configuration for a site."""
 
+    __slots__ = ('name', 'bidders', 'floor')
+
     def __init__(self, name: str, bidders: List[str], floor: float):
         self.name = name
         self.bidders = bidders
@@ -21,6 +23,8 @@ class Site(object):
 class Bidder(object):
     """Contains configuration for a bidder."""
 
+    __slots__ = ('name', 'adjustment')
+
     def __init__(self, name: str, adjustment: float):
         self.name = name
         self.adjustment = adjustment
@@ -36,6 +40,8 @@ class Bidder(object):
 class Config(object):
     """Contains all configuration for the Auction module."""
 
+    __slots__ = ('sites', 'bidders')
+
     def __init__(self, sites: List[Site], bidders: List[Bidder]):
         self.sites = sites
         self.bidders = bidders
@@ -0,0 +1,119 @@
+import contextlib
+import gc
+import hashlib
+import json
+import marshal
+import os
+import sys
+from typing import Iterator, Optional
+
+from .compiled_config import CompiledConfig
+from .json_decoder import decode_config
+
+SNAPSHOT_SUFFIX = '.snapshot'
+
+_MAGIC = b'AUCS'
+_FORMAT_VERSION = 2
+_DIGEST_SIZE = 32
+
+
+def get_snapshot_path(path: str) -> str:
+    """Gets the path of the snapshot kept next to a config file."""
+    return str(path) + SNAPSHOT_SUFFIX
+
+
+def load_compiled_config(path: str, snapshot_path: Optional[str] = None,
+                         use_snapshot: bool = True) -> CompiledConfig:
+    """Loads and compiles a config file, reusing a snapshot of it when still valid.
+
+    Compiling a large config takes much longer than parsing it, so the
+    compiled config is saved with marshal to a snapshot file next to it.
+    The snapshot is keyed by a hash of the config file's contents, the
+    snapshot format and the Python version, and has a checksum of its own
+    data. If any of them don't match, the config is compiled again and the
+    snapshot is replaced. Snapshots are written to a temporary file and
+    renamed into place, so readers never see a partial one, and a config
+    in a read-only directory is just compiled every time.
+
+    :param path: The config file.
+    :param snapshot_path: Where to keep the snapshot, next to the config
+        file by default.
+    :param use_snapshot: Whether to use a snapshot at all.
+    :return: Returns the compiled config.
+    """
+    with open(path, 'rb') as config_file:
+        config_json = config_file.read()
+
+    if not use_snapshot:
+        with _paused_gc():
+            return CompiledConfig(decode_config(json.loads(config_json)))
+
+    if snapshot_path is None:
+        snapshot_path = get_snapshot_path(path)
+
+    header = _MAGIC + bytes([_FORMAT_VERSION, marshal.version, sys.version_info[0],
+                             sys.version_info[1]]) + \
+        hashlib.blake2b(config_json, digest_size=_DIGEST_SIZE).digest()
+
+    with _paused_gc():
+        compiled = _read_snapshot(snapshot_path, header)
+        if compiled is None:
+            compiled = CompiledConfig(decode_config(json.loads(config_json)))
+            _write_snapshot(snapshot_path, header, compiled)
+
+    return compiled
+
+
+@contextlib.contextmanager
+def _paused_gc() -> Iterator[None]:
+    # A large config is millions of objects that are all kept, so collecting
+    # while they are created only wastes time, and much of it.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _read_snapshot(snapshot_path: str, header: bytes) -> Optional[CompiledConfig]:
+    try:
+        with open(snapshot_path, 'rb') as snapshot_file:
+            data = snapshot_file.read()
+    except OSError:
+        return None
+
+    if not data.startswith(header):
+        return None
+
+    # marshal doesn't guard against corrupt data, so check it before loading.
+    checksum_end = len(header) + _DIGEST_SIZE
+    payload = memoryview(data)[checksum_end:]
+    if hashlib.blake2b(payload, digest_size=_DIGEST_SIZE).digest() != \
+            data[len(header):checksum_end]:
+        return None
+
+    try:
+        return CompiledConfig.from_snapshot(marshal.loads(payload))
+    except (ValueError, EOFError, TypeError):
+        return None
+
+
+def _write_snapshot(snapshot_path: str, header: bytes, compiled: CompiledConfig):
+    payload = marshal.dumps(compiled.to_snapshot())
+    checksum = hashlib.blake2b(payload, digest_size=_DIGEST_SIZE).digest()
+    temporary_path = '{}.{}.tmp'.format(snapshot_path, os.getpid())
+
+    try:
+        with open(temporary_path, 'wb') as snapshot_file:
+            snapshot_file.write(header)
+            snapshot_file.write(checksum)
+            snapshot_file.write(payload)
+        os.replace(temporary_path, snapshot_path)
+    except OSError:
+        # Not being able to save the snapshot only makes the next start slower.
+        try:
+            os.unlink(temporary_path)
+        except OSError:
+            pass
@@ -1,5 +1,25 @@
+import collections
+import json
+import re
+from sys import intern
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
 from .auction import AuctionHelper, Auction, Bid
+from .compiled_config import CompiledConfig, NO_LIMITS, compile_config
 from .config import Config, Bidder, Site
+from .metrics import Metrics, UNKNOWN_SITE, UNIT_NOT_IN_AUCTION, BIDDER_NOT_ALLOWED, \
+    BIDDER_NOT_CONFIGURED, NEGATIVE_BID, BELOW_FLOOR
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# The types of JSON numbers, checked with type() on the fast paths. Booleans
+# are accepted like they are by isinstance in the error descriptions.
+_NUMBER_TYPES = (int, float, bool)
+
+# What can be left of a number, literal or escape sequence cut off by the end of a chunk.
+_CUT_OFF_TOKEN = re.compile(r'[-+.\w\\]*\Z')
 
 
 def config_decoder(data):
@@ -10,9 +30,10 @@ def config_decoder(data):
     # There doesn't appear to be any easy way to convert JSON to Python objects...
     # This will have to do for now.
     if 'name' in data and 'bidders' in data and 'floor' in data:
-        return Site(data['name'], data['bidders'], data['floor'])
+        return Site(intern(data['name']), [intern(x) for x in data['bidders']],
+                    data['floor'])
     if 'name' in data and 'adjustment' in data:
-        return Bidder(data['name'], data['adjustment'])
+        return Bidder(intern(data['name']), data['adjustment'])
     return Config(data['sites'], data['bidders'])
 
 
@@ -23,6 +44,379 @@ def auction_decoder(data):
     """
     # There doesn't appear to be any easy way to convert JSON to Python objects...
     # This will have to do for now.
+    # Site, unit and bidder names repeat across millions of objects, so they
+    # are interned to share a single copy of each.
     if 'bidder' in data and 'unit' in data and 'bid' in data:
-        return Bid(data['bidder'], data['unit'], data['bid'])
-    return Auction(data['site'], data['units'], data['bids'])
+        return Bid(intern(data['bidder']), intern(data['unit']), data['bid'])
+    return Auction(intern(data['site']), [intern(x) for x in data['units']],
+                   data['bids'])
+
+
+class SchemaError(ValueError):
+    """Raised when decoded JSON doesn't have the structure of an auction or config."""
+
+
+def decode_auctions(data: Any) -> List[Auction]:
+    """Builds Auction objects from a parsed JSON array of auctions.
+
+    Unlike auction_decoder, this relies on the structure of the document
+    rather than inspecting the keys of every object, and raises a
+    SchemaError naming the offending record when it is malformed. For large
+    inputs, prefer iter_auctions, which decodes each auction while its
+    parsed JSON is still fresh instead of holding the whole document.
+
+    :param data: The result of json.loads on an auction array, without an object_hook.
+    :return: Returns the list of auctions.
+    """
+    if not isinstance(data, list):
+        raise SchemaError('auctions: expected an array')
+
+    return [decode_auction(x, 'auction {}'.format(i)) for i, x in enumerate(data)]
+
+
+def decode_auction(data: Any, position: str = 'auction') -> Auction:
+    """Builds an Auction object from a single parsed JSON auction.
+
+    :param data: The parsed JSON auction object.
+    :param position: Where the auction is in the input, used in error messages.
+    :return: Returns the auction.
+    """
+    try:
+        # Site, unit and bidder names repeat across millions of objects, so
+        # they are interned to share a single copy of each.
+        bids = []
+        for x in data['bids']:
+            value = x['bid']
+            if type(value) not in _NUMBER_TYPES:
+                raise TypeError
+            bids.append(Bid(intern(x['bidder']), intern(x['unit']), value))
+
+        return Auction(intern(data['site']), [intern(x) for x in data['units']], bids)
+    except (KeyError, TypeError):
+        # Only work out exactly what is wrong once something is.
+        raise SchemaError(_find_auction_error(data, position)) from None
+
+
+class FilteringDecoder(object):
+    """Decodes auctions, leaving out the bids that can't win under a config.
+
+    Auctions for unknown sites are decoded without bids, and bids for units
+    not in the auction, from bidders that aren't allowed on the site or
+    aren't configured, and negative or below the floor are dropped before
+    any Bid object is created for them. The winning bids, clearing prices
+    and top bids of the decoded auctions are the same as without filtering.
+
+    Dropped bids are counted by reason, and recorded to the metrics if set,
+    so the metrics report is the same as for the unfiltered auctions.
+    Dropped bids are only read as far as needed to drop them, so unlike
+    decode_auction, a malformed bid that would be dropped anyway may not be
+    reported as an error.
+    """
+
+    def __init__(self, config: Union[Config, CompiledConfig], metrics: Optional[Metrics] = None):
+        """
+        :param config: The configuration the auctions will be evaluated against.
+        :param metrics: If set, dropped bids are recorded to it.
+        """
+        compiled = compile_config(config)
+        self._sites = compiled.sites
+        self._adjustments = compiled.adjustments
+        self._metrics = metrics
+
+        # The reason a bid for a unit in the auction is dropped, by site and
+        # bidder, or None when it depends on the bid's value.
+        self._reasons: Dict[str, Dict[str, Optional[str]]] = {}
+
+        self.dropped_auctions = 0
+        self.rejections: Dict[str, int] = collections.defaultdict(int)
+
+    def decode_auction(self, data: Any, position: str = 'auction') -> Auction:
+        """Builds an Auction object from a single parsed JSON auction, without dropped bids.
+
+        :param data: The parsed JSON auction object.
+        :param position: Where the auction is in the input, used in error messages.
+        :return: Returns the auction.
+        """
+        try:
+            site = intern(data['site'])
+            units = [intern(x) for x in data['units']]
+            bids = data['bids']
+
+            site_config = self._sites.get(site)
+            if site_config is None:
+                self._drop_auction(site, bids)
+                return Auction(site, units, [])
+
+            bid_limits = site_config.bid_limits
+            floor = site_config.floor
+            adjustments = self._adjustments
+            reasons = self._reasons.get(site)
+            if reasons is None:
+                reasons = self._reasons[site] = self._get_reasons(site_config.bidders)
+            rejections = self.rejections
+            metrics = self._metrics
+
+            kept: List[Bid] = []
+            for x in bids:
+                bidder = x['bidder']
+                unit = x['unit']
+                value = x['bid']
+
+                # The same checks as the single pass evaluation, and the
+                # same reasons, in the same order, as AuctionHelper's metrics.
+                if unit in units:
+                    low, high = bid_limits.get(bidder, NO_LIMITS)
+                    if low <= value <= high and \
+                            value + (value * adjustments[bidder]) >= floor:
+                        kept.append(Bid(intern(bidder), intern(unit), value))
+                        continue
+
+                    reason = reasons.get(bidder, BIDDER_NOT_ALLOWED) or \
+                        (NEGATIVE_BID if value < 0 else BELOW_FLOOR)
+                else:
+                    reason = UNIT_NOT_IN_AUCTION
+
+                rejections[reason] += 1
+                if metrics is not None:
+                    metrics.bids += 1
+                    metrics.reject(reason, site, bidder)
+
+            return Auction(site, units, kept)
+        except (KeyError, TypeError):
+            raise SchemaError(_find_auction_error(data, position)) from None
+
+    def _get_reasons(self, bidders: Iterable[str]) -> Dict[str, Optional[str]]:
+        return dict((x, None if x in self._adjustments else BIDDER_NOT_CONFIGURED)
+                    for x in bidders)
+
+    def _drop_auction(self, site: str, bids: List[Any]):
+        self.dropped_auctions += 1
+        self.rejections[UNKNOWN_SITE] += len(bids)
+
+        metrics = self._metrics
+        if metrics is not None:
+            metrics.bids += len(bids)
+            for x in bids:
+                metrics.reject(UNKNOWN_SITE, site, x['bidder'])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Gets the counts of dropped auctions and bids as JSON-serializable data."""
+        return {
+            'dropped_auctions': self.dropped_auctions,
+            'dropped_bids': sum(self.rejections.values()),
+            'rejections': dict(self.rejections),
+        }
+
+
+def decode_config(data: Any) -> Config:
+    """Builds a Config object from a parsed JSON config.
+
+    :param data: The result of json.loads on a config, without an object_hook.
+    :return: Returns the config.
+    """
+    try:
+        return Config([Site(intern(x['name']), [intern(y) for y in x['bidders']],
+                            _check_number(x['floor']))
+                       for x in data['sites']],
+                      [Bidder(intern(x['name']), _check_number(x['adjustment']))
+                       for x in data['bidders']])
+    except (KeyError, TypeError):
+        raise SchemaError(_find_config_error(data)) from None
+
+
+def _check_number(value: Any) -> Any:
+    if type(value) not in _NUMBER_TYPES:
+        raise TypeError('expected a number')
+
+    return value
+
+
+def _find_auction_error(data: Any, position: str) -> str:
+    """Describes the first structural problem with a parsed JSON auction."""
+    error = _find_object_error(data, position, {'site': str, 'units': list, 'bids': list})
+    if error is not None:
+        return error
+
+    for i, unit in enumerate(data['units']):
+        if not isinstance(unit, str):
+            return '{}, unit {}: expected a string'.format(position, i)
+
+    for i, bid in enumerate(data['bids']):
+        error = _find_object_error(bid, '{}, bid {}'.format(position, i),
+                                   {'bidder': str, 'unit': str, 'bid': (int, float)})
+        if error is not None:
+            return error
+
+    return '{}: malformed auction'.format(position)
+
+
+def _find_config_error(data: Any) -> str:
+    """Describes the first structural problem with a parsed JSON config."""
+    error = _find_object_error(data, 'config', {'sites': list, 'bidders': list})
+    if error is not None:
+        return error
+
+    for i, site in enumerate(data['sites']):
+        position = 'config, site {}'.format(i)
+        error = _find_object_error(site, position,
+                                   {'name': str, 'bidders': list, 'floor': (int, float)})
+        if error is not None:
+            return error
+
+        for j, bidder in enumerate(site['bidders']):
+            if not isinstance(bidder, str):
+                return '{}, bidder {}: expected a string'.format(position, j)
+
+    for i, bidder in enumerate(data['bidders']):
+        error = _find_object_error(bidder, 'config, bidder {}'.format(i),
+                                   {'name': str, 'adjustment': (int, float)})
+        if error is not None:
+            return error
+
+    return 'config: malformed config'
+
+
+def _find_object_error(data: Any, position: str, fields: dict):
+    """Describes a missing or mistyped field of a JSON object, or None if it's valid."""
+    if not isinstance(data, dict):
+        return '{}: expected an object'.format(position)
+
+    for name, field_type in fields.items():
+        if name not in data:
+            return "{}: missing '{}'".format(position, name)
+        if not isinstance(data[name], field_type):
+            return "{}: '{}' has the wrong type".format(position, name)
+
+    return None
+
+
+class _ChunkedText(object):
+    """A sliding window over a text stream that is read in chunks."""
+
+    def __init__(self, stream: IO[str], chunk_size: int):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+        # Where the buffer starts in the document, for error positions.
+        self.offset = 0
+        self.lines = 0
+        self.column = 0
+
+    def read_more(self) -> bool:
+        """Appends the next chunk, dropping everything already consumed.
+
+        The chunk is at least as large as the unconsumed text, so a single
+        value spanning many chunks is only re-scanned a logarithmic number
+        of times.
+
+        :return: Returns False if the end of the stream was reached.
+        """
+        if self.eof:
+            return False
+
+        remaining = self.buffer[self.pos:]
+        chunk = self.stream.read(max(self.chunk_size, len(remaining)))
+        if not chunk:
+            self.eof = True
+            return False
+
+        consumed_lines = self.buffer.count('\n', 0, self.pos)
+        if consumed_lines:
+            self.column = self.pos - self.buffer.rfind('\n', 0, self.pos) - 1
+        else:
+            self.column += self.pos
+        self.lines += consumed_lines
+        self.offset += self.pos
+
+        self.buffer = remaining + chunk
+        self.pos = 0
+        return True
+
+    def is_cut_off(self, error: json.JSONDecodeError) -> bool:
+        """Whether a decoding error may only be due to the value running past the buffer."""
+        return error.msg.startswith('Unterminated string') or \
+            _CUT_OFF_TOKEN.match(self.buffer, error.pos) is not None
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character, or '' at the end."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read_more():
+                return ''
+
+    def error(self, message: str, pos: Optional[int] = None) -> json.JSONDecodeError:
+        """Creates an error at a position in the buffer, reported as a position in the document."""
+        if pos is None:
+            pos = self.pos
+
+        error = json.JSONDecodeError(message, self.buffer, pos)
+        error.pos = self.offset + pos
+        error.lineno = self.lines + self.buffer.count('\n', 0, pos) + 1
+        last_newline = self.buffer.rfind('\n', 0, pos)
+        error.colno = pos - last_newline if last_newline >= 0 else self.column + pos + 1
+        error.args = ('{}: line {} column {} (char {})'.format(
+            message, error.lineno, error.colno, error.pos),)
+
+        return error
+
+
+def iter_auctions(stream: IO[str], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  decode: Callable[[Any, str], Auction] = decode_auction) -> Iterator[Auction]:
+    """Incrementally decodes a JSON array of auctions from a stream.
+
+    Auctions are yielded as soon as they are fully read, so memory use is
+    bounded by the largest single auction rather than the whole array.
+
+    :param stream: Text stream containing a JSON array of auctions.
+    :param chunk_size: Number of characters to read from the stream at a time.
+    :param decode: Builds an auction from its parsed JSON and position, e.g.
+        FilteringDecoder.decode_auction.
+    :return: Returns an iterator over the decoded auctions.
+    """
+    decoder = json.JSONDecoder()
+    text = _ChunkedText(stream, chunk_size)
+    index = 0
+
+    if text.peek() != '[':
+        raise text.error("Expecting '['")
+    text.pos += 1
+
+    if text.peek() == ']':
+        text.pos += 1
+    else:
+        while True:
+            text.peek()
+
+            while True:
+                try:
+                    data, end = decoder.raw_decode(text.buffer, text.pos)
+                except json.JSONDecodeError as e:
+                    # Only read on when the value may just be cut off, so a
+                    # syntax error doesn't buffer the rest of the input.
+                    if not text.is_cut_off(e) or not text.read_more():
+                        raise text.error(e.msg, e.pos) from None
+                    continue
+
+                # A value running up to the end of the buffer may be cut short.
+                if end < len(text.buffer) or not text.read_more():
+                    break
+
+            text.pos = end
+            yield decode(data, 'auction {}'.format(index))
+            index += 1
+
+            delimiter = text.peek()
+            text.pos += 1
+            if delimiter == ']':
+                break
+            if delimiter != ',':
+                text.pos -= 1
+                raise text.error("Expecting ',' delimiter")
+
+    if text.peek() != '':
+        raise text.error("Extra data")
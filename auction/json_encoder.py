@@ -1,8 +1,100 @@
+import json
 from json import JSONEncoder
+from typing import Any, Dict, List
+
+from .auction import Bid, UnitResult
+
+_encode_string = json.encoder.encode_basestring_ascii
+
+_COMPACT_BID = '{"bidder":%s,"bid":%s,"unit":%s}'
+_PRETTY_BID = ('{\n'
+               '    "bidder": %s,\n'
+               '    "bid": %s,\n'
+               '    "unit": %s\n'
+               '}')
 
 
 class DefaultEncoder(JSONEncoder):
-    """Encodes plain data objects using the built-in Python dictionary."""
+    """Encodes plain data objects using their attributes.
+
+    Objects with __slots__ are encoded with their slots in declaration
+    order, which matches the __dict__ order of the equivalent plain object.
+    """
 
     def default(self, o):
+        slots = getattr(type(o), '__slots__', None)
+        if slots is not None:
+            return dict((x, getattr(o, x)) for x in slots)
+
         return o.__dict__
+
+
+def encode_number(value) -> str:
+    """Encodes a number the same way as json.dumps."""
+    if type(value) is int:
+        return int.__repr__(value)
+    if type(value) is float and value - value == 0:
+        return float.__repr__(value)
+
+    # Booleans, NaN, infinities and number subclasses.
+    return json.dumps(value)
+
+
+def encode_winning_bids(winning_bids: List[Bid], pretty: bool = False) -> str:
+    """Encodes the winning bids of an auction as a JSON array.
+
+    This writes the bids directly rather than going through
+    DefaultEncoder.default for every object, and produces the same JSON.
+
+    :param winning_bids: The winning bids to encode.
+    :param pretty: Whether to indent with 4 spaces like json.dumps(indent=4),
+        rather than leaving out all optional whitespace.
+    :return: Returns the JSON string.
+    """
+    if not winning_bids:
+        return '[]'
+
+    template = _PRETTY_BID if pretty else _COMPACT_BID
+    bids = [template % (_encode_string(x.bidder), encode_number(x.bid),
+                        _encode_string(x.unit))
+            for x in winning_bids]
+
+    if pretty:
+        return '[\n    ' + ',\n'.join(bids).replace('\n', '\n    ') + '\n]'
+
+    return '[' + ','.join(bids) + ']'
+
+
+def encode_unit_results(unit_results: List[UnitResult], pretty: bool = False) -> str:
+    """Encodes the per-unit results of an auction as a JSON array.
+
+    Each result is an object with the unit, the winning bid and the clearing
+    price, plus the top bids if they were requested.
+
+    :param unit_results: The unit results to encode.
+    :param pretty: Whether to indent with 4 spaces like json.dumps(indent=4),
+        rather than leaving out all optional whitespace.
+    :return: Returns the JSON string.
+    """
+    data = [_unit_result_data(x) for x in unit_results]
+
+    if pretty:
+        return json.dumps(data, indent=4)
+
+    return json.dumps(data, separators=(',', ':'))
+
+
+def _bid_data(bid: Bid) -> Dict[str, Any]:
+    return {'bidder': bid.bidder, 'bid': bid.bid, 'unit': bid.unit}
+
+
+def _unit_result_data(unit_result: UnitResult) -> Dict[str, Any]:
+    data = {
+        'unit': unit_result.unit,
+        'winner': _bid_data(unit_result.winner),
+        'clearing_price': unit_result.clearing_price,
+    }
+    if unit_result.top_bids is not None:
+        data['top_bids'] = [_bid_data(x) for x in unit_result.top_bids]
+
+    return data
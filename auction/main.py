@@ -1,27 +1,405 @@
-#!usr/bin/env python3
+#!/usr/bin/env python3
+import argparse
+import functools
 import sys
 import json
 import pathlib
-from typing import List
+import time
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from . import json_encoder
+from .aggregate import Aggregator
 from .auction import AuctionHelper, Auction, Bid
+from .binlog import read_log
+from .cache import ResultCache, DEFAULT_MAX_BYTES
+from .compiled_config import CompiledConfig
 from .config import Config, Bidder, Site
-from .json_decoder import auction_decoder, config_decoder
+from .config_cache import load_compiled_config
+from .json_decoder import FilteringDecoder, decode_auction, decode_config, iter_auctions
+from .metrics import Metrics
+from .parallel import DEFAULT_CHUNK_SIZE, evaluate_parallel, evaluate_parallel_file, \
+    evaluate_parallel_ndjson
+from .pipeline import run_pipeline
 
+DEFAULT_CONFIG_PATH = pathlib.Path(__file__).parent / 'config.json'
+OUTPUT_BUFFER_SIZE = 1024 * 1024
 
-def main():
-    config = get_config()
-    auctions = get_auctions()
 
-    auction_helper = AuctionHelper(config)
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
 
-    winning_bids: List[Bid] = []
+    metrics = Metrics() if args.metrics is not None else None
+    start = time.perf_counter()
 
-    for auction in auctions:
-        winning_bids.append(auction_helper.get_winning_bids(auction))
+    if args.shards > 1:
+        # The coordinator only splits the config between the shards, so it
+        # doesn't need to compile it.
+        config = get_config(args.config)
+    else:
+        config = load_compiled_config(args.config, use_snapshot=not args.no_config_snapshot)
+    if metrics is not None:
+        metrics.stage_seconds['config'] = time.perf_counter() - start
 
-    print_json(winning_bids)
+    decode = decode_auction
+    if args.filter_bids:
+        decoder = FilteringDecoder(config, metrics)
+        decode = decoder.decode_auction
+        if metrics is not None:
+            metrics.decoder = decoder
+
+    aggregator = None
+    if args.summary is not None:
+        aggregator = Aggregator(config, args.summary_quantiles)
+        summary_file = sys.stderr if args.summary == '-' else open(args.summary, 'w')
+
+    # Results are written as each auction is read, rather than all at the end.
+    if args.shards > 1:
+        # The results are already encoded by the shard workers.
+        winning_bids = evaluate_shards(config, args)
+    elif args.pipeline:
+        # The results are already encoded by the last stage of the pipeline.
+        winning_bids = evaluate_pipeline(config, args, decode)
+    elif args.input is not None and args.workers > 1:
+        # Each worker maps the file and decodes its own byte ranges of it,
+        # so the input isn't sent through a pipe at all.
+        winning_bids = evaluate_parallel_file(config, args.input, args.workers)
+    elif args.replay is not None and args.engine == 'python' and args.workers == 1 and \
+            metrics is None and args.cache_entries == 0 and not args.unit_results and \
+            aggregator is None:
+        # The log's columns are evaluated directly, without creating Auction objects.
+        winning_bids = read_log(args.replay).replay(AuctionHelper(config))
+    elif args.engine == 'numpy':
+        # NumPy is an optional dependency, so only import it when it's used.
+        from .vectorized import VectorizedAuctionHelper
+
+        # The log's columns are used as the engine's arrays, in place.
+        winning_bids = VectorizedAuctionHelper(config).replay(read_log(args.replay),
+                                                              args.batch_size)
+    elif args.ndjson and args.workers > 1 and args.replay is None:
+        # The workers decode the raw lines as well, which is cheaper than
+        # sending them decoded auctions.
+        winning_bids = evaluate_parallel_ndjson(config, sys.stdin, args.workers,
+                                                args.chunk_size)
+    else:
+        if args.replay is not None:
+            auctions = iter(read_log(args.replay))
+        elif args.input is not None:
+            auctions = get_auctions_file(args.input, decode)
+        elif args.ndjson:
+            auctions = get_auctions_ndjson(sys.stdin, decode)
+        else:
+            auctions = get_auctions(decode)
+        if metrics is not None:
+            auctions = metrics.time_iterator(auctions, 'decode')
+        if aggregator is not None:
+            auctions = aggregator.track(auctions)
+
+        winning_bids = evaluate_auctions(config, auctions, args, metrics)
+        if aggregator is not None:
+            winning_bids = aggregator.observe(winning_bids, args.summary_every,
+                                              lambda x: write_summary(x, summary_file))
+
+    if metrics is not None:
+        # Stages are interleaved, so evaluation is the time spent getting
+        # results minus the decoding it triggered, and encoding is the rest.
+        winning_bids = metrics.time_iterator(winning_bids, 'evaluate')
+        output_start = time.perf_counter()
+
+    # With per-unit results, each item is a list of UnitResults rather than Bids.
+    if args.pipeline or args.shards > 1:
+        encode = _encoded
+    elif args.unit_results:
+        encode = json_encoder.encode_unit_results
+    else:
+        encode = json_encoder.encode_winning_bids
+
+    with get_output_stream() as output_stream:
+        if args.ndjson:
+            print_json_lines(winning_bids, output_stream, encode)
+        else:
+            print_json_stream(winning_bids, output_stream, args.pretty, encode)
+
+    if metrics is not None:
+        stage_seconds = metrics.stage_seconds
+        stage_seconds['encode'] = time.perf_counter() - output_start - stage_seconds['evaluate']
+        stage_seconds['evaluate'] -= stage_seconds['decode']
+        stage_seconds['total'] = time.perf_counter() - start
+        metrics.write_report(args.metrics)
+
+    if aggregator is not None and summary_file is not sys.stderr:
+        summary_file.close()
+
+
+def evaluate_auctions(config: Union[Config, CompiledConfig], auctions: Iterable[Auction],
+                      args: argparse.Namespace,
+                      metrics: Optional[Metrics] = None) -> Iterator[List[Bid]]:
+    """Computes the winning bids of each auction, in worker processes with --workers."""
+    if args.workers > 1:
+        return evaluate_parallel(config, auctions, args.workers, args.chunk_size)
+
+    return map(get_evaluator(config, args, metrics), auctions)
+
+
+def get_evaluator(config: Union[Config, CompiledConfig], args: argparse.Namespace,
+                  metrics: Optional[Metrics] = None) -> Callable[[Auction], list]:
+    """Gets the function computing the results of an auction in this process."""
+    auction_helper = AuctionHelper(config, metrics=metrics)
+    if args.unit_results:
+        return lambda auction: auction_helper.get_unit_results(auction, args.top_k)
+
+    if args.cache_entries > 0:
+        cache = ResultCache(args.cache_entries, args.cache_bytes)
+        if metrics is not None:
+            metrics.cache = cache
+
+        return functools.partial(cache.get_winning_bids, auction_helper)
+
+    return auction_helper.get_winning_bids
+
+
+def evaluate_pipeline(config: Union[Config, CompiledConfig], args: argparse.Namespace,
+                      decode: Callable[[Any, str], Auction] = decode_auction) -> Iterator[str]:
+    """Reads, decodes, evaluates and encodes auctions in a pipeline of threads.
+
+    :param decode: Builds an auction from its parsed JSON and position.
+
+    :return: Returns an iterator over the encoded results of each auction.
+    """
+    stages: List[Callable] = []
+
+    if args.replay is not None:
+        items = iter(read_log(args.replay))
+    elif args.ndjson:
+        items = get_numbered_lines_file(args.input) if args.input is not None \
+            else get_numbered_lines(sys.stdin)
+        stages.append(lambda x: decode(json.loads(x[1]), 'line {}'.format(x[0])))
+    else:
+        # The JSON array parser decodes as it reads, so it can't be split up.
+        items = get_auctions(decode)
+
+    encode = json_encoder.encode_unit_results if args.unit_results \
+        else json_encoder.encode_winning_bids
+    pretty = args.pretty and not args.ndjson
+
+    stages.append(get_evaluator(config, args))
+    stages.append(lambda x: encode(x, pretty))
+
+    return run_pipeline(items, stages, args.chunk_size)
+
+
+def evaluate_shards(config: Config, args: argparse.Namespace) -> Iterator[str]:
+    """Evaluates NDJSON auctions on shard worker processes started on this host.
+
+    :return: Returns an iterator over the encoded winning bids of each auction.
+    """
+    # Sharding is rarely used, and starts the workers as subprocesses.
+    from .shard import LocalShards, evaluate_sharded
+
+    with LocalShards(args.shards) as shards:
+        if args.input is not None:
+            with open(args.input) as input_file:
+                yield from evaluate_sharded(config, input_file, shards.addresses,
+                                            args.chunk_size)
+        else:
+            yield from evaluate_sharded(config, sys.stdin, shards.addresses, args.chunk_size)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parses the command-line arguments."""
+    parser = argparse.ArgumentParser(
+        prog='auction.main',
+        description='Computes the winning bids for auctions read from standard in.')
+    parser.add_argument('--ndjson', action='store_true',
+                        help='read one auction per line and write one result per line')
+    parser.add_argument('--input', metavar='PATH',
+                        help='read one auction per line from a file instead of standard in, '
+                             'like --ndjson; with --workers, each worker reads its own '
+                             'part of the file')
+    parser.add_argument('--replay', metavar='PATH',
+                        help='read auctions from a binary log written by auction.binlog '
+                             'instead of standard in')
+    parser.add_argument('--pretty', action='store_true',
+                        help='indent the output with 4 spaces, as in samples/output.json')
+    parser.add_argument('--workers', type=positive_int, default=1,
+                        help='number of worker processes evaluating auctions')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='read, decode, evaluate and encode in separate threads '
+                             'connected by bounded queues')
+    parser.add_argument('--filter-bids', action='store_true',
+                        help='leave out the bids that can\'t win while decoding, rather '
+                             'than creating objects for them; the results are the same')
+    parser.add_argument('--shards', type=positive_int, default=1, metavar='N',
+                        help='with --ndjson or --input, send each auction to one of N '
+                             'worker processes by its site, each holding only the config '
+                             'of its own sites')
+    parser.add_argument('--chunk-size', type=positive_int, default=DEFAULT_CHUNK_SIZE,
+                        help='number of auctions sent to a worker process, shard or '
+                             'pipeline stage at a time')
+    parser.add_argument('--engine', choices=['python', 'numpy'], default='python',
+                        help='evaluate auctions one at a time in Python, or, with '
+                             '--replay, in vectorized batches with NumPy')
+    parser.add_argument('--batch-size', type=positive_int, default=100000,
+                        help='number of auctions evaluated per batch by the numpy engine')
+    parser.add_argument('--clearing-price', action='store_true',
+                        help='write the winner and the clearing (second highest) price '
+                             'of each unit instead of just the winning bids')
+    parser.add_argument('--top-k', type=non_negative_int, default=0, metavar='K',
+                        help='with --clearing-price, also write the K highest bids of each unit')
+    parser.add_argument('--cache-entries', type=non_negative_int, default=0, metavar='N',
+                        help='remember the winning bids of up to N distinct auctions, '
+                             'for input with repeated auctions (default 0, no cache)')
+    parser.add_argument('--cache-bytes', type=positive_int, default=DEFAULT_MAX_BYTES,
+                        metavar='N', help='most memory used by the cache, in bytes')
+    parser.add_argument('--config', default=str(DEFAULT_CONFIG_PATH),
+                        help='config file (default: auction/config.json)')
+    parser.add_argument('--no-config-snapshot', action='store_true',
+                        help='always compile the config, rather than loading the snapshot '
+                             'of it saved next to the config file')
+
+    parser.add_argument('--metrics', nargs='?', const='-', metavar='PATH',
+                        help='write stage timings and dropped bid counters as JSON to '
+                             'PATH, or to standard error if no path is given')
+    parser.add_argument('--summary', nargs='?', const='-', metavar='PATH',
+                        help='write auction, fill rate, revenue and win rate totals per '
+                             'site and bidder as a line of JSON to PATH, or to standard '
+                             'error if no path is given')
+    parser.add_argument('--summary-every', type=non_negative_int, default=0, metavar='N',
+                        help='with --summary, also write the totals so far after every N '
+                             'auctions')
+    parser.add_argument('--summary-quantiles', type=quantile_list, default=[],
+                        metavar='Q,Q', help='with --summary, also estimate these quantiles '
+                                            'of the winning bid values, e.g. 0.5,0.99')
+
+    args = parser.parse_args(argv)
+    args.unit_results = args.clearing_price or args.top_k > 0
+    if args.pipeline and (args.engine == 'numpy' or args.workers > 1 or
+                          args.metrics is not None):
+        parser.error('--pipeline is only supported when evaluating in a single process '
+                     'without --metrics')
+    if args.input is not None and args.replay is not None:
+        parser.error('--input and --replay can not be used together')
+    if args.input is not None:
+        args.ndjson = True
+    if args.filter_bids and (args.replay is not None or args.workers > 1):
+        parser.error('--filter-bids is only supported when decoding JSON in a single process')
+    if args.shards > 1 and (not args.ndjson or args.replay is not None or args.workers > 1 or
+                            args.pipeline or args.engine == 'numpy' or args.filter_bids or
+                            args.metrics is not None or args.cache_entries > 0 or
+                            args.unit_results):
+        parser.error('--shards is only supported with --ndjson or --input, without '
+                     'other evaluation options')
+    if args.engine == 'numpy' and (args.replay is None or args.summary is not None):
+        # Decoded auctions have to be encoded into arrays one bid at a time,
+        # which makes the numpy engine slower than the python one for them.
+        parser.error('--engine numpy is only supported with --replay, without --summary')
+    if args.engine == 'numpy' and args.workers > 1:
+        parser.error('--workers is not supported with --engine numpy')
+    if args.metrics is not None and (args.engine == 'numpy' or args.workers > 1):
+        parser.error('--metrics is only supported when evaluating in a single process')
+    if args.cache_entries > 0 and (args.engine == 'numpy' or args.workers > 1):
+        parser.error('--cache-entries is only supported when evaluating in a single process')
+    if args.summary is not None and (args.workers > 1 or args.pipeline or args.shards > 1 or
+                                     args.unit_results or args.filter_bids):
+        # Bids left out by --filter-bids would be missing from the bid counts and win rates.
+        parser.error('--summary is only supported when evaluating in a single process, '
+                     'without --pipeline, --clearing-price or --filter-bids')
+    if args.unit_results and (args.engine == 'numpy' or args.workers > 1 or
+                              args.cache_entries > 0):
+        parser.error('--clearing-price and --top-k are only supported when evaluating in a '
+                     'single process without a cache')
+
+    return args
+
+
+def write_summary(report: Dict[str, Any], summary_file: IO[str]):
+    """Writes a summary report as a line of JSON, so reports at intervals are NDJSON."""
+    summary_file.write(json.dumps(report))
+    summary_file.write('\n')
+    summary_file.flush()
+
+
+def positive_int(value: str) -> int:
+    """Parses a command-line argument that must be a positive integer."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError('{} is not a positive integer'.format(value))
+
+    return number
+
+
+def non_negative_int(value: str) -> int:
+    """Parses a command-line argument that must be zero or a positive integer."""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError('{} is not a non-negative integer'.format(value))
+
+    return number
+
+
+def quantile_list(value: str) -> List[float]:
+    """Parses a command-line argument that must be comma separated quantiles."""
+    quantiles = [float(x) for x in value.split(',')]
+    if not all(0 <= x <= 1 for x in quantiles):
+        raise argparse.ArgumentTypeError('{} are not all between 0 and 1'.format(value))
+
+    return quantiles
+
+
+def print_json_lines(data: Iterable[List[Bid]], output_stream: IO[str],
+                     encode: Callable[..., str] = json_encoder.encode_winning_bids):
+    """Prints the winning bids of each auction as JSON on its own line.
+
+    :param data: Winning bids of each auction to serialize and print.
+    :param output_stream: Stream to print to.
+    :param encode: Encodes the results of an auction, compact by default.
+    """
+    for item in data:
+        print_json_line(item, output_stream, encode)
+
+
+def print_json_line(winning_bids: List[Bid], output_stream: IO[str],
+                    encode: Callable[..., str] = json_encoder.encode_winning_bids):
+    """Prints the winning bids of an auction as JSON on a single line.
+
+    :param winning_bids: Winning bids to serialize and print.
+    :param output_stream: Stream to print to.
+    :param encode: Encodes the results of an auction, compact by default.
+    """
+    output_stream.write(encode(winning_bids))
+    output_stream.write('\n')
+
+
+def print_json_stream(data: Iterable[List[Bid]], output_stream: IO[str],
+                      pretty: bool = False,
+                      encode: Callable[..., str] = json_encoder.encode_winning_bids):
+    """Prints the winning bids of each auction as a JSON array.
+
+    Each item is written as soon as it is produced. With pretty, the
+    output is identical to print_json(list(data)).
+
+    :param data: Winning bids of each auction to serialize and print.
+    :param output_stream: Stream to print to.
+    :param pretty: Whether to indent the output, rather than keeping it compact.
+    :param encode: Encodes the results of an auction, taking pretty as its
+        second argument.
+    """
+
+    if pretty:
+        separator = '[\n'
+        for item in data:
+            output_stream.write(separator)
+            output_stream.write('    ' + encode(item, True).replace('\n', '\n    '))
+            separator = ',\n'
+
+        output_stream.write('[]\n' if separator == '[\n' else '\n]\n')
+    else:
+        separator = '['
+        for item in data:
+            output_stream.write(separator)
+            output_stream.write(encode(item))
+            separator = ','
+
+        output_stream.write('[]\n' if separator == '[' else ']\n')
 
 
 def print_json(data):
@@ -32,19 +410,68 @@ def print_json(data):
     print(json.dumps(data, indent=4, cls=json_encoder.DefaultEncoder))
 
 
-def get_config() -> Config:
-    """Gets the Config data from the local config file."""
-    with open(pathlib.Path(__file__).parent / 'config.json') as config_file:
+def get_output_stream() -> IO[str]:
+    """Gets a text stream over standard out with a large write buffer."""
+    sys.stdout.flush()
+
+    return open(sys.stdout.fileno(), 'w', buffering=OUTPUT_BUFFER_SIZE,
+                encoding='ascii', closefd=False)
+
+
+def get_config(path: Optional[str] = None) -> Config:
+    """Gets the Config data from a config file.
+
+    :param path: The config file, or None for the local config file.
+    """
+    if path is None:
+        path = DEFAULT_CONFIG_PATH
+
+    with open(path) as config_file:
         config_json = config_file.read()
 
-    return json.loads(config_json, object_hook=config_decoder)
+    return decode_config(json.loads(config_json))
+
+
+def get_auctions(decode: Callable[[Any, str], Auction] = decode_auction) -> Iterator[Auction]:
+    """Gets the Auction data from standard in, one auction at a time."""
+    return iter_auctions(sys.stdin, decode=decode)
+
+
+def get_auctions_ndjson(input_stream: IO[str],
+                        decode: Callable[[Any, str], Auction] = decode_auction
+                        ) -> Iterator[Auction]:
+    """Gets Auction data from a stream with one JSON auction per line.
+
+    Blank lines are skipped.
+
+    :param decode: Builds an auction from its parsed JSON and position.
+    """
+    for line_number, line in enumerate(input_stream, 1):
+        if line.strip():
+            yield decode(json.loads(line), 'line {}'.format(line_number))
+
+
+def get_numbered_lines(input_stream: IO[str]) -> Iterator[Tuple[int, str]]:
+    """Gets the non-blank lines of a stream with their line numbers."""
+    return ((i, x) for i, x in enumerate(input_stream, 1) if x.strip())
+
+
+def get_numbered_lines_file(path: str) -> Iterator[Tuple[int, str]]:
+    """Gets the non-blank lines of a file with their line numbers."""
+    with open(path) as input_file:
+        yield from get_numbered_lines(input_file)
+
 
+def _encoded(encoded: str, pretty: bool = False) -> str:
+    # Results from the pipeline are already encoded.
+    return encoded
 
-def get_auctions() -> List[Auction]:
-    """Gets the Auction data from standard in."""
-    auction_json = sys.stdin.read()
 
-    return json.loads(auction_json, object_hook=auction_decoder)
+def get_auctions_file(path: str,
+                      decode: Callable[[Any, str], Auction] = decode_auction) -> Iterator[Auction]:
+    """Gets Auction data from a file with one JSON auction per line."""
+    with open(path) as input_file:
+        yield from get_auctions_ndjson(input_file, decode)
 
 
 if __name__ == '__main__':
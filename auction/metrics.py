@@ -0,0 +1,93 @@
+import collections
+import json
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+# Reasons a bid is dropped before picking the winners.
+UNKNOWN_SITE = 'unknown_site'
+UNIT_NOT_IN_AUCTION = 'unit_not_in_auction'
+BIDDER_NOT_ALLOWED = 'bidder_not_allowed'
+BIDDER_NOT_CONFIGURED = 'bidder_not_configured'
+NEGATIVE_BID = 'negative_bid'
+BELOW_FLOOR = 'below_floor'
+
+
+class Metrics(object):
+    """Collects stage timings and bid counters while evaluating auctions.
+
+    Nothing is collected unless a Metrics object is passed in, so the
+    evaluation hot path doesn't pay for it when it's turned off.
+    """
+
+    def __init__(self):
+        self.stage_seconds: Dict[str, float] = collections.defaultdict(float)
+        self.auctions = 0
+        self.bids = 0
+        self.winning_bids = 0
+        self.rejections: Dict[str, int] = collections.defaultdict(int)
+        self.rejections_by_site: Dict[str, Dict[str, int]] = \
+            collections.defaultdict(lambda: collections.defaultdict(int))
+        self.rejections_by_bidder: Dict[str, Dict[str, int]] = \
+            collections.defaultdict(lambda: collections.defaultdict(int))
+
+        # Set to the ResultCache in use, if any, to include its counters.
+        self.cache = None
+        # Set to the FilteringDecoder in use, if any, to include its counters.
+        self.decoder = None
+
+    def reject(self, reason: str, site: str, bidder: str, count: int = 1):
+        """Counts bids dropped for a reason."""
+        self.rejections[reason] += count
+        self.rejections_by_site[site][reason] += count
+        self.rejections_by_bidder[bidder][reason] += count
+
+    def time_iterator(self, iterable: Iterable, stage: str) -> Iterator:
+        """Wraps an iterable, adding the time spent producing each item to a stage."""
+        perf_counter = time.perf_counter
+        stage_seconds = self.stage_seconds
+        iterator = iter(iterable)
+
+        while True:
+            start = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                stage_seconds[stage] += perf_counter() - start
+                return
+            stage_seconds[stage] += perf_counter() - start
+
+            yield item
+
+    def get_report(self) -> Dict[str, Any]:
+        """Gets all the collected metrics as JSON-serializable data."""
+        report = {
+            'auctions': self.auctions,
+            'bids': self.bids,
+            'winning_bids': self.winning_bids,
+            'stage_seconds': dict(self.stage_seconds),
+            'rejections': dict(self.rejections),
+            'rejections_by_site': dict(
+                (k, dict(v)) for k, v in self.rejections_by_site.items()),
+            'rejections_by_bidder': dict(
+                (k, dict(v)) for k, v in self.rejections_by_bidder.items()),
+        }
+        if self.cache is not None:
+            report['cache'] = self.cache.get_stats()
+        if self.decoder is not None:
+            report['decoder'] = self.decoder.get_stats()
+
+        return report
+
+    def write_report(self, path: Optional[str] = None):
+        """Writes the report as JSON to a file, or to standard error.
+
+        :param path: The file to write to, or None or '-' for standard error.
+        """
+        if path is None or path == '-':
+            json.dump(self.get_report(), sys.stderr, indent=4)
+            sys.stderr.write('\n')
+        else:
+            with open(path, 'w') as report_file:
+                json.dump(self.get_report(), report_file, indent=4)
+                report_file.write('\n')
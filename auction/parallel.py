@@ -0,0 +1,194 @@
+import collections
+import itertools
+import json
+import mmap
+import os
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .auction import AuctionHelper, Auction, Bid
+from .compiled_config import CompiledConfig
+from .config import Config
+from .json_decoder import decode_auction
+
+DEFAULT_CHUNK_SIZE = 256
+DEFAULT_RANGE_SIZE = 1024 * 1024
+
+# The helper for the current worker process, built once by the initializer.
+_worker_helper: Optional[AuctionHelper] = None
+
+# Files mapped by the current worker process, so each is only mapped once.
+_worker_files: Dict[str, mmap.mmap] = {}
+
+
+def _init_worker(config: Union[Config, CompiledConfig]):
+    global _worker_helper
+    _worker_helper = AuctionHelper(config)
+
+
+# The results a worker finished for a task, and the error that stopped it, if any.
+_TaskResults = Tuple[List[List[Bid]], Optional[Exception]]
+
+
+def _collect(results: Iterator[List[Bid]]) -> _TaskResults:
+    # The results before an error are sent back with it, so they can be
+    # written before the error is raised, as when evaluating in one process.
+    finished = []
+    try:
+        for result in results:
+            finished.append(result)
+    except Exception as e:
+        return finished, e
+
+    return finished, None
+
+
+def _evaluate_chunk(auctions: List[Auction]) -> _TaskResults:
+    return _collect(map(_worker_helper.get_winning_bids, auctions))
+
+
+def _evaluate_lines(lines: List[Tuple[int, str]]) -> _TaskResults:
+    return _collect(_worker_helper.get_winning_bids(
+                        decode_auction(json.loads(line), 'line {}'.format(line_number)))
+                    for line_number, line in lines)
+
+
+def _evaluate_ranges(ranges: List[Tuple[str, int, int]]) -> _TaskResults:
+    return _collect(_iter_range_results(ranges))
+
+
+def _iter_range_results(ranges: List[Tuple[str, int, int]]) -> Iterator[List[Bid]]:
+    for path, start, end in ranges:
+        file_map = _worker_files.get(path)
+        if file_map is None:
+            with open(path, 'rb') as input_file:
+                file_map = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+            _worker_files[path] = file_map
+
+        # Only this range is copied out of the page cache, in this process.
+        offset = start
+        for line in file_map[start:end].split(b'\n'):
+            if line.strip():
+                yield _worker_helper.get_winning_bids(
+                    decode_auction(json.loads(line), 'line at byte {}'.format(offset)))
+            offset += len(line) + 1
+
+
+def chunked(items: Iterable, chunk_size: int) -> Iterator[List]:
+    """Splits an iterable into lists of at most chunk_size items."""
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def evaluate_parallel(config: Union[Config, CompiledConfig], auctions: Iterable[Auction],
+                      workers: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Bid]]:
+    """Computes winning bids for auctions across a pool of worker processes.
+
+    Auctions are sent to the workers in chunks. Only a few chunks per worker
+    are in flight at a time, so the input is consumed lazily and results are
+    yielded in input order as soon as they are available.
+
+    Sending decoded auctions to another process costs more than evaluating
+    them, so prefer evaluate_parallel_ndjson when the input is NDJSON.
+
+    :param config: The configuration each worker builds its AuctionHelper from.
+    :param auctions: The auctions to evaluate.
+    :param workers: Number of worker processes.
+    :param chunk_size: Number of auctions sent to a worker per task.
+    :return: Returns an iterator over the winning bids of each auction.
+    """
+    return _run_pool(config, _evaluate_chunk, auctions, workers, chunk_size)
+
+
+def evaluate_parallel_ndjson(config: Union[Config, CompiledConfig], lines: Iterable[str],
+                             workers: int, chunk_size: int = DEFAULT_CHUNK_SIZE
+                             ) -> Iterator[List[Bid]]:
+    """Decodes and computes winning bids for NDJSON auctions across worker processes.
+
+    The raw lines are sent to the workers, so decoding is spread across
+    them as well. Blank lines are skipped.
+
+    :param config: The configuration each worker builds its AuctionHelper from.
+    :param lines: Lines with one JSON auction each.
+    :param workers: Number of worker processes.
+    :param chunk_size: Number of auctions sent to a worker per task.
+    :return: Returns an iterator over the winning bids of each auction.
+    """
+    numbered_lines = ((i, x) for i, x in enumerate(lines, 1) if x.strip())
+
+    return _run_pool(config, _evaluate_lines, numbered_lines, workers, chunk_size)
+
+
+def split_file(path: str, range_size: int = DEFAULT_RANGE_SIZE) -> List[Tuple[str, int, int]]:
+    """Splits a file into byte ranges of about range_size that end after a newline.
+
+    :return: Returns a list of (path, start, end) tuples covering the file.
+    """
+    ranges = []
+    with open(path, 'rb') as input_file:
+        size = os.fstat(input_file.fileno()).st_size
+        if size == 0:
+            # An empty file can't be mapped.
+            return ranges
+
+        with mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as file_map:
+            start = 0
+            while start < size:
+                end = start + range_size
+                if end >= size:
+                    end = size
+                else:
+                    newline = file_map.find(b'\n', end - 1)
+                    end = size if newline < 0 else newline + 1
+
+                ranges.append((path, start, end))
+                start = end
+
+    return ranges
+
+
+def evaluate_parallel_file(config: Union[Config, CompiledConfig], path: str, workers: int,
+                           range_size: int = DEFAULT_RANGE_SIZE) -> Iterator[List[Bid]]:
+    """Decodes and computes winning bids for an NDJSON file across worker processes.
+
+    The file is split into byte ranges aligned to newlines, and each worker
+    memory-maps the file and reads its ranges directly, so only the ranges'
+    offsets are sent to the workers. Blank lines are skipped.
+
+    :param config: The configuration each worker builds its AuctionHelper from.
+    :param path: A file with one JSON auction per line.
+    :param workers: Number of worker processes.
+    :param range_size: Approximate number of bytes read by a worker per task.
+    :return: Returns an iterator over the winning bids of each auction, in file order.
+    """
+    return _run_pool(config, _evaluate_ranges, split_file(path, range_size), workers, 1)
+
+
+def _run_pool(config: Union[Config, CompiledConfig], task: Callable[[List], _TaskResults],
+              items: Iterable, workers: int, chunk_size: int) -> Iterator[List[Bid]]:
+    # Only imported when needed, since it takes a large part of the start up time.
+    from concurrent.futures import ProcessPoolExecutor
+
+    max_pending = workers * 2
+
+    def take(future) -> Iterator[List[Bid]]:
+        results, error = future.result()
+        yield from results
+        if error is not None:
+            raise error
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(config,)) as executor:
+        pending: Deque = collections.deque()
+
+        for chunk in chunked(items, chunk_size):
+            if len(pending) >= max_pending:
+                yield from take(pending.popleft())
+
+            pending.append(executor.submit(task, chunk))
+
+        while pending:
+            yield from take(pending.popleft())
@@ -0,0 +1,128 @@
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Sequence
+
+DEFAULT_QUEUE_SIZE = 4
+
+# How often blocked threads check whether the pipeline was stopped, in seconds.
+_POLL_INTERVAL = 0.1
+
+# Sent downstream after the last batch.
+_DONE = object()
+
+
+class _Failure(object):
+    """Sent downstream in place of a batch when a stage raised an error."""
+
+    __slots__ = ('error',)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def run_pipeline(items: Iterable, stages: Sequence[Callable[[Any], Any]], batch_size: int,
+                 queue_size: int = DEFAULT_QUEUE_SIZE) -> Iterator:
+    """Runs items through a sequence of stages, each in its own thread.
+
+    Items are read from the iterable in another thread, and passed between
+    the stages in batches of batch_size through queues of at most
+    queue_size batches, so a slow stage holds back the ones before it
+    rather than letting batches pile up. Each stage handles one batch at a
+    time, so results are yielded in input order.
+
+    Threads only overlap work that releases the GIL, such as reading and
+    writing files, so this doesn't speed up CPU-bound stages.
+
+    If reading or a stage raises an error, the results of the items before
+    it are yielded first, including those earlier in the same batch, and
+    then the error is raised. If the caller stops
+    iterating, the threads stop as soon as they notice.
+
+    :param items: The items to process.
+    :param stages: Functions applied to each item in turn.
+    :param batch_size: Number of items passed between stages at a time.
+    :param queue_size: Number of batches that can wait between two stages.
+    :return: Returns an iterator over the results of the last stage.
+    """
+    stop = threading.Event()
+    queues: List[queue.Queue] = [queue.Queue(queue_size) for _ in range(len(stages) + 1)]
+
+    def put(output_queue: queue.Queue, batch) -> bool:
+        while not stop.is_set():
+            try:
+                output_queue.put(batch, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(input_queue: queue.Queue):
+        while not stop.is_set():
+            try:
+                return input_queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def read():
+        batch = []
+        try:
+            for item in items:
+                batch.append(item)
+                if len(batch) == batch_size:
+                    if not put(queues[0], batch):
+                        return
+                    batch = []
+        except BaseException as e:
+            # The items read before the error are still processed.
+            if not batch or put(queues[0], batch):
+                put(queues[0], _Failure(e))
+            return
+
+        if not batch or put(queues[0], batch):
+            put(queues[0], _DONE)
+
+    def work(stage: Callable[[Any], Any], input_queue: queue.Queue, output_queue: queue.Queue):
+        while True:
+            batch = get(input_queue)
+            if batch is _DONE or isinstance(batch, _Failure):
+                put(output_queue, batch)
+                return
+
+            results = []
+            try:
+                for x in batch:
+                    results.append(stage(x))
+            except BaseException as e:
+                # The results before the error are still passed on.
+                if not results or put(output_queue, results):
+                    put(output_queue, _Failure(e))
+                return
+
+            if not put(output_queue, results):
+                return
+
+    # The reader can be blocked on input indefinitely, so it's a daemon
+    # thread that isn't waited for when the pipeline stops early.
+    reader = threading.Thread(target=read, name='pipeline-read', daemon=True)
+    workers = [threading.Thread(target=work, args=(x, queues[i], queues[i + 1]),
+                                name='pipeline-stage-{}'.format(i), daemon=True)
+               for i, x in enumerate(stages)]
+
+    reader.start()
+    for worker in workers:
+        worker.start()
+
+    try:
+        while True:
+            batch = queues[-1].get()
+            if batch is _DONE:
+                break
+            if isinstance(batch, _Failure):
+                raise batch.error
+
+            yield from batch
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
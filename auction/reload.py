@@ -0,0 +1,82 @@
+import os
+from typing import Callable, Optional, Tuple, Union
+
+from .auction import AuctionHelper
+from .compiled_config import CompiledConfig
+from .config import Config
+
+
+class ConfigWatcher(object):
+    """Rebuilds an AuctionHelper whenever its config file changes.
+
+    The file is polled for changes to its inode, size or modification time.
+    A new helper is fully built before it replaces the live one, and both
+    are published together with a version number as the single `current`
+    tuple, so readers see either the old config or the new one, never a mix.
+    A config that fails to load or build, for any reason, is rejected and
+    the live one is kept.
+    """
+
+    def __init__(self, path: str,
+                 load_config: Callable[[str], Union[Config, CompiledConfig]],
+                 on_change: Optional[Callable[[int, Optional[Exception]], None]] = None):
+        """
+        :param path: The config file to watch.
+        :param load_config: Loads a Config or CompiledConfig from a path,
+            raising on bad data.
+        :param on_change: Called with the live version and the error (or None)
+            every time a change to the file is processed.
+        """
+        self._path = path
+        self._load_config = load_config
+        self._on_change = on_change
+
+        # The initial config has to load, since there is nothing to fall back to.
+        self._file_key = self._get_file_key()
+        self.current: Tuple[int, AuctionHelper] = (1, AuctionHelper(load_config(path)))
+        self.last_error: Optional[Exception] = None
+
+    def poll(self) -> bool:
+        """Reloads the config if the file changed.
+
+        This can take a while for a large config, so in a server it should
+        be called outside of the request handling path.
+
+        :return: Returns True if a new config was swapped in.
+        """
+        try:
+            file_key = self._get_file_key()
+        except OSError as e:
+            # The file may be in the middle of being replaced; keep the live config.
+            self.last_error = e
+            return False
+
+        if file_key == self._file_key:
+            return False
+
+        # Don't retry the same broken file on every poll.
+        self._file_key = file_key
+        version, _ = self.current
+
+        try:
+            helper = AuctionHelper(self._load_config(self._path))
+        except Exception as e:
+            # Whatever is wrong with the file, the server keeps running on the live config.
+            self.last_error = e
+            self._notify(version, e)
+            return False
+
+        self.current = (version + 1, helper)
+        self.last_error = None
+        self._notify(version + 1, None)
+
+        return True
+
+    def _get_file_key(self) -> Tuple[int, int, int]:
+        stat = os.stat(self._path)
+
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _notify(self, version: int, error: Optional[Exception]):
+        if self._on_change is not None:
+            self._on_change(version, error)
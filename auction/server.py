@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import json
+import struct
+import sys
+from typing import List, Optional
+
+from .auction import AuctionHelper
+from .cache import ResultCache, DEFAULT_MAX_BYTES
+from .json_decoder import decode_auction
+from .json_encoder import encode_winning_bids
+from .config_cache import load_compiled_config
+from .main import DEFAULT_CONFIG_PATH, non_negative_int, positive_int
+from .reload import ConfigWatcher
+
+FRAMINGS = ('ndjson', 'length')
+
+# Requests are rejected beyond this size, so a bad client can't exhaust memory.
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+_LENGTH = struct.Struct('>I')
+
+
+class AuctionServer(object):
+    """Answers auction requests from socket clients with their winning bids.
+
+    Each request is a single JSON auction. With 'ndjson' framing, requests
+    and responses are one JSON document per line. With 'length' framing,
+    each one is preceded by its size in bytes as a 4-byte big-endian
+    unsigned integer. Requests on a connection are answered in order, and
+    a request that can't be decoded or evaluated is answered with
+    {"error": message}, keeping the connection open.
+
+    With a ConfigWatcher, each request is evaluated with the live config at
+    the time it arrives. With versioned responses, the response is
+    {"config_version": version, "winning_bids": [...]} instead of just the
+    winning bids. With a ResultCache, repeated auctions are answered from it,
+    and it is cleared whenever the config is reloaded.
+    """
+
+    def __init__(self, auction_helper: Optional[AuctionHelper] = None,
+                 framing: str = 'ndjson', watcher: Optional[ConfigWatcher] = None,
+                 versioned: bool = False, cache: Optional[ResultCache] = None):
+        if framing not in FRAMINGS:
+            raise ValueError('Unknown framing: {}'.format(framing))
+        if (auction_helper is None) == (watcher is None):
+            raise ValueError('Exactly one of auction_helper and watcher must be given')
+
+        self._auction_helper = auction_helper
+        self._framing = framing
+        self._watcher = watcher
+        self._versioned = versioned
+        self.cache = cache
+
+    def handle_request(self, request: bytes) -> bytes:
+        """Computes the response to a single request."""
+        try:
+            auction = decode_auction(json.loads(request))
+        except ValueError as e:
+            return encode_error(e)
+
+        # Take the helper once, so a reload can't change it mid-auction.
+        if self._watcher is None:
+            version, auction_helper = 0, self._auction_helper
+        else:
+            version, auction_helper = self._watcher.current
+
+        try:
+            if self.cache is not None:
+                winning_bids = self.cache.get_winning_bids(auction_helper, auction)
+            else:
+                winning_bids = auction_helper.get_winning_bids(auction)
+        except Exception as e:
+            # Failing the connection would also fail the requests behind this one.
+            return encode_error(e)
+
+        response = encode_winning_bids(winning_bids)
+        if self._versioned:
+            response = '{{"config_version":{},"winning_bids":{}}}'.format(version, response)
+
+        return response.encode('ascii')
+
+    async def watch_config(self, interval: float):
+        """Polls the ConfigWatcher forever, reloading in a background thread."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            await loop.run_in_executor(None, self._watcher.poll)
+
+    async def handle_connection(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter):
+        """Answers requests from a client until it disconnects."""
+        read_frame = read_length_frame if self._framing == 'length' else read_line_frame
+        write_frame = write_length_frame if self._framing == 'length' else write_line_frame
+
+        try:
+            while True:
+                request = await read_frame(reader)
+                if request is None:
+                    break
+
+                write_frame(writer, self.handle_request(request))
+
+                # Only waits if the client isn't keeping up with the responses.
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                ValueError):
+            # The client went away, or broke the framing so we can't continue.
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: Optional[str] = None, port: int = 0,
+                    unix_path: Optional[str] = None) -> asyncio.AbstractServer:
+        """Starts listening on a TCP port, or on a Unix socket if a path is given."""
+        if unix_path is not None:
+            return await asyncio.start_unix_server(self.handle_connection, unix_path,
+                                                   limit=MAX_FRAME_SIZE)
+
+        return await asyncio.start_server(self.handle_connection, host, port,
+                                          limit=MAX_FRAME_SIZE)
+
+
+def encode_error(error: Exception) -> bytes:
+    return json.dumps({'error': str(error) or type(error).__name__}).encode('ascii')
+
+
+async def read_line_frame(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """Reads the next non-blank line, or None at the end of the stream."""
+    while True:
+        line = await reader.readline()
+        if not line:
+            return None
+        if line.strip():
+            return line
+
+
+def write_line_frame(writer: asyncio.StreamWriter, payload: bytes):
+    writer.write(payload + b'\n')
+
+
+async def read_length_frame(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """Reads the next length-prefixed frame, or None at the end of the stream."""
+    try:
+        header = await reader.readexactly(_LENGTH.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise
+
+    size, = _LENGTH.unpack(header)
+    if size > MAX_FRAME_SIZE:
+        raise ValueError('Frame of {} bytes is too large'.format(size))
+
+    return await reader.readexactly(size)
+
+
+def write_length_frame(writer: asyncio.StreamWriter, payload: bytes):
+    writer.write(_LENGTH.pack(len(payload)) + payload)
+
+
+async def serve(server: AuctionServer, args: argparse.Namespace):
+    listener = await server.start(args.host, args.port, args.unix)
+
+    async with listener:
+        if args.reload_interval > 0:
+            # If watching the config fails, the server stops with its error
+            # rather than silently never reloading again.
+            await asyncio.gather(listener.serve_forever(),
+                                 server.watch_config(args.reload_interval))
+        else:
+            await listener.serve_forever()
+
+
+def log_config_change(version: int, error: Optional[Exception]):
+    if error is None:
+        print('Loaded config version {}'.format(version), file=sys.stderr)
+    else:
+        print('Rejected config, keeping version {}: {}'.format(version, error),
+              file=sys.stderr)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parses the command-line arguments."""
+    parser = argparse.ArgumentParser(
+        prog='auction.server',
+        description='Serves winning bid computations over a socket.')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='address to listen on (default 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000,
+                        help='TCP port to listen on (default 8000)')
+    parser.add_argument('--unix', metavar='PATH',
+                        help='listen on a Unix socket instead of a TCP port')
+    parser.add_argument('--framing', choices=FRAMINGS, default='ndjson',
+                        help='one JSON document per line, or length-prefixed frames')
+    parser.add_argument('--config', default=str(DEFAULT_CONFIG_PATH),
+                        help='config file (default: auction/config.json)')
+    parser.add_argument('--reload-interval', type=float, default=1.0, metavar='SECONDS',
+                        help='how often to check the config file for changes, '
+                             'or 0 to never reload it (default 1)')
+    parser.add_argument('--versioned', action='store_true',
+                        help='include the config version in every response')
+    parser.add_argument('--cache-entries', type=non_negative_int, default=0, metavar='N',
+                        help='remember the winning bids of up to N distinct auctions '
+                             '(default 0, no cache)')
+    parser.add_argument('--cache-bytes', type=positive_int, default=DEFAULT_MAX_BYTES,
+                        metavar='N', help='most memory used by the cache, in bytes')
+
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+
+    # The config is loaded, and the helper built, once for the server's
+    # lifetime, unless the config file changes.
+    watcher = ConfigWatcher(args.config, load_compiled_config, log_config_change)
+    cache = ResultCache(args.cache_entries, args.cache_bytes) if args.cache_entries > 0 else None
+    server = AuctionServer(framing=args.framing, watcher=watcher, versioned=args.versioned,
+                           cache=cache)
+
+    try:
+        asyncio.run(serve(server, args))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if cache is not None:
+            print('Cache: {}'.format(json.dumps(cache.get_stats())), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""Evaluates NDJSON auctions across shard workers, partitioned by site.
+
+Each auction goes to the worker that owns its site, by a stable hash of
+the site name, and each worker only loads the sites it owns and the bidders
+those sites reference. Workers are separate processes reached over TCP, so
+they can run on other hosts. The coordinator sends each worker its part of
+the config, then batches of raw NDJSON lines tagged with sequence numbers,
+and writes the results back in input order.
+
+Messages use the length-prefixed framing of auction.server. A request
+frame is lines of "sequence line_number auction", and a response frame is
+lines of "sequence result", where the result is the encoded winning bids
+or "!" followed by the error for an auction that can't be decoded or
+evaluated. Lines end with "\n" only, since JSON text may contain other
+line separators such as U+2028.
+
+Usage: python -m auction.shard [--host HOST] [--port PORT]
+"""
+import argparse
+import json
+import os
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import zlib
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .auction import AuctionHelper
+from .config import Config
+from .json_decoder import decode_auction, decode_config
+from .json_encoder import DefaultEncoder, encode_winning_bids
+from .server import MAX_FRAME_SIZE
+
+DEFAULT_BATCH_SIZE = 256
+
+_LENGTH = struct.Struct('>I')
+
+# Workers are started from here, so they can import this package.
+_PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_shard(site: str, shards: int) -> int:
+    """Gets the shard owning a site.
+
+    This uses CRC-32 rather than hash(), which differs between processes.
+    """
+    return zlib.crc32(site.encode('utf-8')) % shards
+
+
+def split_config(config: Config, shards: int) -> List[Config]:
+    """Splits a config into the sites of each shard and the bidders they reference.
+
+    Sites and bidders keep their order, so duplicates resolve the same way
+    as in the full config.
+    """
+    sites = [[] for _ in range(shards)]
+    for site in config.sites:
+        sites[get_shard(site.name, shards)].append(site)
+
+    configs = []
+    for shard_sites in sites:
+        referenced = set(x for site in shard_sites for x in site.bidders)
+        configs.append(Config(shard_sites, [x for x in config.bidders if x.name in referenced]))
+
+    return configs
+
+
+def send_frame(connection: socket.socket, payload: bytes):
+    connection.sendall(_LENGTH.pack(len(payload)) + payload)
+
+
+def read_frame(stream: IO[bytes]) -> Optional[bytes]:
+    """Reads the next length-prefixed frame, or None at the end of the stream."""
+    header = stream.read(_LENGTH.size)
+    if not header:
+        return None
+    if len(header) < _LENGTH.size:
+        raise ConnectionError('Connection closed in the middle of a frame')
+
+    size, = _LENGTH.unpack(header)
+    if size > MAX_FRAME_SIZE:
+        raise ValueError('Frame of {} bytes is too large'.format(size))
+
+    payload = stream.read(size)
+    if len(payload) < size:
+        raise ConnectionError('Connection closed in the middle of a frame')
+
+    return payload
+
+
+def serve_shard(connection: socket.socket):
+    """Answers a coordinator's requests until it closes its side of the connection."""
+    with connection, connection.makefile('rb') as stream:
+        config_json = read_frame(stream)
+        if config_json is None:
+            return
+
+        auction_helper = AuctionHelper(decode_config(json.loads(config_json)))
+
+        while True:
+            request = read_frame(stream)
+            if request is None:
+                break
+
+            responses = []
+            for line in _split_lines(request):
+                sequence, line_number, auction_json = line.split(' ', 2)
+                try:
+                    result = encode_winning_bids(auction_helper.get_winning_bids(
+                        decode_auction(json.loads(auction_json), 'line ' + line_number)))
+                except Exception as e:
+                    # Reported in order by the coordinator, rather than losing the worker.
+                    result = '!' + (str(e) or type(e).__name__).replace('\n', ' ')
+                responses.append('{} {}\n'.format(sequence, result))
+
+            send_frame(connection, ''.join(responses).encode('utf-8'))
+
+
+def _split_lines(frame: bytes) -> List[str]:
+    # Unlike str.splitlines, this doesn't split on separators inside JSON strings.
+    return frame.decode('utf-8').split('\n')[:-1]
+
+
+class _Results(object):
+    """Results received from the shards, waiting to be yielded in order."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.results: Dict[int, str] = {}
+        self.error: Optional[BaseException] = None
+
+    def receive(self, connection: socket.socket):
+        """Reads response frames from a shard until it closes the connection."""
+        try:
+            with connection.makefile('rb') as stream:
+                while True:
+                    response = read_frame(stream)
+                    if response is None:
+                        return
+
+                    received = {}
+                    for line in _split_lines(response):
+                        sequence, result = line.split(' ', 1)
+                        received[int(sequence)] = result
+
+                    with self.condition:
+                        self.results.update(received)
+                        self.condition.notify()
+        except (OSError, ValueError) as e:
+            with self.condition:
+                self.error = ConnectionError('Lost a shard: {}'.format(e))
+                self.condition.notify()
+
+    def pop(self, sequence: int) -> str:
+        """Waits for the result of an auction and removes it."""
+        with self.condition:
+            while sequence not in self.results:
+                if self.error is not None:
+                    raise self.error
+                self.condition.wait()
+
+            return self.results.pop(sequence)
+
+
+def evaluate_sharded(config: Config, lines: Iterable[str], addresses: List[Tuple[str, int]],
+                     batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[str]:
+    """Evaluates NDJSON auctions on shard workers, in input order.
+
+    The coordinator only parses each line to find its site, and forwards
+    the line as is. Lines are sent in batches per shard, and at most a few
+    batches per shard are waiting for results at a time, so memory use
+    stays bounded. Blank lines are skipped.
+
+    :param config: The full configuration, split between the shards.
+    :param lines: Lines with one JSON auction each.
+    :param addresses: The (host, port) of each shard worker.
+    :param batch_size: Number of auctions sent to a shard at a time.
+    :return: Returns an iterator over the encoded winning bids of each auction.
+    :raises ValueError: If an auction can't be decoded, after the results
+        of the auctions before it.
+    """
+    shards = len(addresses)
+    max_pending = shards * batch_size * 4
+
+    results = _Results()
+    connections = [socket.create_connection(x) for x in addresses]
+    receivers = []
+
+    try:
+        for connection, shard_config in zip(connections, split_config(config, shards)):
+            send_frame(connection, json.dumps(shard_config, cls=DefaultEncoder).encode('utf-8'))
+
+            receiver = threading.Thread(target=results.receive, args=(connection,), daemon=True)
+            receiver.start()
+            receivers.append(receiver)
+
+        batches: List[List[str]] = [[] for _ in range(shards)]
+
+        def send(shard: int):
+            send_frame(connections[shard], ''.join(batches[shard]).encode('utf-8'))
+            batches[shard] = []
+
+        sequence = 0
+        next_sequence = 0
+        for line_number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                site = json.loads(line)['site']
+                shard = get_shard(site, shards) if isinstance(site, str) else 0
+            except (ValueError, TypeError, KeyError):
+                # Whichever shard gets it will report the error in order.
+                shard = 0
+
+            batches[shard].append('{} {} {}\n'.format(sequence, line_number, line))
+            sequence += 1
+            if len(batches[shard]) >= batch_size:
+                send(shard)
+
+            if sequence - next_sequence > max_pending:
+                # Results can only be waited for once everything before them was sent.
+                for i in range(shards):
+                    if batches[i]:
+                        send(i)
+
+                while sequence - next_sequence > max_pending // 2:
+                    yield _get_result(results.pop(next_sequence))
+                    next_sequence += 1
+
+        for i in range(shards):
+            if batches[i]:
+                send(i)
+            connections[i].shutdown(socket.SHUT_WR)
+
+        while next_sequence < sequence:
+            yield _get_result(results.pop(next_sequence))
+            next_sequence += 1
+    finally:
+        for connection in connections:
+            connection.close()
+        for receiver in receivers:
+            receiver.join()
+
+
+def _get_result(result: str) -> str:
+    if result.startswith('!'):
+        raise ValueError(result[1:])
+
+    return result
+
+
+class LocalShards(object):
+    """Starts shard workers as local subprocesses, for testing on one host."""
+
+    def __init__(self, shards: int):
+        self.processes: List[subprocess.Popen] = []
+        self.addresses: List[Tuple[str, int]] = []
+
+        try:
+            for _ in range(shards):
+                process = subprocess.Popen(
+                    [sys.executable, '-m', 'auction.shard', '--host', '127.0.0.1',
+                     '--port', '0'],
+                    stdout=subprocess.PIPE, cwd=_PACKAGE_PARENT)
+                self.processes.append(process)
+
+                # The worker writes its port once it is listening.
+                self.addresses.append(('127.0.0.1', int(process.stdout.readline())))
+        except (OSError, ValueError):
+            self.close()
+            raise
+
+    def close(self):
+        """Waits for the workers to exit, and kills any that don't."""
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+
+    def __enter__(self) -> 'LocalShards':
+        return self
+
+    def __exit__(self, *exc_info):
+        if exc_info[0] is not None:
+            for process in self.processes:
+                process.kill()
+        self.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog='auction.shard',
+        description='Runs a shard worker serving a single coordinator connection.')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='address to listen on (default 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=0,
+                        help='TCP port to listen on (default: any free port)')
+    args = parser.parse_args(argv)
+
+    with socket.create_server((args.host, args.port)) as listener:
+        # Tells whoever started the worker where to connect.
+        print(listener.getsockname()[1], flush=True)
+        connection, _ = listener.accept()
+
+    serve_shard(connection)
+
+
+if __name__ == '__main__':
+    main()
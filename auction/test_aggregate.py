@@ -0,0 +1,105 @@
+import math
+import random
+import unittest
+
+from .aggregate import Aggregator, QuantileSketch
+from .auction import AuctionHelper
+from .testing import get_random_workload
+
+
+class TestQuantileSketch(unittest.TestCase):
+
+    def test_quantiles_are_within_relative_accuracy(self):
+        rng = random.Random(3)
+        values = [rng.lognormvariate(3, 1.5) for _ in range(10000)] + [0] * 500
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+
+        values.sort()
+        for q in (0, 0.01, 0.25, 0.5, 0.9, 0.99, 1):
+            expected = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(expected, sketch.get_quantile(q),
+                                   delta=expected * 0.01 + 1e-9)
+
+    def test_empty_and_infinite_values(self):
+        sketch = QuantileSketch()
+        self.assertIsNone(sketch.get_quantile(0.5))
+
+        sketch.add(10)
+        sketch.add(math.inf)
+        self.assertEqual(math.inf, sketch.get_quantile(1))
+        self.assertAlmostEqual(10, sketch.get_quantile(0), delta=0.1)
+
+    def test_buckets_are_bounded(self):
+        sketch = QuantileSketch(relative_accuracy=0.01, max_buckets=64)
+        for i in range(1, 100000, 7):
+            sketch.add(i)
+
+        self.assertLessEqual(len(sketch._buckets), 64)
+        self.assertAlmostEqual(99995, sketch.get_quantile(1), delta=1000)
+
+
+class TestAggregator(unittest.TestCase):
+
+    def test_totals_match_the_results(self):
+        config, auctions = get_random_workload(23, auctions=1000)
+        auction_helper = AuctionHelper(config)
+        aggregator = Aggregator(config)
+        results = list(aggregator.observe(auction_helper.evaluate_many(
+            aggregator.track(auctions), window=16)))
+
+        report = aggregator.get_report()
+        # With duplicate bidders, the last one wins.
+        adjustments = dict((x.name, x.adjustment) for x in config.bidders)
+        winners = [x for bids in results for x in bids]
+
+        self.assertListEqual([auction_helper.get_winning_bids(x) for x in auctions], results)
+        self.assertEqual(len(auctions), report["total"]["auctions"])
+        self.assertEqual(len(winners), report["total"]["units_filled"])
+        self.assertEqual(sum(x.bid for x in winners), report["total"]["revenue"])
+        self.assertAlmostEqual(sum(x.bid * (1 + adjustments[x.bidder]) for x in winners),
+                               report["total"]["adjusted_revenue"])
+
+        site_name = config.sites[1].name
+        site = report["sites"][site_name]
+        site_auctions = [i for i, x in enumerate(auctions) if x.site == site_name]
+        units = sum(len(auctions[i].units) for i in site_auctions)
+        filled = sum(len(results[i]) for i in site_auctions)
+        self.assertEqual(len(site_auctions), site["auctions"])
+        self.assertEqual(filled, site["units_filled"])
+        self.assertEqual(filled / units, site["fill_rate"])
+
+        bidder_name = config.bidders[1].name
+        bidder = report["bidders"][bidder_name]
+        bids = sum(1 for x in auctions for y in x.bids if y.bidder == bidder_name)
+        wins = sum(1 for x in winners if x.bidder == bidder_name)
+        self.assertEqual(bids, bidder["bids"])
+        self.assertEqual(wins / bids, bidder["win_rate"])
+
+        self.assertSetEqual(set(x.name for x in config.sites), set(report["sites"]))
+        self.assertSetEqual(set(x.name for x in config.bidders), set(report["bidders"]))
+        self.assertEqual(0, report["unknown_sites"]["units_filled"])
+        self.assertEqual(sum(1 for x in auctions for y in x.bids
+                             if y.bidder not in adjustments),
+                         report["unknown_bidders"]["bids"])
+
+    def test_reports_at_intervals_and_at_the_end(self):
+        config, auctions = get_random_workload(23, auctions=1000)
+        aggregator = Aggregator(config, quantiles=[0.5])
+        reports = []
+
+        for _ in aggregator.observe(map(AuctionHelper(config).get_winning_bids,
+                                        aggregator.track(auctions)),
+                                    report_every=300, on_report=reports.append):
+            pass
+
+        self.assertListEqual([300, 600, 900, 1000], [x["total"]["auctions"] for x in reports])
+        self.assertListEqual([False, False, False, True], [x["final"] for x in reports])
+        self.assertIn("0.5", reports[-1]["bidders"][config.bidders[0].name]
+                      ["winning_bid_quantiles"])
+        self.assertEqual(0, len(aggregator._pending))
+
+
+if __name__ == '__main__':
+    unittest.main()
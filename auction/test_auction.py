@@ -1,7 +1,10 @@
+import random
 import unittest
 
-from .auction import AuctionHelper, Auction, Bid
+from .auction import AuctionHelper, Auction, Bid, UnitResult
 from .config import Config, Bidder, Site
+from .metrics import Metrics
+from .testing import get_random_workload
 
 
 class TestAuctionHelper(unittest.TestCase):
@@ -267,6 +270,144 @@ class TestAuctionHelper(unittest.TestCase):
 
         self.assertListEqual(expected_winning_bids, actual_winning_bids)
 
+    def test_winning_bid_tie_goes_to_first_bid(self):
+        config = Config([Site("houseofcheese.com", ["AUCT", "BIDD"], 32)],
+                        [Bidder("AUCT", 0), Bidder("BIDD", 0)])
+
+        auction = Auction("houseofcheese.com",
+                          ["sidebar"],
+                          [Bid("BIDD", "sidebar", 60),
+                           Bid("AUCT", "sidebar", 60)])
+
+        # Both evaluation paths must keep the first bid in input order on a tie.
+        for single_pass in (True, False):
+            auction_helper = AuctionHelper(config, single_pass=single_pass)
+
+            expected_winning_bids = [Bid("BIDD", "sidebar", 60)]
+            actual_winning_bids = auction_helper.get_winning_bids(auction)
+
+            self.assertListEqual(expected_winning_bids, actual_winning_bids)
+
+    def test_winning_bid_single_pass_matches_per_unit(self):
+        config, auctions = get_random_workload(2024, auctions=1000, max_bids=12)
+
+        single_pass_helper = AuctionHelper(config, single_pass=True)
+        per_unit_helper = AuctionHelper(config, single_pass=False)
+
+        for auction in auctions:
+            self.assertListEqual(per_unit_helper.get_winning_bids(auction),
+                                 single_pass_helper.get_winning_bids(auction))
+
+    def test_unit_results_include_clearing_price_and_top_bids(self):
+        config = Config([Site("houseofcheese.com", ["AUCT", "BIDD", "CHEZ"], 32)],
+                        [Bidder("AUCT", -0.0625), Bidder("BIDD", 0), Bidder("CHEZ", 0)])
+        auction = Auction("houseofcheese.com",
+                          ["banner", "sidebar", "footer"],
+                          [Bid("AUCT", "banner", 35),
+                           Bid("BIDD", "sidebar", 60),
+                           Bid("CHEZ", "sidebar", 60),
+                           Bid("AUCT", "sidebar", 55),
+                           Bid("BIDD", "sidebar", 40)])
+        auction_helper = AuctionHelper(config)
+
+        self.assertListEqual(
+            [UnitResult("banner", Bid("AUCT", "banner", 35), None),
+             UnitResult("sidebar", Bid("BIDD", "sidebar", 60), 60)],
+            auction_helper.get_unit_results(auction))
+        self.assertListEqual(
+            [UnitResult("banner", Bid("AUCT", "banner", 35), None,
+                        [Bid("AUCT", "banner", 35)]),
+             UnitResult("sidebar", Bid("BIDD", "sidebar", 60), 60,
+                        [Bid("BIDD", "sidebar", 60), Bid("CHEZ", "sidebar", 60),
+                         Bid("AUCT", "sidebar", 55)])],
+            auction_helper.get_unit_results(auction, top_k=3))
+
+    def test_unit_results_match_full_sort(self):
+        rng = random.Random(2025)
+        config, auctions = get_random_workload(2025, auctions=1000, max_bids=12)
+        auction_helper = AuctionHelper(config)
+
+        # With duplicate sites, the first one wins, and with duplicate bidders the last one.
+        sites = {}
+        for site in config.sites:
+            sites.setdefault(site.name, site)
+        adjustments = dict((x.name, x.adjustment) for x in config.bidders)
+
+        for auction in auctions:
+            top_k = rng.randint(1, 4)
+            site = sites.get(auction.site)
+
+            expected = []
+            for unit in auction.units if site is not None else []:
+                sorted_bids = sorted((x for x in auction.bids
+                                      if x.unit == unit and x.bidder in site.bidders and
+                                      x.bidder in adjustments and x.bid >= 0 and
+                                      auction_helper.get_adjusted_value(x) >= site.floor),
+                                     key=auction_helper.get_adjusted_value, reverse=True)
+                if sorted_bids:
+                    clearing_price = auction_helper.get_adjusted_value(sorted_bids[1]) \
+                        if len(sorted_bids) > 1 else None
+                    expected.append(UnitResult(unit, sorted_bids[0], clearing_price,
+                                               sorted_bids[:top_k]))
+
+            self.assertListEqual(expected, auction_helper.get_unit_results(auction, top_k))
+            self.assertListEqual(auction_helper.get_winning_bids(auction),
+                                 [x.winner for x in auction_helper.get_unit_results(auction)])
+
+    def test_evaluate_many_matches_get_winning_bids(self):
+        config, auctions = get_random_workload(2026, max_bids=12)
+
+        expected_metrics = Metrics()
+        expected_helper = AuctionHelper(config, metrics=expected_metrics)
+        expected = [expected_helper.get_winning_bids(x) for x in auctions]
+
+        for window in (1, 7, 256, 1000):
+            metrics = Metrics()
+            auction_helper = AuctionHelper(config, metrics=metrics)
+
+            self.assertListEqual(expected,
+                                 list(auction_helper.evaluate_many(iter(auctions), window)))
+            self.assertDictEqual(expected_metrics.get_report(), metrics.get_report())
+
+        self.assertListEqual(
+            expected, list(AuctionHelper(config, single_pass=False).evaluate_many(auctions)))
+
+    def test_evaluate_many_reads_a_window_at_a_time(self):
+        config = Config([Site("houseofcheese.com", ["AUCT"], 0)], [Bidder("AUCT", 0)])
+        read = []
+
+        def auctions():
+            for i in range(100):
+                read.append(i)
+                yield Auction("houseofcheese.com", ["banner"], [Bid("AUCT", "banner", i)])
+
+        results = AuctionHelper(config).evaluate_many(auctions(), window=10)
+
+        self.assertListEqual([Bid("AUCT", "banner", 0)], next(results))
+        self.assertEqual(10, len(read))
+        self.assertEqual(99, len(list(results)))
+
+    def test_evaluate_many_raises_read_error_after_earlier_results(self):
+        config = Config([Site("houseofcheese.com", ["AUCT"], 0)], [Bidder("AUCT", 0)])
+
+        def auctions():
+            for i in range(5):
+                yield Auction("houseofcheese.com", ["banner"], [Bid("AUCT", "banner", i)])
+            raise ValueError("line 6")
+
+        results = []
+        with self.assertRaisesRegex(ValueError, "line 6"):
+            for x in AuctionHelper(config).evaluate_many(auctions(), window=4):
+                results.append(x)
+
+        self.assertEqual(5, len(results))
+
+    def test_evaluate_many_rejects_empty_window(self):
+        auction_helper = AuctionHelper(Config([], []))
+
+        for window in (0, -1):
+            self.assertRaises(ValueError, auction_helper.evaluate_many, [], window)
+
 
 if __name__ == '__main__':
     unittest.main()
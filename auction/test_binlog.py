@@ -0,0 +1,58 @@
+import io
+import os
+import tempfile
+import unittest
+
+from .auction import AuctionHelper, Auction, Bid
+from .binlog import AuctionLog, read_log, write_log
+from .testing import get_random_workload
+
+
+def to_bytes(auctions):
+    output_file = io.BytesIO()
+    write_log(auctions, output_file)
+
+    return output_file.getvalue()
+
+
+class TestBinaryLog(unittest.TestCase):
+
+    def test_round_trip_keeps_auctions_and_value_types(self):
+        _, auctions = get_random_workload(17)
+        auctions = auctions + [
+            Auction("héllo.com", [], [Bid("AUCT", "banner", True)])]
+
+        actual_auctions = list(AuctionLog(to_bytes(auctions)))
+
+        self.assertListEqual(auctions, actual_auctions)
+        self.assertListEqual([type(x.bid) for y in auctions for x in y.bids],
+                             [type(x.bid) for y in actual_auctions for x in y.bids])
+
+    def test_replay_matches_auction_helper(self):
+        config, auctions = get_random_workload(17)
+        auction_helper = AuctionHelper(config)
+
+        with tempfile.NamedTemporaryFile(suffix=".bin", delete=False) as log_file:
+            write_log(auctions, log_file)
+        self.addCleanup(os.unlink, log_file.name)
+
+        self.assertListEqual([auction_helper.get_winning_bids(x) for x in auctions],
+                             list(read_log(log_file.name).replay(auction_helper)))
+
+    def test_empty_log(self):
+        self.assertEqual(0, len(AuctionLog(to_bytes([]))))
+
+    def test_rejects_bad_logs(self):
+        data = to_bytes(get_random_workload(17)[1])
+
+        for bad_data in (b"", b"x" * len(data), data[:len(data) // 2]):
+            with self.assertRaises(ValueError):
+                AuctionLog(bad_data)
+
+    def test_rejects_integers_that_lose_precision(self):
+        with self.assertRaises(ValueError):
+            to_bytes([Auction("houseofcheese.com", [], [Bid("AUCT", "banner", 2 ** 60)])])
+
+
+if __name__ == '__main__':
+    unittest.main()
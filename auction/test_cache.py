@@ -0,0 +1,93 @@
+import unittest
+
+from .auction import AuctionHelper, Auction, Bid
+from .cache import ResultCache
+from .config import Config, Bidder, Site
+from .metrics import Metrics, BELOW_FLOOR
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.config = Config([Site("houseofcheese.com", ["AUCT", "BIDD"], 32)],
+                             [Bidder("AUCT", -0.0625), Bidder("BIDD", 0)])
+        self.auction_helper = AuctionHelper(self.config)
+
+    def get_auction(self, sidebar_bid=60):
+        return Auction("houseofcheese.com",
+                       ["banner", "sidebar"],
+                       [Bid("AUCT", "banner", 35),
+                        Bid("BIDD", "sidebar", sidebar_bid),
+                        Bid("AUCT", "sidebar", 55)])
+
+    def test_repeated_auction_is_a_hit_with_its_own_bids(self):
+        cache = ResultCache()
+        first = cache.get_winning_bids(self.auction_helper, self.get_auction())
+
+        auction = self.get_auction()
+        second = cache.get_winning_bids(self.auction_helper, auction)
+
+        self.assertEqual(first, second)
+        self.assertIs(auction.bids[1], second[1])
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+    def test_hits_are_recorded_to_metrics(self):
+        metrics = Metrics()
+        auction_helper = AuctionHelper(self.config, metrics=metrics)
+        cache = ResultCache()
+
+        for _ in range(5):
+            cache.get_winning_bids(auction_helper, self.get_auction(sidebar_bid=20))
+
+        self.assertEqual(4, cache.hits)
+        self.assertEqual(5, metrics.auctions)
+        self.assertEqual(15, metrics.bids)
+        self.assertEqual(10, metrics.winning_bids)
+        self.assertEqual(5, metrics.rejections[BELOW_FLOOR])
+
+    def test_different_bid_is_a_miss(self):
+        cache = ResultCache()
+        cache.get_winning_bids(self.auction_helper, self.get_auction(60))
+        winning_bids = cache.get_winning_bids(self.auction_helper, self.get_auction(50))
+
+        self.assertEqual(Bid("AUCT", "sidebar", 55), winning_bids[1])
+        self.assertEqual(0, cache.hits)
+        self.assertEqual(2, cache.misses)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResultCache(max_entries=2)
+        for bid in (60, 50, 60, 40, 60):
+            cache.get_winning_bids(self.auction_helper, self.get_auction(bid))
+
+        # 50 was evicted for 40, while 60 stayed as it was used more recently.
+        self.assertEqual(2, cache.hits)
+        self.assertEqual(1, cache.evictions)
+        self.assertEqual(2, cache.get_stats()["entries"])
+
+    def test_byte_limit_is_respected(self):
+        cache = ResultCache()
+        cache.get_winning_bids(self.auction_helper, self.get_auction(60))
+        cache.max_bytes = cache.bytes
+
+        cache.get_winning_bids(self.auction_helper, self.get_auction(50))
+
+        self.assertEqual(1, cache.evictions)
+        self.assertLessEqual(cache.bytes, cache.max_bytes)
+
+    def test_new_helper_invalidates_the_cache(self):
+        cache = ResultCache()
+        cache.get_winning_bids(self.auction_helper, self.get_auction())
+
+        stricter_helper = AuctionHelper(Config([Site("houseofcheese.com", ["BIDD"], 32)],
+                                               [Bidder("BIDD", 0)]))
+        winning_bids = cache.get_winning_bids(stricter_helper, self.get_auction())
+
+        self.assertEqual([Bid("BIDD", "sidebar", 60)], winning_bids)
+        self.assertEqual(1, cache.invalidations)
+        self.assertEqual(0, cache.hits)
+        self.assertEqual(1, cache.get_stats()["entries"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import math
+import random
+import struct
+import time
+import unittest
+
+from .auction import AuctionHelper, Auction, Bid
+from .compiled_config import CompiledConfig, adjusted_value, get_bid_limits
+from .config import Config, Bidder, Site
+
+
+def reference_winning_bids(config: Config, auction: Auction):
+    """The original linear scan implementation, kept to compare against."""
+    adjustments = dict((x.name, x.adjustment) for x in config.bidders)
+    site_config = next(
+        filter(lambda i: i.name == auction.site, config.sites), None)
+
+    if site_config is None:
+        return []
+
+    winning_bids = []
+    for unit in auction.units:
+        unit_bids = [i for i in auction.bids
+                     if i.unit == unit and
+                     i.bidder in site_config.bidders and
+                     i.bidder in adjustments and
+                     i.bid >= 0 and
+                     adjusted_value(i.bid, adjustments[i.bidder]) >= site_config.floor]
+        sorted_bids = sorted(unit_bids,
+                             key=lambda i: adjusted_value(i.bid, adjustments[i.bidder]),
+                             reverse=True)
+        if len(sorted_bids) > 0:
+            winning_bids.append(sorted_bids[0])
+
+    return winning_bids
+
+
+def step_ulps(value: float, steps: int) -> float:
+    """Gets the float a number of representable values away from a non-negative one."""
+    bits = struct.unpack("<q", struct.pack("<d", value))[0]
+    return struct.unpack("<d", struct.pack("<q", max(bits + steps, 0)))[0]
+
+
+class TestCompiledConfig(unittest.TestCase):
+
+    def test_duplicate_sites_uses_first(self):
+        config = Config([Site("houseofcheese.com", ["AUCT"], 32),
+                         Site("houseofcheese.com", ["BIDD"], 28)],
+                        [Bidder("AUCT", 0), Bidder("BIDD", 0)])
+
+        compiled = CompiledConfig(config)
+
+        self.assertEqual(32, compiled.sites["houseofcheese.com"].floor)
+        self.assertEqual(frozenset(["AUCT"]),
+                         compiled.sites["houseofcheese.com"].bidders)
+
+    def test_duplicate_bidders_uses_last(self):
+        config = Config([Site("houseofcheese.com", ["AUCT"], 32)],
+                        [Bidder("AUCT", -0.0625), Bidder("AUCT", -0.07)])
+
+        compiled = CompiledConfig(config)
+
+        self.assertEqual(-0.07, compiled.adjustments["AUCT"])
+
+    def test_bidder_missing_from_config_has_no_limits(self):
+        config = Config([Site("houseofcheese.com", ["AUCT", "BIDD"], 32)],
+                        [Bidder("BIDD", 0)])
+
+        compiled = CompiledConfig(config)
+
+        self.assertNotIn("AUCT", compiled.sites["houseofcheese.com"].bid_limits)
+
+    def test_bid_limits_match_adjusted_floor_exactly(self):
+        rng = random.Random(1234)
+        for _ in range(2000):
+            floor = rng.choice([0, 32, -50, rng.uniform(-100, 100)])
+            adjustment = rng.choice([0, -0.0625, 0.5, -1, -1.5, -0.9999999, -1.0000001,
+                                     rng.uniform(-2, 2)])
+            limits = get_bid_limits(floor, adjustment)
+
+            # Probe a few ulps either side of where the adjusted value meets the floor.
+            bids = [0, 1, 35, 60, rng.uniform(0, 200)]
+            if adjustment != -1:
+                bound = abs(floor / (1 + adjustment))
+                bids.extend(step_ulps(bound, x) for x in range(-5, 6))
+            if limits is not None and 0 < limits[0] < math.inf:
+                bids.extend(step_ulps(limits[0], x) for x in range(-5, 6))
+
+            for bid in bids:
+                expected = bid >= 0 and adjusted_value(bid, adjustment) >= floor
+                within_limits = limits is not None and limits[0] <= bid <= limits[1]
+                actual = within_limits and adjusted_value(bid, adjustment) >= floor
+
+                self.assertEqual(expected, actual, (floor, adjustment, bid))
+                if adjustment > -1:
+                    # The range alone is exact for a positive adjustment factor.
+                    self.assertEqual(expected, within_limits, (floor, adjustment, bid))
+
+    def test_bid_limits_near_a_zero_factor_are_found_quickly(self):
+        for floor, adjustment in ((32, -0.9999999), (-32, -1.0000001),
+                                  (1e-300, -0.9999999999999999), (1e300, 1e-16)):
+            start = time.perf_counter()
+            get_bid_limits(floor, adjustment)
+
+            self.assertLess(time.perf_counter() - start, 0.1, (floor, adjustment))
+
+    def test_bid_near_a_negative_floor_with_a_negative_factor(self):
+        config = Config([Site("houseofcheese.com", ["AUCT"], -93.1076934375405)],
+                        [Bidder("AUCT", -1.5)])
+        auction = Auction("houseofcheese.com", ["banner"],
+                          [Bid("AUCT", "banner", 186.21538687508104)])
+
+        expected = reference_winning_bids(config, auction)
+
+        self.assertListEqual([Bid("AUCT", "banner", 186.21538687508104)], expected)
+        for single_pass in (True, False):
+            self.assertListEqual(
+                expected, AuctionHelper(config, single_pass=single_pass).get_winning_bids(auction))
+
+    def test_winning_bids_near_the_bounds_match_reference_implementation(self):
+        rng = random.Random(2468)
+        bidders = ["AUCT", "BIDD", "CHEZ"]
+
+        for _ in range(500):
+            floor = rng.choice([32, -50, rng.uniform(-100, 100)])
+            adjustments = [rng.choice([-0.0625, -1.5, -0.9999999, rng.uniform(-2, 2)])
+                           for _ in bidders]
+            config = Config([Site("houseofcheese.com", bidders, floor)],
+                            [Bidder(x, y) for x, y in zip(bidders, adjustments)])
+
+            bids = []
+            for bidder, adjustment in zip(bidders, adjustments):
+                bound = abs(floor / (1 + adjustment))
+                bids.extend(Bid(bidder, "banner", step_ulps(bound, x)) for x in range(-3, 4))
+            auction = Auction("houseofcheese.com", ["banner"], bids)
+
+            expected = reference_winning_bids(config, auction)
+            for single_pass in (True, False):
+                auction_helper = AuctionHelper(config, single_pass=single_pass)
+                self.assertListEqual(expected, auction_helper.get_winning_bids(auction))
+                self.assertListEqual(expected, next(auction_helper.evaluate_many([auction])))
+
+    def test_winning_bids_match_reference_implementation(self):
+        rng = random.Random(4321)
+        bidders = ["AUCT", "BIDD", "CHEZ", "DUPE", "EXTR"]
+        units = ["banner", "sidebar", "footer"]
+
+        for _ in range(500):
+            config = Config(
+                [Site("site{}".format(i),
+                      rng.sample(bidders, rng.randint(0, len(bidders))),
+                      rng.choice([32, 0, -50, rng.uniform(-10, 60)]))
+                 for i in range(3)],
+                [Bidder(x, rng.choice([0, -0.0625, 0.25, -1, -1.25]))
+                 for x in bidders[:-1]])
+
+            auction = Auction(
+                "site{}".format(rng.randint(0, 3)),
+                [rng.choice(units) for _ in range(rng.randint(0, 3))],
+                [Bid(rng.choice(bidders), rng.choice(units + ["other"]),
+                     rng.choice([35, 60, -5, 0, rng.uniform(-10, 100)]))
+                 for _ in range(rng.randint(0, 10))])
+
+            self.assertListEqual(reference_winning_bids(config, auction),
+                                 AuctionHelper(config).get_winning_bids(auction))
+
+
+if __name__ == '__main__':
+    unittest.main()
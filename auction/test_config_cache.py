@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+import unittest
+
+from .compiled_config import CompiledConfig
+from .config import Config, Bidder, Site
+from .config_cache import get_snapshot_path, load_compiled_config
+from .json_encoder import DefaultEncoder
+
+SAMPLE_CONFIG = Config([Site("houseofcheese.com", ["AUCT", "BIDD"], 32),
+                        Site("houseofnotcheese.com", ["AUCT"], -5)],
+                       [Bidder("AUCT", -0.0625), Bidder("BIDD", 0)])
+
+
+class TestConfigCache(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.path = os.path.join(directory.name, "config.json")
+        self.write_config(SAMPLE_CONFIG)
+
+    def write_config(self, config: Config):
+        with open(self.path, "w") as config_file:
+            json.dump(config, config_file, cls=DefaultEncoder)
+
+    def assertCompiledEqual(self, expected: CompiledConfig, actual: CompiledConfig):
+        self.assertDictEqual(expected.adjustments, actual.adjustments)
+        self.assertListEqual(
+            [(x.name, x.floor, x.bidders, x.bid_limits) for x in expected.sites.values()],
+            [(x.name, x.floor, x.bidders, x.bid_limits) for x in actual.sites.values()])
+
+    def test_snapshot_is_written_and_reused(self):
+        compiled = load_compiled_config(self.path)
+        snapshot_mtime = os.stat(get_snapshot_path(self.path)).st_mtime_ns
+
+        self.assertCompiledEqual(CompiledConfig(SAMPLE_CONFIG), compiled)
+        self.assertCompiledEqual(compiled, load_compiled_config(self.path))
+        self.assertEqual(snapshot_mtime, os.stat(get_snapshot_path(self.path)).st_mtime_ns)
+
+    def test_changed_config_is_compiled_again(self):
+        load_compiled_config(self.path)
+
+        changed_config = Config(SAMPLE_CONFIG.sites, [Bidder("AUCT", 0.5)])
+        self.write_config(changed_config)
+
+        self.assertCompiledEqual(CompiledConfig(changed_config), load_compiled_config(self.path))
+
+    def test_corrupt_snapshot_is_replaced(self):
+        load_compiled_config(self.path)
+        snapshot_path = get_snapshot_path(self.path)
+
+        with open(snapshot_path, "rb") as snapshot_file:
+            data = bytearray(snapshot_file.read())
+        data[-10] ^= 0xff
+        for corrupt_data in (bytes(data), bytes(data[:len(data) // 2]), b""):
+            with open(snapshot_path, "wb") as snapshot_file:
+                snapshot_file.write(corrupt_data)
+
+            self.assertCompiledEqual(CompiledConfig(SAMPLE_CONFIG),
+                                     load_compiled_config(self.path))
+
+        # The last load wrote a valid snapshot again.
+        self.assertGreater(os.path.getsize(snapshot_path), len(data) // 2)
+
+    def test_snapshot_can_be_disabled(self):
+        compiled = load_compiled_config(self.path, use_snapshot=False)
+
+        self.assertCompiledEqual(CompiledConfig(SAMPLE_CONFIG), compiled)
+        self.assertFalse(os.path.exists(get_snapshot_path(self.path)))
+
+    def test_invalid_config_raises(self):
+        with open(self.path, "w") as config_file:
+            config_file.write('{"sites": []}')
+
+        with self.assertRaises(ValueError):
+            load_compiled_config(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
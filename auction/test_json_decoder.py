@@ -1,9 +1,14 @@
+import io
 import json
 import unittest
 
 from .auction import AuctionHelper, Auction, Bid
 from .config import Config, Bidder, Site
-from .json_decoder import auction_decoder, config_decoder
+from .json_decoder import FilteringDecoder, SchemaError, auction_decoder, config_decoder, \
+    decode_auction, decode_auctions, decode_config, iter_auctions
+from .json_encoder import DefaultEncoder
+from .metrics import Metrics
+from .testing import get_random_workload
 
 
 class TestJsonDecoder(unittest.TestCase):
@@ -77,3 +82,231 @@ class TestJsonDecoder(unittest.TestCase):
         actual_config = json.loads(config_json, object_hook=config_decoder)
 
         self.assertEqual(expected_config, actual_config)
+
+    def test_iter_auctions_matches_json_loads_for_any_chunk_size(self):
+        auction_json = """
+[
+    {"site": "houseofcheese.com", "units": ["banner", "sidebar"],
+     "bids": [{"bidder": "AUCT", "unit": "banner", "bid": 35},
+              {"bidder": "BIDD", "unit": "sidebar", "bid": 60}]} ,
+    {"site": "houseofnotcheese.com", "units": [], "bids": []},
+    {"site": "houseofcheese.com", "units": ["sidebar"],
+     "bids": [{"bidder": "AUCT", "unit": "sidebar", "bid": 1234.5}]}
+]
+        """
+
+        expected_auctions = json.loads(auction_json, object_hook=auction_decoder)
+
+        for chunk_size in (1, 7, 64, 1024):
+            actual_auctions = list(iter_auctions(io.StringIO(auction_json),
+                                                 chunk_size=chunk_size))
+
+            self.assertListEqual(expected_auctions, actual_auctions)
+
+    def test_iter_auctions_empty_array(self):
+        self.assertListEqual([], list(iter_auctions(io.StringIO(" [ ] \n"))))
+
+    def test_iter_auctions_yields_before_reading_everything(self):
+        auction_json = '[{"site": "houseofcheese.com", "units": [], "bids": []},'
+
+        auctions = iter_auctions(io.StringIO(auction_json), chunk_size=4)
+
+        # The first auction is available even though the array is truncated.
+        self.assertEqual(Auction("houseofcheese.com", [], []), next(auctions))
+        self.assertRaises(ValueError, next, auctions)
+
+    def test_iter_auctions_rejects_malformed_input(self):
+        for auction_json in ("{}", '[{"site": "a", "units": [], "bids": []} {}',
+                             "[] []"):
+            self.assertRaises(ValueError, list,
+                              iter_auctions(io.StringIO(auction_json), chunk_size=3))
+
+    def test_iter_auctions_stops_reading_at_syntax_error(self):
+        auction = '{"site": "a", "units": [], "bids": []}'
+        auction_json = "[{},\n{} x,\n{}]".format(auction, auction, ",\n".join([auction] * 10000))
+        stream = io.StringIO(auction_json)
+
+        with self.assertRaises(json.JSONDecodeError) as context:
+            list(iter_auctions(stream, chunk_size=64))
+
+        # The error is reported without buffering the rest of the input.
+        self.assertLess(stream.tell(), 1024)
+        self.assertEqual(auction_json.index(" x") + 1, context.exception.pos)
+        self.assertEqual(2, context.exception.lineno)
+        self.assertEqual(len(auction) + 2, context.exception.colno)
+        self.assertIn("line 2 column {}".format(len(auction) + 2), str(context.exception))
+
+    def test_iter_auctions_reports_position_in_document(self):
+        auction = '{"site": "a", "units": [], "bids": []}'
+        auction_json = "[\n" + ",\n".join([auction] * 20) + ',\n{"site": "a", "units": [],}]'
+
+        for chunk_size in (1, 7, 64, 4096):
+            with self.assertRaises(json.JSONDecodeError) as context:
+                list(iter_auctions(io.StringIO(auction_json), chunk_size=chunk_size))
+
+            self.assertEqual(auction_json.index("}]"), context.exception.pos)
+            self.assertEqual(22, context.exception.lineno)
+            self.assertEqual(27, context.exception.colno)
+
+    def test_decode_auctions_matches_auction_decoder(self):
+        auction_json = """
+[
+    {"site": "houseofcheese.com", "units": ["banner", "sidebar"],
+     "bids": [{"bidder": "AUCT", "unit": "banner", "bid": 35},
+              {"bidder": "BIDD", "unit": "sidebar", "bid": 60}]},
+    {"site": "houseofnotcheese.com", "units": [], "bids": []}
+]
+        """
+
+        expected_auctions = json.loads(auction_json, object_hook=auction_decoder)
+        actual_auctions = decode_auctions(json.loads(auction_json))
+
+        self.assertListEqual(expected_auctions, actual_auctions)
+
+    def test_decode_auctions_reports_position_of_malformed_bid(self):
+        auction_json = """
+[
+    {"site": "houseofcheese.com", "units": ["banner"], "bids": []},
+    {"site": "houseofcheese.com", "units": ["banner"],
+     "bids": [{"bidder": "AUCT", "unit": "banner", "bid": 35},
+              {"bidder": "BIDD", "bid": 60}]}
+]
+        """
+
+        with self.assertRaises(SchemaError) as context:
+            decode_auctions(json.loads(auction_json))
+
+        self.assertEqual("auction 1, bid 1: missing 'unit'", str(context.exception))
+
+    def test_decode_auction_reports_bid_that_is_not_a_number(self):
+        for value in ("35", None, [35]):
+            data = {"site": "houseofcheese.com", "units": ["banner"],
+                    "bids": [{"bidder": "AUCT", "unit": "banner", "bid": 35},
+                             {"bidder": "AUCT", "unit": "banner", "bid": value}]}
+
+            with self.assertRaises(SchemaError) as context:
+                decode_auction(data, "line 3")
+
+            self.assertEqual("line 3, bid 1: 'bid' has the wrong type", str(context.exception))
+
+        self.assertEqual(Auction("houseofcheese.com", [], [Bid("AUCT", "banner", 1.5)]),
+                         decode_auction({"site": "houseofcheese.com", "units": [],
+                                         "bids": [{"bidder": "AUCT", "unit": "banner",
+                                                   "bid": 1.5}]}))
+
+    def test_decode_config_matches_config_decoder(self):
+        config_json = """
+{
+    "sites": [{"name": "houseofcheese.com", "bidders": ["AUCT", "BIDD"], "floor": 32}],
+    "bidders": [{"name": "AUCT", "adjustment": -0.0625}, {"name": "BIDD", "adjustment": 0}]
+}
+        """
+
+        expected_config = json.loads(config_json, object_hook=config_decoder)
+        actual_config = decode_config(json.loads(config_json))
+
+        self.assertEqual(expected_config, actual_config)
+
+    def test_decode_config_reports_site_without_floor(self):
+        # config_decoder would mistake this site for a Config.
+        config_json = """
+{
+    "sites": [{"name": "houseofcheese.com", "bidders": ["AUCT", "BIDD"]}],
+    "bidders": [{"name": "AUCT", "adjustment": -0.0625}]
+}
+        """
+
+        with self.assertRaises(SchemaError) as context:
+            decode_config(json.loads(config_json))
+
+        self.assertEqual("config, site 0: missing 'floor'", str(context.exception))
+
+    def test_decode_config_reports_values_that_are_not_numbers(self):
+        site = {"name": "houseofcheese.com", "bidders": ["AUCT"], "floor": 32}
+        bidder = {"name": "AUCT", "adjustment": -0.0625}
+
+        for data, expected in (
+                ({"sites": [site, dict(site, floor="1")], "bidders": [bidder]},
+                 "config, site 1: 'floor' has the wrong type"),
+                ({"sites": [site], "bidders": [dict(bidder, adjustment=None)]},
+                 "config, bidder 0: 'adjustment' has the wrong type")):
+            with self.assertRaises(SchemaError) as context:
+                decode_config(data)
+
+            self.assertEqual(expected, str(context.exception))
+
+
+def get_filtering_workload():
+    config, auctions = get_random_workload(5)
+
+    return config, json.loads(json.dumps(auctions, cls=DefaultEncoder))
+
+
+class TestFilteringDecoder(unittest.TestCase):
+
+    def test_results_match_unfiltered_decoding(self):
+        config, auctions = get_filtering_workload()
+        auction_helper = AuctionHelper(config)
+        decoder = FilteringDecoder(config)
+
+        for data in auctions:
+            auction = decode_auction(data)
+            filtered = decoder.decode_auction(data)
+
+            self.assertEqual(auction.site, filtered.site)
+            self.assertListEqual(auction.units, filtered.units)
+            self.assertListEqual(auction_helper.get_winning_bids(auction),
+                                 auction_helper.get_winning_bids(filtered))
+            self.assertListEqual(auction_helper.get_unit_results(auction, 3),
+                                 auction_helper.get_unit_results(filtered, 3))
+
+        self.assertLess(0, decoder.dropped_auctions)
+        self.assertLess(0, sum(decoder.rejections.values()))
+
+    def test_dropped_bids_are_counted_like_metrics(self):
+        config, auctions = get_filtering_workload()
+        unfiltered_metrics = Metrics()
+        filtered_metrics = Metrics()
+        decoder = FilteringDecoder(config, filtered_metrics)
+
+        for data in auctions:
+            AuctionHelper(config, metrics=unfiltered_metrics).get_winning_bids(
+                decode_auction(data))
+            AuctionHelper(config, metrics=filtered_metrics).get_winning_bids(
+                decoder.decode_auction(data))
+
+        self.assertDictEqual(unfiltered_metrics.get_report(), filtered_metrics.get_report())
+        self.assertDictEqual(unfiltered_metrics.get_report()["rejections"],
+                             decoder.get_stats()["rejections"])
+
+    def test_iter_auctions_filters_with_decoder(self):
+        config = Config([Site("houseofcheese.com", ["AUCT"], 32)], [Bidder("AUCT", 0)])
+        auction_json = json.dumps([
+            {"site": "houseofcheese.com", "units": ["banner"],
+             "bids": [{"bidder": "AUCT", "unit": "banner", "bid": 35},
+                      {"bidder": "AUCT", "unit": "banner", "bid": 10},
+                      {"bidder": "BIDD", "unit": "banner", "bid": 50}]},
+            {"site": "unknown.com", "units": ["banner"],
+             "bids": [{"bidder": "AUCT", "unit": "banner", "bid": 35}]}])
+        decoder = FilteringDecoder(config)
+
+        auctions = list(iter_auctions(io.StringIO(auction_json), decode=decoder.decode_auction))
+
+        self.assertListEqual([Auction("houseofcheese.com", ["banner"],
+                                      [Bid("AUCT", "banner", 35)]),
+                              Auction("unknown.com", ["banner"], [])], auctions)
+        self.assertDictEqual({"dropped_auctions": 1, "dropped_bids": 3,
+                              "rejections": {"below_floor": 1, "bidder_not_allowed": 1,
+                                             "unknown_site": 1}},
+                             decoder.get_stats())
+
+    def test_malformed_kept_bid_is_reported(self):
+        decoder = FilteringDecoder(Config([Site("houseofcheese.com", ["AUCT"], 32)],
+                                          [Bidder("AUCT", 0)]))
+
+        with self.assertRaises(SchemaError) as context:
+            decoder.decode_auction({"site": "houseofcheese.com", "units": ["banner"],
+                                    "bids": [{"bidder": "AUCT", "unit": "banner"}]}, "line 3")
+
+        self.assertEqual("line 3, bid 0: missing 'bid'", str(context.exception))
+
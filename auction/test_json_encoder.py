@@ -0,0 +1,71 @@
+import json
+import unittest
+
+from .auction import Auction, Bid, UnitResult
+from .config import Config, Bidder, Site
+from .json_encoder import DefaultEncoder, encode_unit_results, encode_winning_bids
+
+
+class TestJsonEncoder(unittest.TestCase):
+
+    def test_default_encoder_keeps_attribute_order(self):
+        winning_bids = [[Bid("AUCT", "banner", 35), Bid("BIDD", "sidebar", 60)]]
+
+        # This comes from output.json in the challenge.
+        expected_json = """[
+    [
+        {
+            "bidder": "AUCT",
+            "bid": 35,
+            "unit": "banner"
+        },
+        {
+            "bidder": "BIDD",
+            "bid": 60,
+            "unit": "sidebar"
+        }
+    ]
+]"""
+        actual_json = json.dumps(winning_bids, indent=4, cls=DefaultEncoder)
+
+        self.assertEqual(expected_json, actual_json)
+
+    def test_default_encoder_encodes_auctions_and_config(self):
+        auction = Auction("houseofcheese.com", ["banner"], [Bid("AUCT", "banner", 35)])
+        config = Config([Site("houseofcheese.com", ["AUCT"], 32)],
+                        [Bidder("AUCT", -0.0625)])
+
+        self.assertEqual('{"site": "houseofcheese.com", "units": ["banner"], '
+                         '"bids": [{"bidder": "AUCT", "bid": 35, "unit": "banner"}]}',
+                         json.dumps(auction, cls=DefaultEncoder))
+        self.assertEqual('{"sites": [{"name": "houseofcheese.com", "bidders": ["AUCT"], '
+                         '"floor": 32}], "bidders": [{"name": "AUCT", "adjustment": -0.0625}]}',
+                         json.dumps(config, cls=DefaultEncoder))
+
+    def test_encode_winning_bids_matches_default_encoder(self):
+        winning_bids = [Bid("AUCT", "banner", 35), Bid("BIDD", "sidebar", 60.25),
+                        Bid("CH\u00e9\"Z", "footer", 1e100), Bid("NONE", "header", float("nan"))]
+
+        for bids in ([], winning_bids):
+            self.assertEqual(json.dumps(bids, indent=4, cls=DefaultEncoder),
+                             encode_winning_bids(bids, pretty=True))
+            self.assertEqual(json.dumps(bids, separators=(",", ":"), cls=DefaultEncoder),
+                             encode_winning_bids(bids))
+
+    def test_encode_unit_results(self):
+        unit_results = [UnitResult("banner", Bid("AUCT", "banner", 35), None),
+                        UnitResult("sidebar", Bid("BIDD", "sidebar", 60), 51.5625,
+                                   [Bid("BIDD", "sidebar", 60)])]
+
+        self.assertEqual('[{"unit":"banner","winner":{"bidder":"AUCT","bid":35,"unit":"banner"},'
+                         '"clearing_price":null},'
+                         '{"unit":"sidebar","winner":{"bidder":"BIDD","bid":60,"unit":"sidebar"},'
+                         '"clearing_price":51.5625,'
+                         '"top_bids":[{"bidder":"BIDD","bid":60,"unit":"sidebar"}]}]',
+                         encode_unit_results(unit_results))
+        self.assertEqual(json.loads(encode_unit_results(unit_results)),
+                         json.loads(encode_unit_results(unit_results, pretty=True)))
+
+
+if __name__ == '__main__':
+    unittest.main()
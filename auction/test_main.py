@@ -0,0 +1,120 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from .auction import AuctionHelper, Bid
+from .config import Config, Bidder, Site
+from .json_encoder import DefaultEncoder
+from .json_decoder import SchemaError
+from .main import evaluate_pipeline, get_auctions_ndjson, parse_args, print_json_lines, \
+    print_json_stream
+
+
+def get_sample_config() -> Config:
+    return Config([Site("houseofcheese.com", ["AUCT", "BIDD"], 32)],
+                  [Bidder("AUCT", -0.0625), Bidder("BIDD", 0)])
+
+
+SAMPLE_AUCTION = {
+    "site": "houseofcheese.com",
+    "units": ["banner", "sidebar"],
+    "bids": [
+        {"bidder": "AUCT", "unit": "banner", "bid": 35},
+        {"bidder": "BIDD", "unit": "sidebar", "bid": 60},
+        {"bidder": "AUCT", "unit": "sidebar", "bid": 55}
+    ]
+}
+
+SAMPLE_RESULT = [
+    {"bidder": "AUCT", "bid": 35, "unit": "banner"},
+    {"bidder": "BIDD", "bid": 60, "unit": "sidebar"}
+]
+
+
+class TestMain(unittest.TestCase):
+
+    def test_ndjson_writes_one_result_per_line(self):
+        unknown_site = dict(SAMPLE_AUCTION, site="houseofnotcheese.com")
+        input_stream = io.StringIO(json.dumps(SAMPLE_AUCTION) + "\n\n" +
+                                   json.dumps(unknown_site) + "\n")
+        output_stream = io.StringIO()
+
+        auction_helper = AuctionHelper(get_sample_config())
+        print_json_lines(map(auction_helper.get_winning_bids,
+                             get_auctions_ndjson(input_stream)),
+                         output_stream)
+
+        lines = output_stream.getvalue().splitlines()
+
+        self.assertListEqual([SAMPLE_RESULT, []],
+                             [json.loads(x) for x in lines])
+
+    def test_print_json_stream_pretty_matches_indented_json(self):
+        results = [[Bid("AUCT", "banner", 35), Bid("BIDD", "sidebar", 60)],
+                   [],
+                   [Bid("BIDD", "sidebar", 60.5)]]
+
+        for data in ([], results):
+            output_stream = io.StringIO()
+
+            print_json_stream(iter(data), output_stream, pretty=True)
+
+            self.assertEqual(json.dumps(data, indent=4, cls=DefaultEncoder) + "\n",
+                             output_stream.getvalue())
+
+    def test_print_json_stream_compact_has_no_whitespace(self):
+        results = [[Bid("AUCT", "banner", 35), Bid("BIDD", "sidebar", 60)],
+                   [],
+                   [Bid("BIDD", "sidebar", 60.5)]]
+
+        for data in ([], results):
+            output_stream = io.StringIO()
+
+            print_json_stream(iter(data), output_stream)
+
+            self.assertEqual(json.dumps(data, separators=(",", ":"),
+                                        cls=DefaultEncoder) + "\n",
+                             output_stream.getvalue())
+
+    def test_pipeline_writes_results_before_a_bad_line(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "input.ndjson")
+            with open(path, "w") as input_file:
+                for _ in range(6):
+                    input_file.write(json.dumps(SAMPLE_AUCTION) + "\n")
+                input_file.write('{"site": "houseofcheese.com"}\n')
+
+            args = parse_args(["--input", path, "--pipeline", "--chunk-size", "4"])
+            results = []
+            with self.assertRaisesRegex(SchemaError, "line 7: missing 'units'"):
+                for x in evaluate_pipeline(get_sample_config(), args):
+                    results.append(x)
+
+        self.assertListEqual([SAMPLE_RESULT] * 6, [json.loads(x) for x in results])
+
+    def test_summary_is_rejected_with_filter_bids(self):
+        with contextlib.redirect_stderr(io.StringIO()) as error_stream:
+            with self.assertRaises(SystemExit):
+                parse_args(["--summary", "--filter-bids"])
+
+        self.assertIn("--filter-bids", error_stream.getvalue())
+
+    def test_numpy_engine_is_rejected_without_replay(self):
+        for argv in [["--engine", "numpy"], ["--engine", "numpy", "--ndjson"],
+                     ["--engine", "numpy", "--replay", "auctions.log", "--summary"]]:
+            with contextlib.redirect_stderr(io.StringIO()) as error_stream:
+                with self.assertRaises(SystemExit):
+                    parse_args(argv)
+
+            self.assertIn("--engine numpy is only supported with --replay",
+                          error_stream.getvalue())
+
+        args = parse_args(["--engine", "numpy", "--replay", "auctions.log"])
+        self.assertEqual("numpy", args.engine)
+
+
+if __name__ == '__main__':
+    unittest.main()
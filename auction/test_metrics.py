@@ -0,0 +1,51 @@
+import unittest
+
+from .auction import AuctionHelper, Auction, Bid
+from .config import Config, Bidder, Site
+from .metrics import Metrics, UNKNOWN_SITE, UNIT_NOT_IN_AUCTION, BIDDER_NOT_ALLOWED, \
+    BIDDER_NOT_CONFIGURED, NEGATIVE_BID, BELOW_FLOOR
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_auction_helper_counts_rejections_by_reason(self):
+        config = Config([Site("houseofcheese.com", ["AUCT", "BIDD", "CHEZ"], 32)],
+                        [Bidder("AUCT", -0.5), Bidder("BIDD", 0), Bidder("DUPE", 0)])
+        metrics = Metrics()
+        auction_helper = AuctionHelper(config, metrics=metrics)
+
+        auction_helper.get_winning_bids(
+            Auction("houseofcheese.com",
+                    ["banner", "sidebar"],
+                    [Bid("AUCT", "banner", 50),
+                     Bid("BIDD", "sidebar", 60),
+                     Bid("BIDD", "sidebar", 40),
+                     Bid("BIDD", "footer", 60),
+                     Bid("DUPE", "banner", 60),
+                     Bid("CHEZ", "banner", 60),
+                     Bid("BIDD", "banner", -5)]))
+        auction_helper.get_winning_bids(
+            Auction("houseofnotcheese.com", ["banner"], [Bid("BIDD", "banner", 60)]))
+
+        report = metrics.get_report()
+
+        self.assertEqual(2, report["auctions"])
+        self.assertEqual(8, report["bids"])
+        self.assertEqual(1, report["winning_bids"])
+        self.assertDictEqual({BELOW_FLOOR: 1, UNIT_NOT_IN_AUCTION: 1, BIDDER_NOT_ALLOWED: 1,
+                              BIDDER_NOT_CONFIGURED: 1, NEGATIVE_BID: 1, UNKNOWN_SITE: 1},
+                             report["rejections"])
+        self.assertDictEqual({UNKNOWN_SITE: 1},
+                             report["rejections_by_site"]["houseofnotcheese.com"])
+        self.assertDictEqual({UNIT_NOT_IN_AUCTION: 1, NEGATIVE_BID: 1, UNKNOWN_SITE: 1},
+                             report["rejections_by_bidder"]["BIDD"])
+
+    def test_time_iterator_passes_items_through(self):
+        metrics = Metrics()
+
+        self.assertListEqual([1, 2, 3], list(metrics.time_iterator([1, 2, 3], "decode")))
+        self.assertIn("decode", metrics.get_report()["stage_seconds"])
+
+
+if __name__ == '__main__':
+    unittest.main()
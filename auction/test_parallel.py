@@ -0,0 +1,106 @@
+import json
+import os
+import pickle
+import tempfile
+import unittest
+
+from .auction import AuctionHelper, Auction, Bid
+from .json_decoder import SchemaError
+from .json_encoder import DefaultEncoder
+from .parallel import chunked, evaluate_parallel, evaluate_parallel_file, \
+    evaluate_parallel_ndjson, split_file
+from .testing import get_random_workload
+
+
+class TestParallel(unittest.TestCase):
+
+    def test_chunked_splits_into_lists(self):
+        self.assertListEqual([[0, 1, 2], [3, 4, 5], [6]],
+                             list(chunked(range(7), 3)))
+        self.assertListEqual([], list(chunked([], 3)))
+
+    def test_auctions_survive_pickling(self):
+        auction = Auction("houseofcheese.com", ["banner"], [Bid("AUCT", "banner", 35)])
+
+        self.assertEqual(auction, pickle.loads(pickle.dumps(auction)))
+
+    def test_evaluate_parallel_preserves_input_order(self):
+        config, auctions = get_random_workload(7, auctions=200)
+
+        auction_helper = AuctionHelper(config)
+        expected_winning_bids = [auction_helper.get_winning_bids(x) for x in auctions]
+        actual_winning_bids = list(evaluate_parallel(config, iter(auctions),
+                                                     workers=2, chunk_size=7))
+
+        self.assertListEqual(expected_winning_bids, actual_winning_bids)
+
+    def test_evaluate_parallel_ndjson_preserves_input_order(self):
+        config, auctions = get_random_workload(7, auctions=200)
+        lines = [json.dumps(x, cls=DefaultEncoder) + "\n" for x in auctions]
+        lines.insert(3, "\n")
+
+        auction_helper = AuctionHelper(config)
+        expected_winning_bids = [auction_helper.get_winning_bids(x) for x in auctions]
+        actual_winning_bids = list(evaluate_parallel_ndjson(config, iter(lines),
+                                                            workers=2, chunk_size=7))
+
+        self.assertListEqual(expected_winning_bids, actual_winning_bids)
+
+    def write_ndjson_file(self, auctions):
+        with tempfile.NamedTemporaryFile("w", suffix=".ndjson", delete=False) as input_file:
+            for i, auction in enumerate(auctions):
+                input_file.write(json.dumps(auction, cls=DefaultEncoder) + "\n")
+                if i == 3:
+                    input_file.write("\n")
+        self.addCleanup(os.unlink, input_file.name)
+
+        return input_file.name
+
+    def test_split_file_aligns_ranges_to_lines(self):
+        _, auctions = get_random_workload(7, auctions=200)
+        path = self.write_ndjson_file(auctions)
+
+        with open(path, "rb") as input_file:
+            data = input_file.read()
+
+        ranges = split_file(path, range_size=1000)
+
+        self.assertGreater(len(ranges), 1)
+        self.assertEqual(0, ranges[0][1])
+        self.assertEqual(len(data), ranges[-1][2])
+        for (_, _, end), (_, start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(b"\n", data[end - 1:end])
+
+    def test_results_before_a_bad_line_are_kept(self):
+        config, auctions = get_random_workload(7, auctions=8)
+        lines = [json.dumps(x, cls=DefaultEncoder) + "\n" for x in auctions]
+        lines.insert(5, '{"site": "site1.com", "bids": []}\n')
+        path = self.write_ndjson_file([json.loads(x) for x in lines])
+
+        auction_helper = AuctionHelper(config)
+        expected_winning_bids = [auction_helper.get_winning_bids(x) for x in auctions[:5]]
+
+        for evaluate in (lambda: evaluate_parallel_ndjson(config, iter(lines), workers=2),
+                         lambda: evaluate_parallel_file(config, path, workers=2)):
+            actual_winning_bids = []
+            with self.assertRaisesRegex(SchemaError, "missing 'units'"):
+                for winning_bids in evaluate():
+                    actual_winning_bids.append(winning_bids)
+
+            self.assertListEqual(expected_winning_bids, actual_winning_bids)
+
+    def test_evaluate_parallel_file_preserves_file_order(self):
+        config, auctions = get_random_workload(7, auctions=200)
+        path = self.write_ndjson_file(auctions)
+
+        auction_helper = AuctionHelper(config)
+        expected_winning_bids = [auction_helper.get_winning_bids(x) for x in auctions]
+        actual_winning_bids = list(evaluate_parallel_file(config, path, workers=2,
+                                                          range_size=1000))
+
+        self.assertListEqual(expected_winning_bids, actual_winning_bids)
+
+
+if __name__ == '__main__':
+    unittest.main()
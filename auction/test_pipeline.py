@@ -0,0 +1,69 @@
+import threading
+import unittest
+
+from .pipeline import run_pipeline
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_results_are_in_input_order(self):
+        results = list(run_pipeline(range(1000), [lambda x: x * 2, str], batch_size=7,
+                                    queue_size=2))
+
+        self.assertListEqual([str(x * 2) for x in range(1000)], results)
+
+    def test_empty_input(self):
+        self.assertListEqual([], list(run_pipeline([], [str], batch_size=7)))
+
+    def test_stage_error_is_raised_after_earlier_results(self):
+        def fail_on_ten(x):
+            if x == 10:
+                raise ValueError("ten")
+            return x
+
+        results = []
+        with self.assertRaisesRegex(ValueError, "ten"):
+            for x in run_pipeline(range(100), [fail_on_ten], batch_size=5):
+                results.append(x)
+
+        self.assertListEqual(list(range(10)), results)
+
+    def test_stage_error_mid_batch_keeps_earlier_results_of_the_batch(self):
+        def fail_on_twelve(x):
+            if x == 12:
+                raise ValueError("twelve")
+            return x
+
+        results = []
+        with self.assertRaisesRegex(ValueError, "twelve"):
+            for x in run_pipeline(range(100), [fail_on_twelve, str], batch_size=5):
+                results.append(x)
+
+        self.assertListEqual([str(x) for x in range(12)], results)
+
+    def test_read_error_is_raised_after_earlier_results(self):
+        def items():
+            yield from range(3)
+            raise OSError("broken")
+
+        results = []
+        with self.assertRaises(OSError):
+            for x in run_pipeline(items(), [str], batch_size=2):
+                results.append(x)
+
+        self.assertListEqual(["0", "1", "2"], results)
+
+    def test_stopping_early_stops_the_stages(self):
+        threads = threading.active_count()
+
+        results = run_pipeline(iter(range(10 ** 9)), [str], batch_size=10, queue_size=1)
+        self.assertEqual("0", next(results))
+        results.close()
+
+        # The reader is a daemon that can take a moment to notice; the stages
+        # are waited for.
+        self.assertLessEqual(threading.active_count(), threads + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
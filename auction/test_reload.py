@@ -0,0 +1,112 @@
+import json
+import os
+import tempfile
+import unittest
+
+from .auction import Auction, Bid
+from .json_decoder import config_decoder
+from .main import get_config
+from .reload import ConfigWatcher
+
+AUCTION = Auction("houseofcheese.com", ["banner"], [Bid("AUCT", "banner", 35)])
+
+
+def write_config(path: str, floor, touch: int):
+    with open(path, "w") as config_file:
+        json.dump({"sites": [{"name": "houseofcheese.com", "bidders": ["AUCT"], "floor": floor}],
+                   "bidders": [{"name": "AUCT", "adjustment": 0}]}, config_file)
+
+    # Make sure the modification time changes, however coarse the file system's.
+    os.utime(path, ns=(touch * 10 ** 9, touch * 10 ** 9))
+
+
+class TestConfigWatcher(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "config.json")
+
+        write_config(self.path, 32, touch=1)
+
+        self.changes = []
+        self.watcher = ConfigWatcher(self.path, get_config,
+                                     lambda version, error: self.changes.append((version, error)))
+
+    def test_unchanged_file_is_not_reloaded(self):
+        self.assertFalse(self.watcher.poll())
+        self.assertEqual(1, self.watcher.current[0])
+        self.assertListEqual([], self.changes)
+
+    def test_changed_file_swaps_in_new_helper(self):
+        _, old_helper = self.watcher.current
+
+        write_config(self.path, 40, touch=2)
+
+        self.assertTrue(self.watcher.poll())
+
+        version, new_helper = self.watcher.current
+        self.assertEqual(2, version)
+        self.assertListEqual([(2, None)], self.changes)
+
+        # The old helper keeps working for anything still using it.
+        self.assertListEqual([Bid("AUCT", "banner", 35)], old_helper.get_winning_bids(AUCTION))
+        self.assertListEqual([], new_helper.get_winning_bids(AUCTION))
+
+    def test_bad_config_keeps_live_helper(self):
+        current = self.watcher.current
+
+        with open(self.path, "w") as config_file:
+            config_file.write('{"sites": [')
+        os.utime(self.path, ns=(2 * 10 ** 9, 2 * 10 ** 9))
+
+        self.assertFalse(self.watcher.poll())
+        self.assertIs(current, self.watcher.current)
+        self.assertIsInstance(self.watcher.last_error, ValueError)
+        self.assertEqual(1, self.changes[0][0])
+
+        # The broken file is only tried once.
+        self.assertFalse(self.watcher.poll())
+        self.assertEqual(1, len(self.changes))
+
+        # Once it's fixed, it's picked up.
+        write_config(self.path, 40, touch=3)
+
+        self.assertTrue(self.watcher.poll())
+        self.assertEqual(2, self.watcher.current[0])
+
+    def test_wrongly_typed_config_keeps_live_helper(self):
+        current = self.watcher.current
+
+        write_config(self.path, "1", touch=2)
+
+        self.assertFalse(self.watcher.poll())
+        self.assertIs(current, self.watcher.current)
+        self.assertIsInstance(self.watcher.last_error, ValueError)
+
+    def test_config_failing_to_build_keeps_live_helper(self):
+        def load_unchecked_config(path):
+            # Unlike get_config, this doesn't check types, so building the helper fails.
+            with open(path) as config_file:
+                return json.load(config_file, object_hook=config_decoder)
+
+        watcher = ConfigWatcher(self.path, load_unchecked_config)
+        current = watcher.current
+
+        write_config(self.path, None, touch=2)
+
+        self.assertFalse(watcher.poll())
+        self.assertIs(current, watcher.current)
+        self.assertIsInstance(watcher.last_error, TypeError)
+
+    def test_missing_file_keeps_live_helper(self):
+        current = self.watcher.current
+
+        os.unlink(self.path)
+
+        self.assertFalse(self.watcher.poll())
+        self.assertIs(current, self.watcher.current)
+
+
+if __name__ == '__main__':
+    unittest.main()
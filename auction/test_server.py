@@ -0,0 +1,108 @@
+import asyncio
+import json
+import struct
+import unittest
+
+from .auction import AuctionHelper
+from .config import Config, Bidder, Site
+from .server import AuctionServer
+
+SAMPLE_AUCTION = json.dumps({
+    "site": "houseofcheese.com",
+    "units": ["banner", "sidebar"],
+    "bids": [
+        {"bidder": "AUCT", "unit": "banner", "bid": 35},
+        {"bidder": "BIDD", "unit": "sidebar", "bid": 60},
+        {"bidder": "AUCT", "unit": "sidebar", "bid": 55}
+    ]
+}).encode()
+
+SAMPLE_RESULT = [
+    {"bidder": "AUCT", "bid": 35, "unit": "banner"},
+    {"bidder": "BIDD", "bid": 60, "unit": "sidebar"}
+]
+
+
+class FailingAuctionHelper(AuctionHelper):
+
+    def get_winning_bids(self, auction):
+        if auction.site == "fail.com":
+            raise TypeError("can't evaluate fail.com")
+
+        return super().get_winning_bids(auction)
+
+
+class TestAuctionServer(unittest.IsolatedAsyncioTestCase):
+
+    async def start_server(self, framing, versioned=False, auction_helper_type=AuctionHelper):
+        config = Config([Site("houseofcheese.com", ["AUCT", "BIDD"], 32)],
+                        [Bidder("AUCT", -0.0625), Bidder("BIDD", 0)])
+        server = AuctionServer(auction_helper_type(config), framing, versioned=versioned)
+
+        listener = await server.start("127.0.0.1", 0)
+        self.addAsyncCleanup(listener.wait_closed)
+        self.addCleanup(listener.close)
+
+        return await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+
+    async def test_ndjson_requests_are_answered_in_order(self):
+        reader, writer = await self.start_server("ndjson")
+
+        writer.write(SAMPLE_AUCTION + b"\n\n" + b'{"site": "x"}\n' + SAMPLE_AUCTION + b"\n")
+        responses = [json.loads(await reader.readline()) for _ in range(3)]
+        writer.close()
+
+        self.assertEqual(SAMPLE_RESULT, responses[0])
+        self.assertEqual("auction: missing 'units'", responses[1]["error"])
+        self.assertEqual(SAMPLE_RESULT, responses[2])
+
+    async def test_bids_that_are_not_numbers_are_answered_with_errors(self):
+        reader, writer = await self.start_server("ndjson")
+
+        for value in ('"35"', "null"):
+            writer.write(b'{"site": "houseofcheese.com", "units": ["banner"], '
+                         b'"bids": [{"bidder": "AUCT", "unit": "banner", "bid": ' +
+                         value.encode() + b"}]}\n")
+        writer.write(SAMPLE_AUCTION + b"\n")
+        responses = [json.loads(await reader.readline()) for _ in range(3)]
+        writer.close()
+
+        for response in responses[:2]:
+            self.assertEqual("auction, bid 0: 'bid' has the wrong type", response["error"])
+        self.assertEqual(SAMPLE_RESULT, responses[2])
+
+    async def test_evaluation_errors_keep_the_connection_open(self):
+        reader, writer = await self.start_server("ndjson",
+                                                 auction_helper_type=FailingAuctionHelper)
+
+        writer.write(b'{"site": "fail.com", "units": [], "bids": []}\n' + SAMPLE_AUCTION + b"\n")
+        responses = [json.loads(await reader.readline()) for _ in range(2)]
+        writer.close()
+
+        self.assertEqual({"error": "can't evaluate fail.com"}, responses[0])
+        self.assertEqual(SAMPLE_RESULT, responses[1])
+
+    async def test_length_prefixed_requests(self):
+        reader, writer = await self.start_server("length")
+
+        for _ in range(2):
+            writer.write(struct.pack(">I", len(SAMPLE_AUCTION)) + SAMPLE_AUCTION)
+
+        for _ in range(2):
+            size, = struct.unpack(">I", await reader.readexactly(4))
+            self.assertEqual(SAMPLE_RESULT, json.loads(await reader.readexactly(size)))
+
+        writer.close()
+
+    async def test_versioned_responses_include_config_version(self):
+        reader, writer = await self.start_server("ndjson", versioned=True)
+
+        writer.write(SAMPLE_AUCTION + b"\n")
+        response = json.loads(await reader.readline())
+        writer.close()
+
+        self.assertEqual({"config_version": 0, "winning_bids": SAMPLE_RESULT}, response)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import json
+import unittest
+
+from .auction import AuctionHelper, Auction, Bid
+from .config import Config, Bidder, Site
+from .json_encoder import DefaultEncoder, encode_winning_bids
+from .shard import LocalShards, evaluate_sharded, get_shard, split_config
+from .testing import get_random_workload
+
+
+class TestShard(unittest.TestCase):
+
+    def test_get_shard_is_stable(self):
+        # CRC-32 of the name, the same in every process.
+        self.assertEqual(0x228f269f % 3, get_shard("houseofcheese.com", 3))
+        self.assertEqual(0, get_shard("houseofcheese.com", 1))
+
+    def test_split_config_keeps_referenced_bidders(self):
+        config = Config([Site("a.com", ["AUCT"], 10), Site("b.com", ["BIDD"], 20),
+                         Site("c.com", ["AUCT", "BIDD"], 30)],
+                        [Bidder("AUCT", 0), Bidder("BIDD", 0.5), Bidder("UNUSED", 1),
+                         Bidder("AUCT", -0.5)])
+
+        configs = split_config(config, 2)
+
+        self.assertEqual(2, len(configs))
+        self.assertListEqual(config.sites,
+                             sorted((x for c in configs for x in c.sites),
+                                    key=lambda x: x.name))
+        for i, shard_config in enumerate(configs):
+            referenced = set(x for site in shard_config.sites for x in site.bidders)
+            self.assertTrue(all(get_shard(x.name, 2) == i for x in shard_config.sites))
+            self.assertListEqual([x for x in config.bidders if x.name in referenced],
+                                 shard_config.bidders)
+
+    def test_results_match_a_single_process_in_input_order(self):
+        config, auctions = get_random_workload(11, auctions=300, sites=8, bidders=6)
+        auction_helper = AuctionHelper(config)
+        expected = [encode_winning_bids(auction_helper.get_winning_bids(x)) for x in auctions]
+
+        lines = [json.dumps(x, cls=DefaultEncoder) + "\n" for x in auctions]
+        lines.insert(10, "\n")
+        with LocalShards(3) as shards:
+            actual = list(evaluate_sharded(config, lines, shards.addresses, batch_size=4))
+
+        self.assertListEqual(expected, actual)
+
+    def test_names_with_line_separators_are_kept(self):
+        name = "line\u2028separated\x85"
+        config = Config([Site(name, ["AUCT"], 0)], [Bidder("AUCT", 0)])
+        auction = Auction(name, ["banner\u2029"], [Bid("AUCT", "banner\u2029", 35)])
+        lines = [json.dumps(auction, cls=DefaultEncoder, ensure_ascii=False)] * 3
+
+        with LocalShards(2) as shards:
+            actual = list(evaluate_sharded(config, lines, shards.addresses, batch_size=2))
+
+        expected = encode_winning_bids(AuctionHelper(config).get_winning_bids(auction))
+        self.assertListEqual([expected] * 3, actual)
+
+    def test_bid_that_is_not_a_number_is_reported_in_order(self):
+        config, auctions = get_random_workload(11, auctions=300, sites=8, bidders=6)
+        lines = [json.dumps(x, cls=DefaultEncoder) for x in auctions[:20]]
+        lines.insert(7, '{"site": "site1.com", "units": ["banner"], '
+                        '"bids": [{"bidder": "BIDDER0", "unit": "banner", "bid": "35"}]}')
+
+        results = []
+        with LocalShards(2) as shards:
+            with self.assertRaisesRegex(ValueError, "line 8, bid 0: 'bid' has the wrong type"):
+                for x in evaluate_sharded(config, lines, shards.addresses, batch_size=3):
+                    results.append(x)
+
+        self.assertEqual(7, len(results))
+
+    def test_error_is_raised_after_earlier_results(self):
+        config, auctions = get_random_workload(11, auctions=300, sites=8, bidders=6)
+        lines = [json.dumps(x, cls=DefaultEncoder) for x in auctions[:20]]
+        lines.insert(5, '{"site": "site1.com", "units": []}')
+
+        results = []
+        with LocalShards(2) as shards:
+            with self.assertRaisesRegex(ValueError, "line 6"):
+                for x in evaluate_sharded(config, lines, shards.addresses, batch_size=3):
+                    results.append(x)
+
+        self.assertEqual(5, len(results))
+
+
+if __name__ == '__main__':
+    unittest.main()
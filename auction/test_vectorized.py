@@ -0,0 +1,90 @@
+import io
+import unittest
+
+from .auction import AuctionHelper, Auction, Bid
+from .binlog import AuctionLog, write_log
+from .config import Config, Bidder, Site
+from .testing import get_random_workload
+
+try:
+    from .vectorized import VectorizedAuctionHelper, evaluate_batched
+except ImportError:  # NumPy is not installed.
+    VectorizedAuctionHelper = None
+
+
+def _get_log_bytes(auctions):
+    log_file = io.BytesIO()
+    write_log(auctions, log_file)
+
+    return log_file.getvalue()
+
+
+@unittest.skipIf(VectorizedAuctionHelper is None, "requires numpy")
+class TestVectorizedAuctionHelper(unittest.TestCase):
+
+    def test_winning_bid_passes_provided_test_sample_works(self):
+        config = Config([Site("houseofcheese.com", ["AUCT", "BIDD"], 32)],
+                        [Bidder("AUCT", -0.0625), Bidder("BIDD", 0)])
+
+        auction = Auction("houseofcheese.com",
+                          ["banner", "sidebar"],
+                          [Bid("AUCT", "banner", 35),
+                           Bid("BIDD", "sidebar", 60),
+                           Bid("AUCT", "sidebar", 55)])
+
+        helper = VectorizedAuctionHelper(config)
+
+        expected_winning_bids = [[Bid("AUCT", "banner", 35),
+                                  Bid("BIDD", "sidebar", 60)]]
+        actual_winning_bids = helper.get_winning_bids([auction])
+
+        self.assertListEqual(expected_winning_bids, actual_winning_bids)
+
+    def test_empty_config_and_batch(self):
+        helper = VectorizedAuctionHelper(Config([], []))
+
+        self.assertListEqual([], helper.get_winning_bids([]))
+        self.assertListEqual([[]], helper.get_winning_bids(
+            [Auction("houseofcheese.com", ["banner"], [Bid("AUCT", "banner", 35)])]))
+
+    def test_bid_near_a_negative_floor_with_a_negative_factor(self):
+        # Rounding makes the next lower bid miss the floor, but not this one.
+        config = Config([Site("houseofcheese.com", ["AUCT"], -93.1076934375405)],
+                        [Bidder("AUCT", -1.5)])
+        auction = Auction("houseofcheese.com", ["banner"],
+                          [Bid("AUCT", "banner", 186.21538687508104)])
+
+        self.assertListEqual([AuctionHelper(config).get_winning_bids(auction)],
+                             VectorizedAuctionHelper(config).get_winning_bids([auction]))
+        self.assertListEqual([[Bid("AUCT", "banner", 186.21538687508104)]],
+                             VectorizedAuctionHelper(config).get_winning_bids([auction]))
+
+    def test_winning_bids_match_auction_helper(self):
+        config, auctions = get_random_workload(99, auctions=2000, sites=6, bidders=5,
+                                               max_bids=12)
+
+        auction_helper = AuctionHelper(config)
+        expected_winning_bids = [auction_helper.get_winning_bids(x) for x in auctions]
+        actual_winning_bids = list(evaluate_batched(VectorizedAuctionHelper(config),
+                                                    iter(auctions), batch_size=300))
+
+        self.assertListEqual(expected_winning_bids, actual_winning_bids)
+
+    def test_replay_matches_auction_helper(self):
+        config, auctions = get_random_workload(99, auctions=2000, sites=6, bidders=5,
+                                               max_bids=12)
+        auctions.append(Auction("site1.com", [], []))
+        auctions.append(Auction("site0.com", ["banner"], [Bid("BIDDER1", "banner", True)]))
+
+        auction_helper = AuctionHelper(config)
+        expected_winning_bids = [auction_helper.get_winning_bids(x) for x in auctions]
+        actual_winning_bids = list(VectorizedAuctionHelper(config).replay(
+            AuctionLog(_get_log_bytes(auctions)), batch_size=300))
+
+        self.assertListEqual(expected_winning_bids, actual_winning_bids)
+        self.assertListEqual([], list(VectorizedAuctionHelper(config).replay(
+            AuctionLog(_get_log_bytes([])))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""Random workloads shared by the tests."""
+import random
+from typing import List, Tuple
+
+from .auction import Auction, Bid
+from .config import Config, Bidder, Site
+
+UNITS = ["banner", "sidebar", "footer"]
+
+
+def get_random_workload(seed: int, auctions: int = 500, sites: int = 4, bidders: int = 4,
+                        max_bids: int = 8) -> Tuple[Config, List[Auction]]:
+    """Gets a random config and auctions to evaluate against it, the same for a seed.
+
+    The config has the sites site0.com, site1.com, ... with floors of 0, 32
+    or a random float, each allowing some of the bidders BIDDER0, BIDDER1,
+    ... and the bidder GONE, which isn't configured. Some adjustments make
+    every bid zero or negative. Site site0.com and bidder BIDDER0 are
+    configured twice, with a negative floor and another adjustment.
+
+    The auctions are for those sites and unknown.com, with up to three
+    units from UNITS, some of them repeated. Their bids are from any of the
+    bidders, GONE or OTHER, for any unit or one not in the auction, and
+    worth between -10 and 100 as an int or a float, so every reason a bid
+    can be dropped comes up, as do ties.
+
+    :param seed: The seed of the random numbers.
+    :param auctions: The number of auctions.
+    :param sites: The number of sites in the config.
+    :param bidders: The number of bidders in the config.
+    :param max_bids: The most bids of an auction.
+    :return: Returns the config and the auctions.
+    """
+    rng = random.Random(seed)
+    bidder_names = ["BIDDER{}".format(i) for i in range(bidders)]
+
+    config = Config([Site("site{}.com".format(i),
+                          rng.sample(bidder_names, rng.randint(1, bidders)) + ["GONE"],
+                          rng.choice([0, 32, rng.uniform(-10, 60)]))
+                     for i in range(sites)] +
+                    [Site("site0.com", bidder_names, -50)],
+                    [Bidder(x, rng.choice([-0.0625, 0, 0.25, -1, -2])) for x in bidder_names] +
+                    [Bidder("BIDDER0", 0.1)])
+
+    site_names = ["site{}.com".format(i) for i in range(sites)] + ["unknown.com"]
+    bid_bidders = bidder_names + ["GONE", "OTHER"]
+    auction_list = [Auction(rng.choice(site_names),
+                            [rng.choice(UNITS) for _ in range(rng.randint(0, 3))],
+                            [Bid(rng.choice(bid_bidders), rng.choice(UNITS + ["other"]),
+                                 rng.choice([rng.randint(-10, 100), rng.uniform(-10, 100)]))
+                             for _ in range(rng.randint(0, max_bids))])
+                    for _ in range(auctions)]
+
+    return config, auction_list
@@ -0,0 +1,5 @@
+"""Performance benchmarks for the auction module.
+
+Each benchmark is a module that can be run with ``python -m benchmarks.<name>``
+and prints its results as JSON.
+"""
@@ -0,0 +1,77 @@
+"""Measures auction decoding throughput.
+
+The object_hook based auction_decoder is compared against the schema
+directed decoders: decode_auctions on a fully parsed document, and
+iter_auctions, which decodes each auction as soon as it is parsed (the
+path used by auction.main). The streaming decoder is also measured with a
+FilteringDecoder (--filter-bids), along with how many Bid objects each
+variant creates.
+
+Usage: python -m benchmarks.decode [workload options] [--repeat N]
+"""
+import argparse
+import io
+import json
+import time
+
+from auction.json_decoder import FilteringDecoder, auction_decoder, decode_auctions, \
+    decode_config, iter_auctions
+
+from .report import write_report
+from .workload import add_workload_arguments, generate_auctions, generate_config, \
+    get_workload_options, workload_summary
+
+
+def measure(decode, input_json: str, repeat: int) -> float:
+    """Gets the best time in seconds taken to decode the input."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decode(input_json)
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='benchmarks.decode')
+    add_workload_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    options = get_workload_options(args)
+    config_json = generate_config(options)
+    input_json = json.dumps(list(generate_auctions(config_json, args.auctions, options)))
+    config = decode_config(config_json)
+
+    object_hook = measure(lambda x: json.loads(x, object_hook=auction_decoder),
+                          input_json, args.repeat)
+    schema = measure(lambda x: decode_auctions(json.loads(x)),
+                     input_json, args.repeat)
+    streaming = measure(lambda x: list(iter_auctions(io.StringIO(x))),
+                        input_json, args.repeat)
+    filtered = measure(
+        lambda x: list(iter_auctions(io.StringIO(x),
+                                     decode=FilteringDecoder(config).decode_auction)),
+        input_json, args.repeat)
+
+    bids = sum(len(x.bids) for x in iter_auctions(io.StringIO(input_json)))
+    decoder = FilteringDecoder(config)
+    filtered_bids = sum(len(x.bids) for x in iter_auctions(io.StringIO(input_json),
+                                                           decode=decoder.decode_auction))
+
+    write_report({
+        'benchmark': 'decode',
+        'workload': workload_summary(args),
+        'object_hook_auctions_per_second': args.auctions / object_hook,
+        'schema_auctions_per_second': args.auctions / schema,
+        'schema_streaming_auctions_per_second': args.auctions / streaming,
+        'filtered_streaming_auctions_per_second': args.auctions / filtered,
+        'bids_created': bids,
+        'filtered_bids_created': filtered_bids,
+        'filtered': decoder.get_stats(),
+    })
+
+
+if __name__ == '__main__':
+    main()
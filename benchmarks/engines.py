@@ -0,0 +1,74 @@
+"""Compares the evaluation throughput of the python and numpy engines.
+
+Both engines are timed on decoded Auction objects, which the numpy engine
+first has to encode into columns, and on a binary auction log, whose
+columns the numpy engine uses in place. Requires NumPy.
+
+Usage: python -m benchmarks.engines [workload options] [--batch-size N] [--repeat N]
+"""
+import argparse
+import io
+import time
+from typing import Callable, Iterable
+
+from auction.auction import AuctionHelper
+from auction.binlog import AuctionLog, write_log
+from auction.json_decoder import decode_auction, decode_config
+from auction.vectorized import DEFAULT_BATCH_SIZE, VectorizedAuctionHelper, evaluate_batched
+
+from .report import write_report
+from .workload import add_workload_arguments, generate_auctions, generate_config, \
+    get_workload_options, workload_summary
+
+
+def measure(evaluate: Callable[[], Iterable], repeat: int) -> float:
+    """Gets the best time in seconds taken to get every result."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in evaluate():
+            pass
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='benchmarks.engines')
+    add_workload_arguments(parser)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    options = get_workload_options(args)
+    config_json = generate_config(options)
+    config = decode_config(config_json)
+    auctions = [decode_auction(x) for x in generate_auctions(config_json, args.auctions, options)]
+
+    log_file = io.BytesIO()
+    write_log(auctions, log_file)
+    log = AuctionLog(log_file.getvalue())
+
+    auction_helper = AuctionHelper(config)
+    vectorized_helper = VectorizedAuctionHelper(config)
+
+    python_objects = measure(lambda: map(auction_helper.get_winning_bids, auctions),
+                             args.repeat)
+    numpy_objects = measure(
+        lambda: evaluate_batched(vectorized_helper, auctions, args.batch_size), args.repeat)
+    python_log = measure(lambda: log.replay(auction_helper), args.repeat)
+    numpy_log = measure(lambda: vectorized_helper.replay(log, args.batch_size), args.repeat)
+
+    write_report({
+        'benchmark': 'engines',
+        'workload': workload_summary(args),
+        'batch_size': args.batch_size,
+        'python_objects_auctions_per_second': args.auctions / python_objects,
+        'numpy_objects_auctions_per_second': args.auctions / numpy_objects,
+        'python_log_auctions_per_second': args.auctions / python_log,
+        'numpy_log_auctions_per_second': args.auctions / numpy_log,
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Load-tests auction.server and reports latency percentiles and requests per second.
+
+Each connection sends one request at a time and waits for its response.
+With --spawn-server, a server is started on a free local port with a
+config matching the generated auctions; otherwise, the server being tested
+must have been started with the config from
+``python -m benchmarks.workload --config-output`` using the same workload
+options.
+
+Usage: python -m benchmarks.loadtest [workload options] [--spawn-server]
+                                     [--host HOST --port PORT | --unix PATH]
+                                     [--framing ndjson|length] [--connections N]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+from auction.server import FRAMINGS, read_length_frame, read_line_frame, \
+    write_length_frame, write_line_frame
+
+from .report import percentiles, write_report
+from .workload import add_workload_arguments, generate_auctions, generate_config, \
+    get_workload_options, workload_summary
+
+
+async def run_connection(args: argparse.Namespace, requests: List[bytes],
+                         latencies: List[float]):
+    if args.unix is not None:
+        reader, writer = await asyncio.open_unix_connection(args.unix)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+
+    read_frame = read_length_frame if args.framing == 'length' else read_line_frame
+    write_frame = write_length_frame if args.framing == 'length' else write_line_frame
+    perf_counter = time.perf_counter
+
+    for request in requests:
+        start = perf_counter()
+        write_frame(writer, request)
+        await writer.drain()
+        await read_frame(reader)
+        latencies.append(perf_counter() - start)
+
+    writer.close()
+
+
+async def run_load(args: argparse.Namespace, requests: List[bytes]) -> List[float]:
+    latencies: List[float] = []
+    await asyncio.gather(*(run_connection(args, requests[i::args.connections], latencies)
+                           for i in range(args.connections)))
+
+    return latencies
+
+
+def wait_for_port(host: str, port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def get_free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='benchmarks.loadtest')
+    add_workload_arguments(parser)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--unix', metavar='PATH')
+    parser.add_argument('--framing', choices=FRAMINGS, default='ndjson')
+    parser.add_argument('--connections', type=int, default=16)
+    parser.add_argument('--spawn-server', action='store_true',
+                        help='start a local server with the generated config to test')
+    parser.add_argument('--output', help='write the report to a file instead of standard out')
+    args = parser.parse_args()
+
+    options = get_workload_options(args)
+    config_json = generate_config(options)
+    requests = [json.dumps(x).encode('ascii')
+                for x in generate_auctions(config_json, args.auctions, options)]
+
+    server = None
+    config_file = None
+    if args.spawn_server:
+        config_file = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False)
+        with config_file:
+            json.dump(config_json, config_file)
+
+        args.unix = None
+        args.port = get_free_port()
+        server = subprocess.Popen([sys.executable, '-m', 'auction.server',
+                                   '--host', args.host, '--port', str(args.port),
+                                   '--framing', args.framing, '--config', config_file.name])
+        wait_for_port(args.host, args.port)
+
+    try:
+        start = time.perf_counter()
+        latencies = asyncio.run(run_load(args, requests))
+        seconds = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+            os.unlink(config_file.name)
+
+    write_report({
+        'benchmark': 'loadtest',
+        'workload': workload_summary(args),
+        'framing': args.framing,
+        'connections': args.connections,
+        'requests': len(latencies),
+        'requests_per_second': len(latencies) / seconds,
+        'latency_ms': dict((key, value * 1e3) for key, value in percentiles(latencies).items()),
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
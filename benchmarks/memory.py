@@ -0,0 +1,72 @@
+"""Measures the memory used per decoded bid.
+
+The current slotted, interned objects are compared against plain
+``__dict__``-backed objects without interning, which is how auctions were
+represented before.
+
+Usage: python -m benchmarks.memory [workload options]
+"""
+import argparse
+import json
+import tracemalloc
+
+from auction.json_decoder import auction_decoder
+
+from .report import write_report
+from .workload import add_workload_arguments, generate_input, get_workload_options, \
+    workload_summary
+
+
+class PlainBid(object):
+    def __init__(self, bidder, unit, bid):
+        self.bidder = bidder
+        self.bid = bid
+        self.unit = unit
+
+
+class PlainAuction(object):
+    def __init__(self, site, units, bids):
+        self.site = site
+        self.units = units
+        self.bids = bids
+
+
+def plain_auction_decoder(data):
+    if 'bidder' in data and 'unit' in data and 'bid' in data:
+        return PlainBid(data['bidder'], data['unit'], data['bid'])
+    return PlainAuction(data['site'], data['units'], data['bids'])
+
+
+def measure(input_json: str, object_hook) -> int:
+    """Gets the bytes still allocated after decoding the input."""
+    tracemalloc.start()
+    auctions = json.loads(input_json, object_hook=object_hook)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del auctions
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='benchmarks.memory')
+    add_workload_arguments(parser)
+    args = parser.parse_args()
+
+    input_json = generate_input(args.auctions, get_workload_options(args))
+    bids = input_json.count('"bidder"')
+
+    before = measure(input_json, plain_auction_decoder)
+    after = measure(input_json, auction_decoder)
+
+    write_report({
+        'benchmark': 'memory',
+        'workload': workload_summary(args),
+        'bids': bids,
+        'bytes_per_bid_before': before / bids,
+        'bytes_per_bid_after': after / bids,
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Compares the wall time of the sequential and pipelined paths of auction.main.
+
+Both read NDJSON auctions from a file, and decode, evaluate and encode them
+before writing the results to the null device. The sequential path does
+each auction from start to finish in turn, while the pipelined path runs
+each stage in its own thread with batches passed through bounded queues.
+
+Usage: python -m benchmarks.pipeline [workload options] [--batch-sizes 32,256,2048]
+                                     [--repeat N] [--output PATH]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from auction.auction import AuctionHelper
+from auction.json_decoder import decode_auction, decode_config
+from auction.json_encoder import encode_winning_bids
+from auction.pipeline import run_pipeline
+
+from .report import write_report
+from .workload import add_workload_arguments, generate_auctions, generate_config, \
+    get_workload_options, workload_summary
+
+
+def measure(run, repeat: int) -> float:
+    """Gets the best time in seconds taken by a call."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='benchmarks.pipeline')
+    add_workload_arguments(parser)
+    parser.add_argument('--batch-sizes', default='32,256,2048',
+                        help='comma separated pipeline batch sizes')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='write the report to a file instead of standard out')
+    args = parser.parse_args()
+
+    options = get_workload_options(args)
+    config_json = generate_config(options)
+    auction_helper = AuctionHelper(decode_config(config_json))
+
+    with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as input_file:
+        for auction in generate_auctions(config_json, args.auctions, options):
+            input_file.write(json.dumps(auction) + '\n')
+
+    def decode(line: str):
+        return decode_auction(json.loads(line))
+
+    def sequential():
+        with open(input_file.name) as lines, open(os.devnull, 'w') as output:
+            for line in lines:
+                output.write(encode_winning_bids(auction_helper.get_winning_bids(decode(line))))
+                output.write('\n')
+
+    def pipelined(batch_size: int):
+        with open(input_file.name) as lines, open(os.devnull, 'w') as output:
+            for encoded in run_pipeline(lines, [decode, auction_helper.get_winning_bids,
+                                                encode_winning_bids], batch_size):
+                output.write(encoded)
+                output.write('\n')
+
+    try:
+        sequential_seconds = measure(sequential, args.repeat)
+        results = {}
+        for batch_size in [int(x) for x in args.batch_sizes.split(',')]:
+            seconds = measure(lambda: pipelined(batch_size), args.repeat)
+            results[str(batch_size)] = {
+                'seconds': seconds,
+                'speedup': sequential_seconds / seconds,
+            }
+    finally:
+        os.unlink(input_file.name)
+
+    write_report({
+        'benchmark': 'pipeline',
+        'workload': workload_summary(args),
+        'cpus': os.cpu_count(),
+        'sequential_seconds': sequential_seconds,
+        'pipelined_by_batch_size': results,
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
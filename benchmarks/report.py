@@ -0,0 +1,62 @@
+"""Helpers for writing machine-readable benchmark reports."""
+import json
+import resource
+import sys
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def percentiles(samples: Sequence[float],
+                points: Sequence[int] = (50, 90, 99)) -> Dict[str, float]:
+    """Gets nearest-rank percentiles of the samples, keyed like 'p50'."""
+    ordered = sorted(samples)
+    if not ordered:
+        return dict(('p{}'.format(x), 0.0) for x in points)
+
+    return dict(('p{}'.format(x), ordered[min(len(ordered) - 1, len(ordered) * x // 100)])
+                for x in points)
+
+
+def peak_rss_bytes() -> int:
+    """Gets the peak resident set size of this process."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reports kilobytes, macOS reports bytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def write_report(report: Dict[str, Any], path: Optional[str] = None):
+    """Writes a report as JSON to a file, or to standard out."""
+    if path is None:
+        json.dump(report, sys.stdout, indent=4)
+        sys.stdout.write('\n')
+    else:
+        with open(path, 'w') as report_file:
+            json.dump(report, report_file, indent=4)
+            report_file.write('\n')
+
+
+def find_regressions(report: Dict[str, Any], baseline: Dict[str, Any],
+                     tolerance: float) -> List[str]:
+    """Compares the throughputs of a report against a baseline report.
+
+    Every numeric value whose key ends in 'per_second' is a throughput. A
+    throughput more than tolerance (a fraction) below the baseline is a
+    regression.
+
+    :return: Returns a description of every regression.
+    """
+    regressions = []
+
+    def compare(current, previous, path):
+        if isinstance(current, dict) and isinstance(previous, dict):
+            for key, value in current.items():
+                if key in previous:
+                    compare(value, previous[key], path + [key])
+        elif (path and path[-1].endswith('per_second') and
+              isinstance(current, (int, float)) and isinstance(previous, (int, float)) and
+              current < previous * (1 - tolerance)):
+            regressions.append('{}: {:.1f} < {:.1f}'.format('.'.join(path), current, previous))
+
+    compare(report, baseline, [])
+
+    return regressions
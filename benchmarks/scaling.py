@@ -0,0 +1,110 @@
+"""Measures throughput of the worker pool at different worker counts.
+
+Three inputs are measured: decoded auctions (evaluate_parallel), raw
+NDJSON lines that the workers decode themselves (evaluate_parallel_ndjson),
+and an NDJSON file that the workers map and read byte ranges of
+(evaluate_parallel_file). Speedups are relative to doing the same work in
+a single process.
+
+Usage: python -m benchmarks.scaling [workload options] [--workers 1,2,4,8]
+                                    [--chunk-size N] [--output PATH]
+"""
+import argparse
+import collections
+import json
+import os
+import tempfile
+import time
+
+from auction.auction import AuctionHelper
+from auction.json_decoder import decode_auction, decode_config
+from auction.parallel import DEFAULT_CHUNK_SIZE, evaluate_parallel, evaluate_parallel_file, \
+    evaluate_parallel_ndjson
+
+from .report import peak_rss_bytes, write_report
+from .workload import add_workload_arguments, generate_auctions, generate_config, \
+    get_workload_options, workload_summary
+
+
+def measure(run) -> float:
+    """Gets the time in seconds taken by a call."""
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='benchmarks.scaling')
+    add_workload_arguments(parser)
+    parser.add_argument('--workers', default=None,
+                        help='comma separated worker counts '
+                             '(default: powers of 2 up to the CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--output', help='write the report to a file instead of standard out')
+    args = parser.parse_args()
+
+    if args.workers is None:
+        cpus = os.cpu_count() or 1
+        worker_counts = [1 << i for i in range(cpus.bit_length()) if 1 << i <= cpus]
+    else:
+        worker_counts = [int(x) for x in args.workers.split(',')]
+
+    options = get_workload_options(args)
+    config_json = generate_config(options)
+    config = decode_config(config_json)
+    lines = [json.dumps(x) for x in generate_auctions(config_json, args.auctions, options)]
+    auctions = [decode_auction(json.loads(x)) for x in lines]
+
+    with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as input_file:
+        input_file.writelines(x + '\n' for x in lines)
+
+    def sequential_ndjson():
+        auction_helper = AuctionHelper(config)
+        for line in lines:
+            auction_helper.get_winning_bids(decode_auction(json.loads(line)))
+
+    def sequential_auctions():
+        auction_helper = AuctionHelper(config)
+        for auction in auctions:
+            auction_helper.get_winning_bids(auction)
+
+    modes = {
+        'auctions': (sequential_auctions,
+                     lambda workers: evaluate_parallel(config, auctions, workers,
+                                                       args.chunk_size)),
+        'ndjson': (sequential_ndjson,
+                   lambda workers: evaluate_parallel_ndjson(config, lines, workers,
+                                                            args.chunk_size)),
+        'file': (sequential_ndjson,
+                 lambda workers: evaluate_parallel_file(config, input_file.name, workers)),
+    }
+
+    results = {}
+    try:
+        for mode, (sequential, parallel) in modes.items():
+            sequential_seconds = measure(sequential)
+            results[mode] = {
+                'sequential_auctions_per_second': args.auctions / sequential_seconds,
+                'workers': {},
+            }
+
+            for workers in worker_counts:
+                seconds = measure(lambda: collections.deque(parallel(workers), maxlen=0))
+                results[mode]['workers'][str(workers)] = {
+                    'auctions_per_second': args.auctions / seconds,
+                    'speedup': sequential_seconds / seconds,
+                }
+    finally:
+        os.unlink(input_file.name)
+
+    write_report({
+        'benchmark': 'scaling',
+        'workload': workload_summary(args),
+        'chunk_size': args.chunk_size,
+        'modes': results,
+        'peak_rss_bytes': peak_rss_bytes(),
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Times the decode, evaluate and encode stages of auction.main separately.
+
+Each stage is timed per auction, and the report has the throughput and
+latency percentiles of every stage, plus the peak RSS of the process.
+Pass --baseline with the report of a previous commit to fail on throughput
+regressions.
+
+Usage: python -m benchmarks.stages [workload options] [--output PATH]
+                                   [--baseline PATH] [--tolerance FRACTION]
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from auction.auction import AuctionHelper
+from auction.json_decoder import auction_decoder, decode_auction, decode_config
+from auction.json_encoder import DefaultEncoder, encode_winning_bids
+
+from .report import find_regressions, peak_rss_bytes, percentiles, write_report
+from .workload import add_workload_arguments, generate_auctions, generate_config, \
+    get_workload_options, workload_summary
+
+DECODERS = {
+    'schema': lambda line: decode_auction(json.loads(line)),
+    'hook': lambda line: json.loads(line, object_hook=auction_decoder),
+}
+
+ENCODERS = {
+    'compact': encode_winning_bids,
+    'pretty': lambda bids: encode_winning_bids(bids, pretty=True),
+    'default': lambda bids: json.dumps(bids, indent=4, cls=DefaultEncoder),
+}
+
+
+def time_stage(stage: Callable, items: Iterable) -> Tuple[List, Dict[str, Any]]:
+    """Runs a stage on every item, timing each call.
+
+    :return: Returns the stage's results and its timing report.
+    """
+    perf_counter = time.perf_counter
+    results = []
+    latencies = []
+
+    for item in items:
+        start = perf_counter()
+        result = stage(item)
+        latencies.append(perf_counter() - start)
+        results.append(result)
+
+    total = sum(latencies)
+    report = {
+        'seconds': total,
+        'auctions_per_second': len(latencies) / total if total > 0 else 0.0,
+        'latency_us': dict((key, value * 1e6) for key, value in percentiles(latencies).items()),
+    }
+
+    return results, report
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='benchmarks.stages')
+    add_workload_arguments(parser)
+    parser.add_argument('--decoder', choices=sorted(DECODERS), default='schema')
+    parser.add_argument('--encoder', choices=sorted(ENCODERS), default='compact')
+    parser.add_argument('--per-unit', action='store_true',
+                        help='evaluate with the per-unit path instead of the single pass')
+    parser.add_argument('--output', help='write the report to a file instead of standard out')
+    parser.add_argument('--baseline', help='report of a previous run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='allowed fractional throughput drop against the baseline')
+    args = parser.parse_args()
+
+    options = get_workload_options(args)
+    config_json = generate_config(options)
+    lines = [json.dumps(x) for x in generate_auctions(config_json, args.auctions, options)]
+
+    auction_helper = AuctionHelper(decode_config(config_json), single_pass=not args.per_unit)
+
+    auctions, decode_report = time_stage(DECODERS[args.decoder], lines)
+    del lines
+    winning_bids, evaluate_report = time_stage(auction_helper.get_winning_bids, auctions)
+    del auctions
+    _, encode_report = time_stage(ENCODERS[args.encoder], winning_bids)
+
+    total = decode_report['seconds'] + evaluate_report['seconds'] + encode_report['seconds']
+    report = {
+        'benchmark': 'stages',
+        'workload': workload_summary(args),
+        'decoder': args.decoder,
+        'encoder': args.encoder,
+        'evaluation': 'per_unit' if args.per_unit else 'single_pass',
+        'stages': {
+            'decode': decode_report,
+            'evaluate': evaluate_report,
+            'encode': encode_report,
+        },
+        'total_auctions_per_second': args.auctions / total if total > 0 else 0.0,
+        'peak_rss_bytes': peak_rss_bytes(),
+    }
+
+    regressions = []
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            regressions = find_regressions(report, json.load(baseline_file), args.tolerance)
+        report['regressions'] = regressions
+
+    write_report(report, args.output)
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Measures the cold start time of auction.main.
+
+Each measurement starts a new interpreter running auction.main on an empty
+input, so it covers the imports and loading the config: once with the
+config compiled from JSON, once when the snapshot is written, and once when
+the snapshot is loaded. The import time of auction.main is measured on its
+own, against an interpreter that imports nothing.
+
+Usage: python -m benchmarks.startup [workload options] [--repeat N] [--output PATH]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+from .report import write_report
+from .workload import add_workload_arguments, generate_config, get_workload_options, \
+    workload_summary
+
+
+def measure(command: List[str], repeat: int, before_each=None) -> float:
+    """Gets the best wall time in seconds taken by a command with an empty input."""
+    best = float('inf')
+    for _ in range(repeat):
+        if before_each is not None:
+            before_each()
+
+        start = time.perf_counter()
+        subprocess.run(command, input=b'[]', stdout=subprocess.DEVNULL, check=True)
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='benchmarks.startup')
+    add_workload_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='write the report to a file instead of standard out')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        config_path = os.path.join(directory, 'config.json')
+        with open(config_path, 'w') as config_file:
+            json.dump(generate_config(get_workload_options(args)), config_file)
+
+        snapshot_path = config_path + '.snapshot'
+
+        def remove_snapshot():
+            if os.path.exists(snapshot_path):
+                os.unlink(snapshot_path)
+
+        run_main = [sys.executable, '-m', 'auction.main', '--config', config_path]
+
+        report = {
+            'benchmark': 'startup',
+            'workload': workload_summary(args),
+            'config_bytes': os.path.getsize(config_path),
+            'interpreter_seconds': measure([sys.executable, '-c', 'pass'], args.repeat),
+            'import_seconds': measure([sys.executable, '-c', 'import auction.main'],
+                                      args.repeat),
+            'no_snapshot_seconds': measure(run_main + ['--no-config-snapshot'], args.repeat),
+            'snapshot_write_seconds': measure(run_main, args.repeat, remove_snapshot),
+            'snapshot_load_seconds': measure(run_main, args.repeat),
+            'snapshot_bytes': os.path.getsize(snapshot_path),
+        }
+
+    write_report(report, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Synthetic configs and auction streams for the benchmarks.
+
+Usage: python -m benchmarks.workload [options] --config-output config.json > input.json
+"""
+import argparse
+import json
+import random
+import sys
+from typing import Any, Dict, Iterator
+
+UNITS = ['banner', 'sidebar', 'footer', 'header', 'interstitial', 'skyscraper']
+
+# The ways a generated bid can be made unable to win.
+INVALID_KINDS = ('disallowed_bidder', 'unknown_bidder', 'negative_bid', 'unit_not_in_auction')
+
+
+class WorkloadOptions(object):
+    """The shape of a generated workload."""
+
+    def __init__(self, sites: int = 100, bidders: int = 50, bidders_per_site: int = 10,
+                 units_per_auction: int = 2, bids_per_auction: int = 10,
+                 invalid_fraction: float = 0.2, unknown_site_fraction: float = 0.05,
+                 seed: int = 0):
+        self.sites = sites
+        self.bidders = bidders
+        self.bidders_per_site = min(bidders_per_site, bidders)
+        self.units_per_auction = min(units_per_auction, len(UNITS) - 1)
+        self.bids_per_auction = bids_per_auction
+        self.invalid_fraction = invalid_fraction
+        self.unknown_site_fraction = unknown_site_fraction
+        self.seed = seed
+
+
+def generate_config(options: WorkloadOptions) -> Dict[str, Any]:
+    """Generates a JSON config, as it would be read from config.json."""
+    rng = random.Random(options.seed)
+    bidders = ['BIDDER{}'.format(i) for i in range(options.bidders)]
+
+    return {
+        'sites': [{'name': 'site{}.com'.format(i),
+                   'bidders': rng.sample(bidders, options.bidders_per_site),
+                   'floor': rng.choice([0, 10, 20, 32])}
+                  for i in range(options.sites)],
+        'bidders': [{'name': x, 'adjustment': round(rng.uniform(-0.2, 0.2), 4)}
+                    for x in bidders],
+    }
+
+
+def generate_auctions(config: Dict[str, Any], auctions: int,
+                      options: WorkloadOptions) -> Iterator[Dict[str, Any]]:
+    """Generates JSON auctions for a config generated by generate_config."""
+    rng = random.Random(options.seed + 1)
+    bidders = [x['name'] for x in config['bidders']]
+
+    for _ in range(auctions):
+        site = rng.choice(config['sites'])
+        units = rng.sample(UNITS, options.units_per_auction)
+        other_units = [x for x in UNITS if x not in units]
+
+        bids = []
+        for _ in range(options.bids_per_auction):
+            bid = {'bidder': rng.choice(site['bidders']),
+                   'unit': rng.choice(units),
+                   'bid': round(rng.uniform(0, 100), 2)}
+
+            if rng.random() < options.invalid_fraction:
+                kind = rng.choice(INVALID_KINDS)
+                if kind == 'disallowed_bidder':
+                    bid['bidder'] = rng.choice(bidders)
+                elif kind == 'unknown_bidder':
+                    bid['bidder'] = 'UNKNOWN{}'.format(rng.randint(0, 9))
+                elif kind == 'negative_bid':
+                    bid['bid'] = -bid['bid']
+                else:
+                    bid['unit'] = rng.choice(other_units)
+
+            bids.append(bid)
+
+        if rng.random() < options.unknown_site_fraction:
+            site_name = 'unknown{}.com'.format(rng.randint(0, 9))
+        else:
+            site_name = site['name']
+
+        yield {'site': site_name, 'units': units, 'bids': bids}
+
+
+def generate_input(auctions: int, options: WorkloadOptions) -> str:
+    """Generates a JSON array of auctions, as it would be read from standard in."""
+    return json.dumps(list(generate_auctions(generate_config(options), auctions, options)))
+
+
+def add_workload_arguments(parser: argparse.ArgumentParser):
+    """Adds the options of WorkloadOptions to a command-line parser."""
+    defaults = WorkloadOptions()
+    parser.add_argument('--auctions', type=int, default=10000)
+    parser.add_argument('--sites', type=int, default=defaults.sites)
+    parser.add_argument('--bidders', type=int, default=defaults.bidders)
+    parser.add_argument('--bidders-per-site', type=int, default=defaults.bidders_per_site)
+    parser.add_argument('--units-per-auction', type=int, default=defaults.units_per_auction)
+    parser.add_argument('--bids-per-auction', type=int, default=defaults.bids_per_auction)
+    parser.add_argument('--invalid-fraction', type=float, default=defaults.invalid_fraction)
+    parser.add_argument('--unknown-site-fraction', type=float,
+                        default=defaults.unknown_site_fraction)
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+
+
+def get_workload_options(args: argparse.Namespace) -> WorkloadOptions:
+    """Gets the WorkloadOptions from arguments added by add_workload_arguments."""
+    return WorkloadOptions(args.sites, args.bidders, args.bidders_per_site,
+                           args.units_per_auction, args.bids_per_auction,
+                           args.invalid_fraction, args.unknown_site_fraction, args.seed)
+
+
+def workload_summary(args: argparse.Namespace) -> Dict[str, Any]:
+    """Describes a workload for benchmark reports."""
+    return dict((x, getattr(args, x)) for x in
+                ('auctions', 'sites', 'bidders', 'bidders_per_site', 'units_per_auction',
+                 'bids_per_auction', 'invalid_fraction', 'unknown_site_fraction', 'seed'))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='benchmarks.workload',
+        description='Writes a synthetic auction input to standard out.')
+    add_workload_arguments(parser)
+    parser.add_argument('--ndjson', action='store_true',
+                        help='write one auction per line instead of a JSON array')
+    parser.add_argument('--config-output', required=True,
+                        help='path to write the matching config.json to')
+    args = parser.parse_args()
+
+    options = get_workload_options(args)
+    config = generate_config(options)
+
+    with open(args.config_output, 'w') as config_file:
+        json.dump(config, config_file)
+
+    auctions = generate_auctions(config, args.auctions, options)
+    if args.ndjson:
+        for auction in auctions:
+            sys.stdout.write(json.dumps(auction))
+            sys.stdout.write('\n')
+    else:
+        separator = '['
+        for auction in auctions:
+            sys.stdout.write(separator)
+            sys.stdout.write(json.dumps(auction))
+            separator = ',\n'
+        sys.stdout.write('[]\n' if separator == '[' else ']\n')
+
+
+if __name__ == '__main__':
+    main()